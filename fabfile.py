@@ -17,6 +17,8 @@ DEFAULTS = {
     'VM_USER_NAME': 'dccnadm',
     'STATIC_PROVIDER': 'selcdn',
     'MEDIA_PROVIDER': 'selcdn',
+    'MEDIA_DOWNLOAD_MODE': 'stream',
+    'CDN_TEMP_URL_KEY': '',
     'CDN_FTP_HOST': 'ftp.selcdn.ru',
     'REPO_URL': 'https://github.com/dccnconf/dccnsys.git',
     'DB_PROVIDER': 'postgresql',
@@ -59,8 +61,10 @@ class Environment:
         self.CDN_STATIC_BIN = self.env('CDN_STATIC_BIN')
         self.CDN_MEDIA_PUBLIC_BIN = self.env('CDN_MEDIA_PUBLIC_BIN')
         self.CDN_MEDIA_PRIVATE_BIN = self.env('CDN_MEDIA_PRIVATE_BIN')
+        self.CDN_TEMP_URL_KEY = self.env('CDN_TEMP_URL_KEY')
         self.STATIC_PROVIDER = self.env('STATIC_PROVIDER')
         self.MEDIA_PROVIDER = self.env('MEDIA_PROVIDER')
+        self.MEDIA_DOWNLOAD_MODE = self.env('MEDIA_DOWNLOAD_MODE')
         self.REPO_URL = self.env('REPO_URL')
         self.BRANCH = self.env('REPO_BRANCH')
         self.DB_PROVIDER = self.env('DB_PROVIDER')
@@ -148,12 +152,16 @@ def create_server(ctx, name, envtype):
 
     # 4) On part of root, create configuration files and services:
     create_gunicorn_service(root, env=env)
+    create_mailworker_service(root, env=env)
+    create_reportworker_service(root, env=env)
     create_nginx_config(root, env=env)
 
     # 5) Update the repository, make migrations, install python packages.
     # Then tart services (on part of root).
     update_repo(user, env=env)
     gunicorn_service(root, 'start', env=env)
+    mailworker_service(root, 'start', env=env)
+    reportworker_service(root, 'start', env=env)
     nginx_service(root, 'restart')
 
 
@@ -182,10 +190,16 @@ def update(ctx, envtype):
 
     # Update services configurations and restart them:
     gunicorn_service(root, 'stop', env)
+    mailworker_service(root, 'stop', env)
+    reportworker_service(root, 'stop', env)
     nginx_service(root, 'stop')
     create_gunicorn_service(root, env)
+    create_mailworker_service(root, env)
+    create_reportworker_service(root, env)
     create_nginx_config(root, env)
     gunicorn_service(root, 'start', env)
+    mailworker_service(root, 'start', env)
+    reportworker_service(root, 'start', env)
     nginx_service(root, 'start')
 
 
@@ -325,6 +339,7 @@ def update_repo(c, env):
             env_cmd = f'export $(cat ../.env | xargs)'
             c.run(f'{env_cmd}; {manage} collectstatic --noinput')
             c.run(f'{env_cmd}; {manage} migrate --noinput', echo=True)
+            c.run(f'{env_cmd}; {manage} rebuild_submission_facts', echo=True)
 
 
 def create_database(c, env):
@@ -362,11 +377,44 @@ def create_gunicorn_service(c, env):
           echo=True)
 
 
+def create_mailworker_service(c, env):
+    assignments = {
+        'SITENAME': env.SITENAME,
+        'USERNAME': env.VM_USER_NAME,
+        'PROJNAME': env.DJANGO_PROJECT_NAME,
+    }
+    pattern = ";".join([f's/{k}/{v}/g' for k, v in assignments.items()])
+    deploy_path = f'/home/{env.VM_USER_NAME}/sites/{env.SITENAME}/deploy/'
+    service_name = f'mailworker-{env.SITENAME}'
+    c.run(f'cat {deploy_path}/mailworker.service | '
+          f'sed "{pattern}" > /etc/systemd/system/{service_name}.service',
+          echo=True)
+    c.run(f'systemctl daemon-reload; systemctl enable {service_name}',
+          echo=True)
+
+
+def create_reportworker_service(c, env):
+    assignments = {
+        'SITENAME': env.SITENAME,
+        'USERNAME': env.VM_USER_NAME,
+        'PROJNAME': env.DJANGO_PROJECT_NAME,
+    }
+    pattern = ";".join([f's/{k}/{v}/g' for k, v in assignments.items()])
+    deploy_path = f'/home/{env.VM_USER_NAME}/sites/{env.SITENAME}/deploy/'
+    service_name = f'reportworker-{env.SITENAME}'
+    c.run(f'cat {deploy_path}/reportworker.service | '
+          f'sed "{pattern}" > /etc/systemd/system/{service_name}.service',
+          echo=True)
+    c.run(f'systemctl daemon-reload; systemctl enable {service_name}',
+          echo=True)
+
+
 def create_nginx_config(c, env):
     assignments = {
         'SITENAME': env.SITENAME,
         'MAX_BODY_SIZE': env.MAX_BODY_SIZE,
         'YEAR': env.CERT_YEAR,
+        'SITEUSER': env.VM_USER_NAME,
     }
 
     user = env.VM_USER_NAME
@@ -390,6 +438,14 @@ def gunicorn_service(c, cmd, env):
     c.run(f'systemctl {cmd} gunicorn-{env.SITENAME}', echo=True)
 
 
+def mailworker_service(c, cmd, env):
+    c.run(f'systemctl {cmd} mailworker-{env.SITENAME}', echo=True)
+
+
+def reportworker_service(c, cmd, env):
+    c.run(f'systemctl {cmd} reportworker-{env.SITENAME}', echo=True)
+
+
 def nginx_service(c, cmd):
     c.run(f'systemctl {cmd} nginx', echo=True)
 
@@ -407,6 +463,8 @@ def write_env(c, env):
         'SELCDN_STATIC_BIN': env.CDN_STATIC_BIN,
         'SELCDN_MEDIA_PRIVATE_BIN': env.CDN_MEDIA_PRIVATE_BIN,
         'SELCDN_MEDIA_PUBLIC_BIN': env.CDN_MEDIA_PUBLIC_BIN,
+        'SELCDN_TEMP_URL_KEY': env.CDN_TEMP_URL_KEY,
+        'MEDIA_DOWNLOAD_MODE': env.MEDIA_DOWNLOAD_MODE,
         'EMAIL_PROVIDER': env.EMAIL_PROVIDER,
         'EMAIL_DOMAIN': env.EMAIL_DOMAIN,
         'EMAIL_FROM_ADDRESS': env.EMAIL_FROM_ADDRESS,
@@ -7,8 +7,8 @@ from django.contrib.auth import views as auth_views
 from django.contrib.auth import get_user_model, login
 from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
-from django.core.mail import send_mail
 
+from chair_mail.outbox import queue_mail
 from .forms import SignUpForm
 
 User = get_user_model()
@@ -44,13 +44,11 @@ def signup(request):
                 }
                 html = render_to_string('auth_app/email/welcome.html', context)
                 text = render_to_string('auth_app/email/welcome.txt', context)
-                send_mail(
+                queue_mail(
                     'Welcome to DCCN Conference Registration System!',
                     message=text,
                     html_message=html,
                     recipient_list=[user.email],
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    fail_silently=False,
                 )
                 return redirect('register')
     else:
@@ -0,0 +1,127 @@
+"""Cached choices (facets) of the submissions and users filter forms.
+
+Each facet is a list of `(value, label, count)` triples. Facets of the
+submissions filter are built per conference, and facets of the users filter
+are built over all profiles. They are kept in the shared cache for
+`FILTER_FACETS_CACHE_TIMEOUT` seconds under keys that include generation
+tokens (see `gears.generations`). When profiles, authors, submissions or
+conference settings change, receivers in `chair.models` drop the tokens,
+so the next request builds facets again.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django_countries import countries
+
+from conferences.models import ArtifactDescriptor, ProceedingVolume
+from gears.generations import get_generation, invalidate_generation
+from submissions.models import Author, Submission
+from users.models import Profile
+
+
+PROFILES_GENERATION = 'filter-facets:profiles'
+
+
+def _get_conference_generation(conference_id):
+    return f'filter-facets:conference:{conference_id}'
+
+
+def invalidate_conference_facets(conference_id):
+    invalidate_generation(_get_conference_generation(conference_id))
+
+
+def invalidate_profile_facets():
+    invalidate_generation(PROFILES_GENERATION)
+
+
+def _get_cached(key, build):
+    facets = cache.get(key)
+    if facets is None:
+        facets = build()
+        cache.set(key, facets, settings.FILTER_FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def get_submission_facets(conference):
+    """Get choices of `FilterSubmissionsForm` with the number of conference
+    submissions matching each choice (`None` if not counted).
+
+    :param conference: `Conference` instance
+    :return: a dictionary with keys 'types', 'topics', 'proc_types',
+        'volumes', 'artifacts', 'countries' and 'affiliations'
+    """
+    key = 'filter-facets:submissions:{}:{}:{}'.format(
+        conference.pk,
+        get_generation(_get_conference_generation(conference.pk)),
+        get_generation(PROFILES_GENERATION))
+    return _get_cached(key, lambda: build_submission_facets(conference))
+
+
+def get_profile_facets():
+    """Get choices of `FilterProfilesForm` with the number of profiles
+    matching each choice.
+
+    :return: a dictionary with keys 'countries' and 'affiliations'
+    """
+    key = 'filter-facets:profiles:{}'.format(
+        get_generation(PROFILES_GENERATION))
+    return _get_cached(key, build_profile_facets)
+
+
+def build_submission_facets(conference):
+    submissions = Submission.objects.filter(conference=conference)
+    num_by_type = dict(submissions.order_by().values_list('stype').annotate(
+        num=Count('pk')))
+    num_by_topic = dict(
+        Submission.topics.through.objects.filter(
+            submission__conference=conference
+        ).order_by().values_list('topic').annotate(num=Count('submission')))
+
+    authors = Author.objects.filter(submission__conference=conference)
+    countries_dict = dict(countries)
+    by_country = authors.order_by('user__profile__country').values_list(
+        'user__profile__country').annotate(
+        num=Count('submission', distinct=True))
+    by_affiliation = authors.order_by('user__profile__affiliation').values_list(
+        'user__profile__affiliation').annotate(
+        num=Count('submission', distinct=True))
+
+    return {
+        'types': [(x.pk, x.name, num_by_type.get(x.pk, 0))
+                  for x in conference.submissiontype_set.all()],
+        'topics': [(x.pk, x.name, num_by_topic.get(x.pk, 0))
+                   for x in conference.topic_set.all()],
+        'proc_types': [('', 'Not defined', None)] + [
+            (x.pk, x.name, None) for x in conference.proceedingtype_set.all()],
+        'volumes': [('', 'Not defined', None)] + [
+            (x.pk, x.name, None) for x in ProceedingVolume.objects.filter(
+                type__conference=conference).order_by('pk')],
+        'artifacts': [
+            (x.pk, f'{x.name} ({x.proc_type.name})', None) for x in
+            ArtifactDescriptor.objects.filter(
+                proc_type__conference=conference).select_related('proc_type')],
+        'countries': [(code, countries_dict[code], num)
+                      for code, num in by_country if code in countries_dict],
+        'affiliations': [(aff, aff, num) for aff, num in by_affiliation],
+    }
+
+
+def build_profile_facets():
+    countries_dict = dict(countries)
+    by_country = Profile.objects.order_by('country').values_list(
+        'country').annotate(num=Count('pk'))
+    by_affiliation = Profile.objects.exclude(affiliation='').order_by(
+        'affiliation').values_list('affiliation').annotate(num=Count('pk'))
+    return {
+        'countries': [(code, countries_dict[code], num)
+                      for code, num in by_country if code in countries_dict],
+        'affiliations': [(aff, aff, num) for aff, num in by_affiliation],
+    }
+
+
+def facet_choices(facet):
+    """Convert a facet into form field choices, appending counts to labels,
+    e.g. "Russia (124)".
+    """
+    return [(value, label if num is None else f'{label} ({num})')
+            for value, label, num in facet]
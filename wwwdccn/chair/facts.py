@@ -0,0 +1,157 @@
+"""Computing `SubmissionFacts` of submissions.
+
+Facts of any number of submissions are computed with a fixed number of
+queries and are written at once. Receivers in `chair.models` request updates
+with `schedule_facts_update()`: in autocommit mode facts are updated
+immediately, and inside a transaction all requested submissions are updated
+together when it is committed. So a cascade of saves (e.g., a submission
+with its review stage and camera-ready) updates facts once, and cascade
+deletions don't write facts of submissions being deleted.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from chair.models import SubmissionFacts
+from gears.deferred import defer_update
+from review.models import ReviewStage, Review
+from submissions.models import Submission, Author, Attachment
+
+
+def schedule_facts_update(pks):
+    """Update facts of the submissions after the current transaction commits,
+    or immediately if there is no transaction (see `gears.deferred`).
+
+    :param pks: an iterable of submission primary keys
+    """
+    defer_update(update_submission_facts, pks, late=True)
+
+
+def update_submission_facts(pks):
+    """Compute and save facts of the submissions with the given primary keys.
+
+    :param pks: an iterable of submission primary keys (or a queryset)
+    :return: a dictionary `pk -> SubmissionFacts` of existing submissions
+    """
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return {}
+    facts = {
+        row['pk']: SubmissionFacts(submission_id=row['pk'])
+        for row in Submission.objects.filter(pk__in=pks).values('pk')}
+    if not facts:
+        return {}
+    pks = list(facts)
+
+    for row in Author.objects.filter(submission__in=pks).order_by().values(
+            'submission').annotate(
+            num_authors=Count('pk'),
+            num_countries=Count('user__profile__country', distinct=True)):
+        item = facts[row['submission']]
+        item.num_authors = row['num_authors']
+        item.num_countries = row['num_countries']
+
+    stages = {}
+    for stage in ReviewStage.objects.filter(submission__in=pks).order_by(
+            'pk').values('pk', 'submission_id', 'num_reviews_required',
+                         'score'):
+        stages.setdefault(stage['submission_id'], stage)
+    reviews = {
+        row['stage']: row for row in Review.objects.filter(
+            stage__in=[stage['pk'] for stage in stages.values()]
+        ).order_by().values('stage').annotate(
+            num_assigned=Count('pk'),
+            num_submitted=Count('pk', filter=Q(submitted=True)))
+    }
+    for pk, stage in stages.items():
+        item = facts[pk]
+        item.num_reviews_required = max(stage['num_reviews_required'], 0)
+        item.score = stage['score']
+        counters = reviews.get(stage['pk'], {})
+        item.num_reviews_assigned = counters.get('num_assigned', 0)
+        item.num_reviews_submitted = counters.get('num_submitted', 0)
+
+    for row in Attachment.objects.filter(
+            submission__in=pks, file='', artifact__camera_ready__active=True
+    ).order_by().values('submission', 'artifact__descriptor__mandatory'
+                        ).annotate(num=Count('pk', distinct=True)):
+        item = facts[row['submission']]
+        if row['artifact__descriptor__mandatory']:
+            item.num_missing_mandatory_artifacts = row['num']
+        else:
+            item.num_missing_optional_artifacts = row['num']
+
+    num_topics = dict(
+        Submission.topics.through.objects.filter(submission__in=pks).order_by(
+        ).values_list('submission').annotate(num=Count('pk')))
+
+    for sub in Submission.objects.filter(pk__in=pks).values(
+            'pk', 'status', 'title', 'abstract', 'stype_id',
+            'review_manuscript'):
+        item = facts[sub['pk']]
+        item.warnings = get_warning_flags(
+            sub, item, num_topics.get(sub['pk'], 0), sub['pk'] in stages)
+
+    with transaction.atomic():
+        SubmissionFacts.objects.filter(submission__in=pks).delete()
+        SubmissionFacts.objects.bulk_create(facts.values())
+    return facts
+
+
+def get_warning_flags(sub, facts, num_topics, has_stage):
+    """Compute `SubmissionFacts.warnings` bitmask.
+
+    :param sub: a dictionary with submission `status`, `title`, `abstract`,
+        `stype_id` and `review_manuscript`
+    :param facts: `SubmissionFacts` with counters filled
+    :param num_topics: number of topics of the submission
+    :param has_stage: whether the submission has a review stage
+    """
+    flags = 0
+    if not sub['title'].strip():
+        flags |= SubmissionFacts.MISSING_TITLE
+    if not sub['abstract'].strip():
+        flags |= SubmissionFacts.MISSING_ABSTRACT
+    if num_topics == 0:
+        flags |= SubmissionFacts.NO_TOPICS
+    if not sub['stype_id']:
+        flags |= SubmissionFacts.NO_TYPE
+
+    status = sub['status']
+    if status == Submission.SUBMITTED and not sub['review_manuscript']:
+        flags |= SubmissionFacts.NO_REVIEW_MANUSCRIPT
+    if status == Submission.UNDER_REVIEW and has_stage:
+        if facts.num_missing_reviews > 0:
+            flags |= SubmissionFacts.UNASSIGNED_REVIEWERS
+        if facts.num_unfinished_reviews > 0:
+            flags |= SubmissionFacts.INCOMPLETE_REVIEWS
+    if status == Submission.ACCEPTED:
+        if facts.num_missing_mandatory_artifacts > 0:
+            flags |= SubmissionFacts.MISSING_ARTIFACT
+        if facts.num_missing_optional_artifacts > 0:
+            flags |= SubmissionFacts.MISSING_OPT_ARTIFACT
+    return flags
+
+
+def get_submission_facts(submission):
+    """Get facts of the submission, computing them if they are missing.
+
+    :param submission: `Submission` instance
+    :return: `SubmissionFacts`
+    """
+    try:
+        return submission.facts
+    except SubmissionFacts.DoesNotExist:
+        facts = update_submission_facts([submission.pk])[submission.pk]
+        submission.facts = facts
+        return facts
+
+
+def rebuild_submission_facts(chunk_size=500):
+    """Recompute facts of all submissions.
+
+    :return: number of submissions processed
+    """
+    pks = list(Submission.objects.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(pks), chunk_size):
+        update_submission_facts(pks[i:i + chunk_size])
+    return len(pks)
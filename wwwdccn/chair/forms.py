@@ -1,25 +1,34 @@
+from collections import defaultdict
 from functools import reduce
 
 from django import forms
-from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core import signing
 from django.db import models
-from django.db.models import Q, F, Count, Max, Subquery, OuterRef, Value
-from django.db.models.functions import Concat
+from django.db.models import Q, F, Count, Max, Subquery, OuterRef, Value, \
+    Exists
+from django.db.models.functions import Concat, Coalesce
 from django.forms import MultipleChoiceField, ChoiceField, Form
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 
 from django_countries import countries
 
-from conferences.models import Conference, ArtifactDescriptor
+from chair.facets import get_submission_facets, get_profile_facets, \
+    facet_choices
+from chair.models import SubmissionFacts
+from conferences.models import Conference, SubmissionType
 from gears.widgets import CustomCheckboxSelectMultiple, CustomFileInput
-from review.models import Reviewer, Review, ReviewStats
-from review.utilities import get_average_score
-from submissions.models import Submission, Attachment
+from proceedings.models import CameraReady
+from review.affinity import suggest_reviewers
+from review.assignment import plan_assignment, AssignmentPlan
+from review.decisions import apply_decision, update_status
+from review.models import Reviewer, Review, ReviewStats, ReviewStage, \
+    ReviewDecisionType
+from search.utilities import filter_by_term
+from submissions.models import Submission, Attachment, Author
 from users.models import Profile
 
-User = get_user_model()
-
 
 # noinspection PyUnusedLocal
 def clean_data_to_int(iterable, empty=None):
@@ -134,85 +143,57 @@ class FilterSubmissionsForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         assert isinstance(self.instance, Conference)
-        self.fields['types'].choices = [
-            (x.pk, x.name) for x in self.instance.submissiontype_set.all()]
-        self.fields['topics'].choices = [
-            (x.pk, x.name) for x in self.instance.topic_set.all()]
-        self.fields['proc_types'].choices = [('', 'Not defined')] + [
-            (x.pk, x.name) for x in self.instance.proceedingtype_set.all()]
-        self.fields['volumes'].choices = [('', 'Not defined')] + [
-            (vol_pk, vol_name) for (vol_pk, vol_name) in
-            self.instance.proceedingtype_set.values_list(
-                'volumes__pk', 'volumes__name').distinct()]
-        self.fields['artifacts'].choices = [
-            (x.pk, f'{x.name} ({x.proc_type.name}') for x in
-            ArtifactDescriptor.objects.filter(
-                 proc_type__conference=self.instance)]
-
-        profiles_data = Profile.objects.filter(
-            user__authorship__submission__conference=self.instance).values(
-            'affiliation', 'country')
-        self.fields['countries'].choices = [
-            (x, dict(countries)[x]) for x in profiles_data.values_list(
-                'country', flat=True).distinct().order_by('country')]
-        self.fields['affiliations'].choices = [
-            (x, x) for x in profiles_data.values_list(
-                'affiliation', flat=True).distinct().order_by('affiliation')]
-
-    def order_submissions(self, submissions):
+        facets = get_submission_facets(self.instance)
+        for name in ('types', 'topics', 'proc_types', 'volumes', 'artifacts',
+                     'countries', 'affiliations'):
+            self.fields[name].choices = facet_choices(facets[name])
+
+    def get_ordering(self):
+        """Get a pair `(key, descending)` defining the order of submissions
+        returned by `apply()`. Ties are ordered by `pk`.
+        """
         order = self.cleaned_data['order']
-        direction = '' if self.cleaned_data['direction'] == 'ASC' else '-'
-        if order == self.ORDER_BY_PK:
-            return submissions.order_by(f'{direction}pk')
-        elif order == self.ORDER_BY_TITLE:
-            return submissions.order_by(f'{direction}title')
+        descending = self.cleaned_data['direction'] != 'ASC'
+        if order == self.ORDER_BY_TITLE:
+            return 'title', descending
         elif order == self.ORDER_BY_SCORE:
-            return submissions.order_by(f'{direction}reviewstage__score')
-        return submissions
+            return 'order_score', descending
+        return 'pk', descending
+
+    def order_submissions(self, submissions):
+        key, descending = self.get_ordering()
+        if key == 'order_score':
+            # Score of the first review stage, submissions without score
+            # go first in ascending order:
+            submissions = submissions.annotate(order_score=Coalesce(
+                'facts__score', Value(-1.0),
+                output_field=models.FloatField()))
+        direction = '-' if descending else ''
+        return submissions.order_by(f'{direction}{key}', f'{direction}pk')
 
     def apply_completion(self, submissions):
         data = self.cleaned_data['completion']
         disjuncts = []
 
-        submissions = submissions.annotate(
-            num_missing_mandatory_artifacts=Count(
-                'attachments', filter=Q(
-                    attachments__file='',
-                    attachments__artifact__descriptor__mandatory=True,
-                    attachments__artifact__camera_ready__active=True),
-                distinct=True),
-            num_missing_optional_artifacts=Count(
-                'attachments', filter=Q(
-                    attachments__file='',
-                    attachments__artifact__descriptor__mandatory=False,
-                    attachments__artifact__camera_ready__active=True),
-                distinct=True),
-            num_reviews_required=F('reviewstage__num_reviews_required'),
-            num_reviews_assigned=Count('reviewstage__review', distinct=True),
-            num_reviews_submitted=Count('reviewstage__review', filter=Q(
-                reviewstage__review__submitted=True), distinct=True),
-        )
+        # Warning flags of submission facts are set only for submissions
+        # in proper status (e.g., missing artifacts only for accepted ones):
+        flags = {
+            self.NO_REVIEW_MANUSCRIPT: SubmissionFacts.NO_REVIEW_MANUSCRIPT,
+            self.UNASSIGNED_REVIEWERS: SubmissionFacts.UNASSIGNED_REVIEWERS,
+            self.INCOMPLETE_REVIEWS: SubmissionFacts.INCOMPLETE_REVIEWS,
+            self.MISSING_ARTIFACT: SubmissionFacts.MISSING_ARTIFACT,
+            self.MISSING_OPT_ARTIFACT: SubmissionFacts.MISSING_OPT_ARTIFACT,
+        }
+        submissions = submissions.annotate(**{
+            f'warning_{flag}': F('facts__warnings').bitand(flag)
+            for flag in flags.values()})
 
         # Below we define various queries for _non-empty_ submissions those
         # may be issued within 'completion' choice. Negation of these
         # queries conjunction along with condition on non-emptiness give
         # complete submission criterion:
-        queries = {
-            self.NO_REVIEW_MANUSCRIPT:
-                Q(review_manuscript='') & Q(status=Submission.SUBMITTED),
-            self.UNASSIGNED_REVIEWERS:
-                Q(num_reviews_assigned__lt=F('num_reviews_required')) &
-                Q(status=Submission.UNDER_REVIEW),
-            self.INCOMPLETE_REVIEWS:
-                Q(num_reviews_submitted__lt=F('num_reviews_assigned')) &
-                Q(status=Submission.UNDER_REVIEW),
-            self.MISSING_ARTIFACT:
-                Q(num_missing_mandatory_artifacts__gt=0) &
-                Q(status=Submission.ACCEPTED),
-            self.MISSING_OPT_ARTIFACT:
-                Q(num_missing_optional_artifacts__gt=0) &
-                Q(status=Submission.ACCEPTED),
-        }
+        queries = {opt: Q(**{f'warning_{flag}__gt': 0})
+                   for opt, flag in flags.items()}
 
         empty = Q(title='')  # we use this often below
         if self.MISSING_TITLE in data:
@@ -231,9 +212,11 @@ class FilterSubmissionsForm(forms.ModelForm):
         # If we are also interested in completed submissions, disjunct all
         # queries defined above (regardless of whether they are presented
         # in completion choices!), conjunct with non-emptiness and put to
-        # 'disjuncts' list:
+        # 'disjuncts' list. Submissions without facts (not computed yet)
+        # are never considered complete:
         if self.COMPLETE_SUBMISSION in data:
-            disjuncts.append(~empty & ~q_or(queries.values()))
+            disjuncts.append(~empty & Q(facts__isnull=False) &
+                             ~q_or(queries.values()))
 
         if disjuncts:
             submissions = submissions.filter(q_or(disjuncts))
@@ -244,7 +227,10 @@ class FilterSubmissionsForm(forms.ModelForm):
         data = self.cleaned_data['topics']
         items = [int(topic) for topic in data if topic]
         if items:
-            submissions = submissions.filter(topics__in=items)
+            submissions = submissions.annotate(has_topics=Exists(
+                Submission.topics.through.objects.filter(
+                    submission=OuterRef('pk'), topic__in=items))
+            ).filter(has_topics=True)
         return submissions
 
     def apply_status(self, submissions):
@@ -256,15 +242,19 @@ class FilterSubmissionsForm(forms.ModelForm):
     def apply_countries(self, submissions):
         data = self.cleaned_data['countries']
         if data:
-            submissions = submissions.filter(
-                authors__user__profile__country__in=data)
+            submissions = submissions.annotate(has_countries=Exists(
+                Author.objects.filter(submission=OuterRef('pk'),
+                                      user__profile__country__in=data))
+            ).filter(has_countries=True)
         return submissions
 
     def apply_affiliations(self, submissions):
         data = self.cleaned_data['affiliations']
         if data:
-            submissions = submissions.filter(
-                authors__user__profile__affiliation__in=data)
+            submissions = submissions.annotate(has_affiliations=Exists(
+                Author.objects.filter(submission=OuterRef('pk'),
+                                      user__profile__affiliation__in=data))
+            ).filter(has_affiliations=True)
         return submissions
 
     def apply_proc_types(self, submissions):
@@ -272,12 +262,14 @@ class FilterSubmissionsForm(forms.ModelForm):
         disjuncts = []
         proc_types = [int(x) for x in data if x]
         if proc_types:
-            disjuncts.append(Q(cameraready__proc_type__in=proc_types))
+            disjuncts.append(Q(proc_type__in=proc_types))
         if '' in data:
-            disjuncts.append(Q(cameraready__proc_type=None))
+            disjuncts.append(Q(proc_type=None))
         if disjuncts:
-            submissions = submissions.filter(
-                Q(cameraready__active=True) & q_or(disjuncts))
+            submissions = submissions.annotate(has_proc_types=Exists(
+                CameraReady.objects.filter(
+                    q_or(disjuncts), submission=OuterRef('pk'), active=True))
+            ).filter(has_proc_types=True)
         return submissions
 
     def apply_volumes(self, submissions):
@@ -285,82 +277,81 @@ class FilterSubmissionsForm(forms.ModelForm):
         disjuncts = []
         volumes = [int(x) for x in data if x]
         if volumes:
-            disjuncts.append(Q(cameraready__volume__in=volumes))
+            disjuncts.append(Q(volume__in=volumes))
         if '' in data:
-            disjuncts.append(Q(cameraready__volume=None))
+            disjuncts.append(Q(volume=None))
         if disjuncts:
-            submissions = submissions.filter(
-                Q(cameraready__active=True) & q_or(disjuncts))
+            submissions = submissions.annotate(has_volumes=Exists(
+                CameraReady.objects.filter(
+                    q_or(disjuncts), submission=OuterRef('pk'), active=True))
+            ).filter(has_volumes=True)
         return submissions
 
     def apply_quartiles(self, submissions):
         data = self.cleaned_data['quartiles']
-        # Since the following computations are expensive, do them only when
-        # we need them. Also skip if no review stats are available:
-        stats_query = ReviewStats.objects.filter(conference=self.instance)
-        if not data or not stats_query.count():
+        # Skip if no quartiles selected or no review stats are available:
+        stats = ReviewStats.objects.filter(conference=self.instance).first()
+        if not data or not stats:
             return submissions
 
-        stats = stats_query.first()
         q1, q2, q3 = stats.q1_score, stats.median_score, stats.q3_score
 
         # We also make sure that review stats were filled, since otherwise
-        # the following code may raise errors, while there won't be any
-        # results:
+        # there won't be any meaningful results:
         if not stats.median_score:
             # TODO: maybe add Q(pk__isnull=True) to conjuncts:
             # this will make result always empty -- if there is no median
             # (so Q1 and Q2), checking any quartile will result in empty set.
             return submissions
 
+        # Score of the submission is the score of its first review stage.
+        # We take it with a subquery to avoid joins multiplying rows, and
+        # skip all submissions without average score:
         submissions = submissions.filter(status__in=[
             Submission.UNDER_REVIEW, Submission.ACCEPTED, Submission.REJECTED,
-            Submission.IN_PRINT, Submission.PUBLISHED])
-        scores = {sub: get_average_score(sub) for sub in submissions}
-        _scored = [sub for sub, val in scores.items() if val]
-        # Skip all submissions without average score:
-        submissions = submissions.filter(pk__in=[s.pk for s in _scored])
+            Submission.IN_PRINT, Submission.PUBLISHED
+        ]).annotate(quartile_score=Subquery(
+            ReviewStage.objects.filter(
+                submission=OuterRef('pk')
+            ).order_by('pk').values('score')[:1],
+            output_field=models.FloatField()
+        )).filter(quartile_score__gt=0)
 
         disjuncts = []
         if self.Q1 in data:
-            disjuncts.append(lambda sub: scores[sub] < q1)
+            disjuncts.append(Q(quartile_score__lt=q1))
         if self.Q2 in data:
-            disjuncts.append(lambda sub: q1 <= scores[sub] < q2)
+            disjuncts.append(Q(quartile_score__gte=q1, quartile_score__lt=q2))
         if self.Q3 in data:
-            disjuncts.append(lambda sub: q2 <= scores[sub] < q3)
+            disjuncts.append(Q(quartile_score__gte=q2, quartile_score__lt=q3))
         if self.Q4 in data:
-            disjuncts.append(lambda sub: q3 <= scores[sub])
-        _valid = [sub for sub in submissions if
-                  any(predicate(sub) for predicate in disjuncts)]
-        submissions = submissions.filter(pk__in=[sub.pk for sub in _valid])
-        return submissions
+            disjuncts.append(Q(quartile_score__gte=q3))
+        return submissions.filter(q_or(disjuncts))
 
     def apply_artifacts(self, submissions):
         data = self.cleaned_data['artifacts']
         disjuncts = []
         descriptors = [int(x) for x in data if x]
         for desc_pk in descriptors:
-            disjuncts.append(Q(attachments__in=Subquery(
-                Attachment.objects.filter(
+            # Exists() can't be used in filter() directly, so each check
+            # is annotated and then referenced in the disjunction:
+            uploaded = f'has_uploaded_{desc_pk}'
+            expected = f'expects_artifact_{desc_pk}'
+            submissions = submissions.annotate(**{
+                uploaded: Exists(Attachment.objects.filter(
                     artifact__descriptor=desc_pk, submission=OuterRef('pk')
-                ).exclude(file='').values('pk')),
-                cameraready__proc_type__artifacts=desc_pk))
+                ).exclude(file='')),
+                expected: Exists(CameraReady.objects.filter(
+                    submission=OuterRef('pk'),
+                    proc_type__artifacts=desc_pk)),
+            })
+            disjuncts.append(Q(**{uploaded: True, expected: True}))
         if disjuncts:
             submissions = submissions.filter(q_or(disjuncts))
         return submissions
 
     def apply_term(self, submissions):
-        term = self.cleaned_data['term']
-        for word in term.lower().split():
-            submissions = submissions.filter(
-                Q(title__icontains=word) | Q(pk__icontains=word) |
-                Q(authors__user__profile__first_name__icontains=word) |
-                Q(authors__user__profile__last_name__icontains=word) |
-                Q(authors__user__profile__first_name_rus__icontains=word) |
-                Q(authors__user__profile__middle_name_rus__icontains=word) |
-                Q(authors__user__profile__last_name_rus__icontains=word)
-            )
-        return submissions
+        return filter_by_term(submissions, self.cleaned_data['term'])
 
     def apply(self, submissions):
         submissions = self.apply_completion(submissions)
@@ -373,7 +364,9 @@ class FilterSubmissionsForm(forms.ModelForm):
         submissions = self.apply_quartiles(submissions)
         submissions = self.apply_artifacts(submissions)
         submissions = self.apply_term(submissions)
-        return self.order_submissions(submissions.distinct()).distinct()
+        # All filters above check related objects with EXISTS subqueries,
+        # so each submission appears once without DISTINCT:
+        return self.order_submissions(submissions)
 
 
 class FilterProfilesForm(forms.ModelForm):
@@ -495,43 +488,32 @@ class FilterProfilesForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         assert isinstance(self.instance, Conference)
-        countries_dict = dict(countries)
-
-        self.fields['countries'].choices = [
-            (code, countries_dict[code]) for code in
-            Profile.objects.filter(country__isnull=False).values_list(
-                'country', flat=True).order_by('country').distinct()]
-
-        self.fields['affiliations'].choices = [
-            (aff, aff) for aff in
-            Profile.objects.values_list('affiliation', flat=True).order_by(
-                'affiliation').distinct() if aff]
+        facets = get_profile_facets()
+        self.fields['countries'].choices = facet_choices(facets['countries'])
+        self.fields['affiliations'].choices = facet_choices(
+            facets['affiliations'])
+
+    def get_ordering(self):
+        """Get a pair `(key, descending)` defining the order of profiles
+        returned by `apply()`. Ties are ordered by `pk`.
+        """
+        descending = self.cleaned_data['direction'] == 'DESC'
+        if self.cleaned_data['order'] == self.ORDER_BY_NAME:
+            return 'full_name', descending
+        return 'pk', descending
 
     def order_profiles(self, profiles):
-        order = self.cleaned_data['order']
-        direction = '-' if self.cleaned_data['direction'] == 'DESC' else ''
-        if order == self.ORDER_BY_ID or not order:
-            return profiles.order_by(f'{direction}pk')
-
-        elif order == self.ORDER_BY_NAME:
+        key, descending = self.get_ordering()
+        if key == 'full_name':
             profiles = profiles.annotate(
                 full_name=Concat(
                     'last_name', Value(' '), 'first_name',
                     output_field=models.CharField()))
-            return profiles.order_by(f'{direction}full_name')
-
-        return profiles
+        direction = '-' if descending else ''
+        return profiles.order_by(f'{direction}{key}', f'{direction}pk')
 
     def apply_term(self, profiles):
-        term = self.cleaned_data['term']
-        for word in term.lower().split():
-            profiles = profiles.filter(
-                Q(pk__icontains=word) | Q(first_name__icontains=word) |
-                Q(last_name__icontains=word) |
-                Q(first_name_rus__icontains=word) |
-                Q(last_name_rus__icontains=word) |
-                Q(middle_name_rus__icontains=word))
-        return profiles
+        return filter_by_term(profiles, self.cleaned_data['term'])
 
     def apply_countries(self, profiles):
         data = self.cleaned_data['countries']
@@ -648,33 +630,147 @@ class AssignReviewerForm(forms.Form):
         self.review_stage = review_stage
         submission = self.review_stage.submission
 
-        # Fill available reviewers - neither already assigned, nor authors:
+        # Fill available reviewers of the conference - neither already
+        # assigned, nor authors. Least loaded reviewers go first:
         reviews = review_stage.review_set.all()
         assigned_reviewers = reviews.values_list('reviewer', flat=True)
         authors_users = submission.authors.values_list('user', flat=True)
-        available_reviewers = Reviewer.objects.exclude(
+        self.available_reviewers = Reviewer.objects.filter(
+            conference_id=submission.conference_id, user__isnull=False
+        ).exclude(
             Q(pk__in=assigned_reviewers) | Q(user__in=authors_users)
-        )
-        profiles = {
-            rev: rev.user.profile for rev in available_reviewers
-        }
-        reviewers = list(available_reviewers)
-        reviewers.sort(key=lambda r: r.reviews.count())
+        ).select_related('user__profile').annotate(
+            num_reviews=Count('reviews')
+        ).order_by('num_reviews', 'pk')
+
+        # Reviewers with the most similar papers and without conflicts of
+        # interest go before others (see `review.affinity`):
+        self.suggestions = dict(suggest_reviewers(
+            submission, limit=settings.NUM_SUGGESTED_REVIEWERS))
+        reviewers = sorted(self.available_reviewers,
+                           key=lambda r: -self.suggestions.get(r.pk, 0))
         self.fields['reviewer'].choices = (
             (rev.pk,
-             f'{profiles[rev].get_full_name()} ({rev.reviews.count()}) - '
-             f'{profiles[rev].affiliation}, '
-             f'{profiles[rev].get_country_display()}')
+             f'{rev.user.profile.get_full_name()} ({rev.num_reviews}) - '
+             f'{rev.user.profile.affiliation}, '
+             f'{rev.user.profile.get_country_display()}' + (
+                 f' [{self.suggestions[rev.pk]:.0%} match]'
+                 if rev.pk in self.suggestions else ''))
             for rev in reviewers
         )
 
     def save(self):
-        reviewer = Reviewer.objects.get(pk=self.cleaned_data['reviewer'])
+        reviewer = self.available_reviewers.get(
+            pk=self.cleaned_data['reviewer'])
         review = Review.objects.create(
             reviewer=reviewer, stage=self.review_stage)
         return review
 
 
+class AssignReviewersForm(forms.Form):
+    max_load = forms.IntegerField(
+        required=False, min_value=1,
+        label=_('Maximum number of reviews per reviewer'),
+        help_text=_('Including already assigned reviews. If empty, reviews '
+                    'are spread evenly between reviewers'))
+
+    def __init__(self, *args, conference=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        assert conference is not None
+        self.conference = conference
+
+    def plan(self):
+        """Build the assignment plan without changing anything (dry run).
+
+        :return: `review.assignment.AssignmentPlan`
+        """
+        return plan_assignment(
+            self.conference, max_load=self.cleaned_data['max_load'])
+
+
+class ApplyAssignmentForm(forms.Form):
+    """Apply the plan shown in the preview. Its pairs are signed and posted
+    back, so exactly the previewed reviews are created instead of a plan
+    recomputed from data changed in the meantime.
+    """
+    SALT = 'chair.forms.ApplyAssignmentForm'
+
+    assignments = forms.CharField(widget=forms.HiddenInput)
+
+    def __init__(self, *args, conference=None, plan=None, **kwargs):
+        assert conference is not None
+        if plan is not None:
+            kwargs['initial'] = {'assignments': signing.dumps({
+                'conference': conference.pk,
+                'max_load': plan.max_load,
+                'assignments': plan.assignments,
+            }, salt=self.SALT, compress=True)}
+        super().__init__(*args, **kwargs)
+        self.conference = conference
+
+    def clean_assignments(self):
+        try:
+            data = signing.loads(
+                self.cleaned_data['assignments'], salt=self.SALT)
+        except signing.BadSignature:
+            data = None
+        if not data or data.get('conference') != self.conference.pk:
+            raise forms.ValidationError(
+                _('The plan is broken, please preview it again'))
+        return data
+
+    def plan(self):
+        """Restore the previewed plan (only pairs and the load limit).
+
+        :return: `review.assignment.AssignmentPlan`
+        """
+        data = self.cleaned_data['assignments']
+        assignments = [tuple(pair) for pair in data['assignments']]
+        return AssignmentPlan(
+            self.conference, data['max_load'], assignments,
+            missing={}, loads={}, common_topics={}, stages={})
+
+
+class UpdateSubmissionsForm(forms.Form):
+    decision_type = forms.ModelChoiceField(
+        queryset=ReviewDecisionType.objects.none(), required=False,
+        label=_('Decision'),
+        help_text=_('Submissions get accepted or rejected status'))
+    status = forms.ChoiceField(
+        choices=(('', '---------'),) + Submission.STATUS_CHOICE,
+        required=False, label=_('Status'))
+
+    def __init__(self, *args, conference=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        assert conference is not None
+        self.conference = conference
+        self.fields['decision_type'].queryset = \
+            ReviewDecisionType.objects.filter(conference=conference)
+        self.fields['decision_type'].label_from_instance = \
+            lambda dt: f'{dt.get_decision_display()}: {dt.description}'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if bool(cleaned_data.get('decision_type')) == \
+                bool(cleaned_data.get('status')):
+            raise forms.ValidationError(
+                _('Select either a decision, or a status'))
+        return cleaned_data
+
+    def apply(self, submissions, sender=None):
+        """Update the submissions in bulk (see `review.decisions`).
+
+        :return: a list of PKs of updated submissions
+        """
+        decision_type = self.cleaned_data['decision_type']
+        if decision_type:
+            return apply_decision(
+                self.conference, submissions, decision_type, sender=sender)
+        return update_status(
+            self.conference, submissions, self.cleaned_data['status'],
+            sender=sender)
+
+
 # class FilterReviewsForm(Form):
 #     Q1 = 'Q1'
 #     Q2 = 'Q2'
@@ -895,95 +991,119 @@ class ExportSubmissionsForm(Form):
         self.fields['columns'].initial = [
             self.ORDER_COLUMN, self.ID_COLUMN, self.TITLE_COLUMN,
             self.AUTHORS_COLUMN, self.STATUS_COLUMN]
-        countries_list = list(
-            set(p.country for p in Profile.objects.all() if p.country))
-        countries_list.sort(key=lambda cnt: cnt.name)
-        self.fields['countries'].choices = [
-            (cnt.code, cnt.name) for cnt in countries_list]
+        self.fields['countries'].choices = sorted(
+            ((code, name) for code, name, num in
+             get_profile_facets()['countries']), key=lambda item: item[1])
         self.fields['topics'].choices = [
             (t.pk, t.name) for t in self.conference.topic_set.all()]
 
     def apply(self, request):
+        """Generate records (dictionaries `column -> value`) of the
+        submissions matching the form. Submissions are fetched in chunks
+        while records are consumed."""
         submissions = Submission.objects.filter(conference=self.conference)
         if self.cleaned_data['status']:
             submissions = submissions.filter(
                 status__in=self.cleaned_data['status'])
         if self.cleaned_data['countries']:
-            submissions = submissions.filter(
-                authors__user__profile__country__in=self.cleaned_data[
-                    'countries'])
+            submissions = submissions.annotate(has_countries=Exists(
+                Author.objects.filter(
+                    submission=OuterRef('pk'),
+                    user__profile__country__in=self.cleaned_data['countries'])
+            )).filter(has_countries=True)
         if self.cleaned_data['topics']:
-            submissions = submissions.filter(
-                topics__in=[int(t) for t in self.cleaned_data['topics']])
-        submissions = submissions.distinct().order_by('pk')
+            submissions = submissions.annotate(has_topics=Exists(
+                Submission.topics.through.objects.filter(
+                    submission=OuterRef('pk'),
+                    topic__in=[int(t) for t in self.cleaned_data['topics']])
+            )).filter(has_topics=True)
+        submissions = submissions.order_by('pk')
 
-        order = 0
-        result = []
         columns = self.cleaned_data['columns']
-
-        profiles = {
-            u.pk: u.profile for u in User.objects.filter(
-                authorship__submission__conference=self.conference)
-        }
-
-        def get_user_name(profile):
-            return f'{profile.last_name} {profile.first_name}'
-
-        for sub in submissions:
-            order += 1
+        countries_dict = dict(countries)
+        status_dict = dict(Submission.STATUS_CHOICE)
+        language_dict = dict(SubmissionType.LANGUAGES)
+
+        # Authors and topics of all submissions are loaded with one query
+        # each, while submissions are fetched as plain rows in chunks.
+        # Note, that `prefetch_related()` can't be used together with
+        # `iterator()`, and related rows are much smaller anyway.
+        authors = defaultdict(list)
+        if self.AUTHORS_COLUMN in columns or self.COUNTRY_COLUMN in columns:
+            for sub_pk, last_name, first_name, country in (
+                    Author.objects.filter(submission__in=submissions)
+                    .order_by('submission_id', 'order')
+                    .values_list('submission_id', 'user__profile__last_name',
+                                 'user__profile__first_name',
+                                 'user__profile__country')):
+                authors[sub_pk].append((f'{last_name} {first_name}',
+                                        countries_dict.get(country, '')))
+
+        topics = defaultdict(list)
+        if self.TOPICS_COLUMN in columns:
+            for sub_pk, topic_name in (
+                    Submission.topics.through.objects
+                    .filter(submission__in=submissions)
+                    .order_by('submission_id', 'topic__order', 'topic_id')
+                    .values_list('submission_id', 'topic__name')):
+                topics[sub_pk].append(topic_name)
+
+        if self.REVIEW_SCORE_COLUMN in columns:
+            submissions = submissions.annotate(review_score=Subquery(
+                ReviewStage.objects.filter(submission=OuterRef('pk'))
+                .order_by('pk').values('score')[:1],
+                output_field=models.FloatField()))
+        else:
+            submissions = submissions.annotate(
+                review_score=Value(None, output_field=models.FloatField()))
+
+        rows = submissions.values(
+            'pk', 'title', 'status', 'stype', 'stype__language',
+            'review_score')
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+        for order, sub in enumerate(rows.iterator(chunk_size=chunk_size)):
             record = {}
-            authors = sub.authors.all().order_by('order')
-            # decision = sub.old_decision.first()
+            sub_pk = sub['pk']
 
             if self.ORDER_COLUMN in columns:
-                record[self.ORDER_COLUMN] = order
+                record[self.ORDER_COLUMN] = order + 1
 
             if self.ID_COLUMN in columns:
-                record[self.ID_COLUMN] = sub.pk
+                record[self.ID_COLUMN] = sub_pk
 
             if self.TITLE_COLUMN in columns:
-                record[self.TITLE_COLUMN] = sub.title
+                record[self.TITLE_COLUMN] = sub['title']
 
             if self.AUTHORS_COLUMN in columns:
-                names = [get_user_name(profiles[a.user_id]) for a in authors]
-                record[self.AUTHORS_COLUMN] = '; '.join(names)
+                record[self.AUTHORS_COLUMN] = '; '.join(
+                    name for name, country in authors[sub_pk])
 
             if self.COUNTRY_COLUMN in columns:
-                countries_list = [
-                    profiles[a.user_id].get_country_display() for a in authors]
-                countries_list = list(set(countries_list))  # remove duplicates
+                countries_list = list(set(  # remove duplicates
+                    country for name, country in authors[sub_pk]))
                 countries_list.sort()
                 record[self.COUNTRY_COLUMN] = '; '.join(countries_list)
 
             if self.STYPE_COLUMN in columns:
+                language = sub['stype__language']
                 record[self.STYPE_COLUMN] = (
-                    sub.stype.get_language_display() if sub.stype else '')
+                    language_dict.get(language, language) if sub['stype']
+                    else '')
 
             if self.REVIEW_PAPER_COLUMN in columns:
                 record[self.REVIEW_PAPER_COLUMN] = request.build_absolute_uri(
-                    reverse('submissions:download-manuscript', args=[sub.pk]))
+                    reverse('submissions:download-manuscript', args=[sub_pk]))
 
             if self.REVIEW_SCORE_COLUMN in columns:
-                score = get_average_score(sub)
+                score = sub['review_score']
                 score_string = f'{score:.1f}' if score else '-'
                 record[self.REVIEW_SCORE_COLUMN] = score_string
 
             if self.STATUS_COLUMN in columns:
-                record[self.STATUS_COLUMN] = sub.get_status_display()
+                record[self.STATUS_COLUMN] = status_dict.get(
+                    sub['status'], sub['status'])
 
             if self.TOPICS_COLUMN in columns:
-                record[self.TOPICS_COLUMN] = '; '.join(sub.topics.values_list(
-                    'name', flat=True))
-
-            # if self.PTYPE_COLUMN in columns:
-            #     record[self.PTYPE_COLUMN] = (
-            #         decision.proc_type.name if (decision and decision.proc_type)
-            #         else '')
-            #
-            # if self.VOLUME_COLUMN in columns:
-            #     record[self.VOLUME_COLUMN] = (
-            #         decision.volume.name if (decision and decision.volume)
-            #         else '')
-
-            result.append(record)
-        return result
+                record[self.TOPICS_COLUMN] = '; '.join(topics[sub_pk])
+
+            yield record
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from conferences.models import Conference
+from review.assignment import plan_assignment
+
+
+class Command(BaseCommand):
+    help = 'Assign reviewers to all submissions under review, which miss ' \
+           'reviews, balancing reviewers load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-c', '--conference', type=int, required=True,
+                            help='Conference ID')
+        parser.add_argument('-m', '--max-load', type=int, default=None,
+                            help='Maximum number of reviews per reviewer')
+        parser.add_argument('-n', '--dry-run', action='store_true',
+                            help='Show the plan without assigning reviewers')
+
+    def handle(self, *args, **kwargs):
+        conference_id = kwargs['conference']
+        conference = Conference.objects.filter(pk=conference_id).first()
+        if conference is None:
+            self.stdout.write(self.style.ERROR(
+                f'! conference with ID={conference_id} not found'))
+            return
+
+        plan = plan_assignment(conference, max_load=kwargs['max_load'])
+        for stage_id, reviewer_id in plan.assignments:
+            submission_id = plan.stages[stage_id]['submission_id']
+            self.stdout.write(
+                f'- submission #{submission_id}: reviewer #{reviewer_id}, '
+                f'{plan.common_topics[(stage_id, reviewer_id)]} '
+                f'common topics')
+        for stage_id, num in plan.missing.items():
+            submission_id = plan.stages[stage_id]['submission_id']
+            self.stdout.write(self.style.WARNING(
+                f'! submission #{submission_id}: {num} reviews missing'))
+
+        if kwargs['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'= finished (dry run): {len(plan.assignments)} reviews '
+                f'planned, max load {plan.max_load}'))
+            return
+        reviews = plan.apply()
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: {len(reviews)} reviews assigned, '
+            f'max load {plan.max_load}'))
@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chair.models import ReviewReport
+from chair.reports import claim_review_report, generate_review_report, \
+    claim_queued_review_report, fail_abandoned_review_reports
+from conferences.models import Conference
+
+
+class Command(BaseCommand):
+    help = 'Build the DOCX review report of the conference, unless the ' \
+           'stored one is up to date. Without --conference, runs forever ' \
+           'building reports queued by chairs; with --once, exits when ' \
+           'the queue is empty'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-c', '--conference', type=int, default=None,
+                            help='Conference ID')
+        parser.add_argument('-f', '--force', action='store_true',
+                            help='Rebuild even if the report is up to date')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when there are no more queued reports')
+        parser.add_argument(
+            '--poll', type=float, default=2.0,
+            help='Seconds to wait before checking an empty queue again')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['conference'] is None:
+            self.drain_queue(kwargs['once'], kwargs['poll'])
+            return
+
+        conference_id = kwargs['conference']
+        conference = Conference.objects.filter(pk=conference_id).first()
+        if conference is None:
+            self.stdout.write(self.style.ERROR(
+                f'! conference with ID={conference_id} not found'))
+            return
+
+        report, _ = ReviewReport.objects.get_or_create(conference=conference)
+        if report.is_up_to_date() and not kwargs['force']:
+            self.stdout.write(self.style.SUCCESS(
+                f'= finished: report is up to date, {report.file.name}'))
+            return
+        if not claim_review_report(report):
+            self.stdout.write(self.style.ERROR(
+                '! report is being built by another process'))
+            return
+
+        generate_review_report(report)
+        report.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: report saved to {report.file.name}'))
+
+    def drain_queue(self, once, poll):
+        num_built, num_failed = 0, 0
+        while True:
+            fail_abandoned_review_reports()
+            report = claim_queued_review_report()
+            if report is None:
+                if once:
+                    break
+                time.sleep(poll)
+                continue
+
+            try:
+                generate_review_report(report)
+                num_built += 1
+            except Exception as error:
+                # The error is saved in the report and shown to the chair:
+                num_failed += 1
+                self.stdout.write(self.style.ERROR(
+                    f'! failed report of conference ID={report.conference_id}'
+                    f': {error}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: built {num_built} reports, '
+            f'failed {num_failed} reports'))
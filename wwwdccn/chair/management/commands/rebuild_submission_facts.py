@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from chair.facts import rebuild_submission_facts
+
+
+class Command(BaseCommand):
+    help = 'Recompute facts (counters and warnings) of all submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of submissions processed at once')
+
+    def handle(self, *args, **kwargs):
+        num_submissions = rebuild_submission_facts(
+            chunk_size=max(kwargs['chunk_size'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: updated facts of {num_submissions} submissions'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from chair.forms import FilterSubmissionsForm, UpdateSubmissionsForm
+from conferences.models import Conference
+
+
+class Command(BaseCommand):
+    help = 'Set a review decision or a status of the conference submissions ' \
+           'selected by the chair submissions filter at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-c', '--conference', type=int, required=True,
+                            help='Conference ID')
+        parser.add_argument('-d', '--decision', type=int, default=None,
+                            help='Review decision type ID')
+        parser.add_argument('-s', '--status', default=None,
+                            help='Submission status (e.g., ACCEPT)')
+        parser.add_argument('-f', '--filter', default='',
+                            help='Query string of the submissions filter '
+                                 '(e.g., "status=REVIEW&quartiles=Q1"), '
+                                 'all submissions by default')
+        parser.add_argument('-n', '--dry-run', action='store_true',
+                            help='Only count submissions selected by filter')
+
+    def handle(self, *args, **kwargs):
+        conference_id = kwargs['conference']
+        conference = Conference.objects.filter(pk=conference_id).first()
+        if conference is None:
+            self.stdout.write(self.style.ERROR(
+                f'! conference with ID={conference_id} not found'))
+            return
+
+        filter_form = FilterSubmissionsForm(
+            QueryDict(kwargs['filter']), instance=conference)
+        form = UpdateSubmissionsForm({
+            'decision_type': kwargs['decision'] or '',
+            'status': kwargs['status'] or '',
+        }, conference=conference)
+        for f in (filter_form, form):
+            if not f.is_valid():
+                for field, errors in f.errors.items():
+                    self.stdout.write(self.style.ERROR(
+                        f'! {field}: {" ".join(errors)}'))
+                return
+        submissions = filter_form.apply(conference.submission_set.all())
+
+        if kwargs['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'= finished (dry run): {submissions.count()} submissions '
+                f'selected'))
+            return
+        pks = form.apply(submissions)
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: {len(pks)} submissions updated'))
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:17
+
+import chair.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('conferences', '0018_remove_artifactdescriptor_materials_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewReport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('empty', 'Not built'), ('running', 'Building'), ('ready', 'Ready'), ('failed', 'Failed')], default='empty', max_length=16)),
+                ('revision', models.PositiveIntegerField(default=0)),
+                ('file_revision', models.PositiveIntegerField(blank=True, null=True)),
+                ('file', models.FileField(blank=True, upload_to=chair.models.get_review_report_path)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('conference', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review_report', to='conferences.Conference')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0009_remove_descriptor_from_attachment'),
+        ('chair', '0001_review_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionFacts',
+            fields=[
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='facts', serialize=False, to='submissions.Submission')),
+                ('num_authors', models.PositiveIntegerField(default=0)),
+                ('num_countries', models.PositiveIntegerField(default=0)),
+                ('num_reviews_required', models.PositiveIntegerField(default=0)),
+                ('num_reviews_assigned', models.PositiveIntegerField(default=0)),
+                ('num_reviews_submitted', models.PositiveIntegerField(default=0)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('num_missing_mandatory_artifacts', models.PositiveIntegerField(default=0)),
+                ('num_missing_optional_artifacts', models.PositiveIntegerField(default=0)),
+                ('warnings', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
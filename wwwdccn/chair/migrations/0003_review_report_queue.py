@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-17 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chair', '0002_submission_facts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reviewreport',
+            name='status',
+            field=models.CharField(choices=[('empty', 'Not built'), ('queued', 'Queued'), ('running', 'Building'), ('ready', 'Ready'), ('failed', 'Failed')], default='empty', max_length=16),
+        ),
+    ]
@@ -1,3 +1,309 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete, \
+    m2m_changed
+from django.dispatch import receiver
 
-# Create your models here.
+from chair.facets import invalidate_conference_facets, \
+    invalidate_profile_facets
+from conferences.models import Conference, Topic, SubmissionType, \
+    ProceedingType, ProceedingVolume, ArtifactDescriptor
+from proceedings.models import CameraReady, Artifact
+from review.models import Review, ReviewStage, reviews_created
+from submissions.models import Submission, Author, Attachment, \
+    submissions_updated
+from users.models import Profile
+
+
+def get_review_report_path(instance, filename):
+    root = settings.MEDIA_PRIVATE_ROOT
+    return f'{root}/{instance.conference_id}/reports/{filename}'
+
+
+class ReviewReport(models.Model):
+    """DOCX review report of the conference, built by `build_review_report`
+    worker command (see `chair.reports`).
+
+    `revision` is incremented each time fields shown in the report are
+    changed in a submission, review stage or review of the conference (or
+    any of them is deleted), and `file_revision` keeps the revision the file
+    was built at. If they are equal, the file is up to date and can be
+    reused. Otherwise, the stale file is still available for download until
+    the report is rebuilt.
+    """
+    EMPTY = 'empty'
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    READY = 'ready'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (EMPTY, 'Not built'),
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Building'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    )
+
+    conference = models.OneToOneField(
+        Conference, on_delete=models.CASCADE, related_name='review_report')
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=EMPTY)
+    revision = models.PositiveIntegerField(default=0)
+    file_revision = models.PositiveIntegerField(null=True, blank=True)
+    file = models.FileField(upload_to=get_review_report_path, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    def is_up_to_date(self):
+        return bool(self.file) and self.file_revision == self.revision
+
+
+class SubmissionFacts(models.Model):
+    """Derived data of the submission used by filters, feed cards and
+    warnings, so they don't need to join authors, reviews and artifacts.
+
+    Facts are updated by receivers below when the transaction with the
+    change commits (or immediately, outside of transactions), see
+    `chair.facts.update_submission_facts()` and `rebuild_submission_facts`
+    command.
+
+    Review counters and the score are taken from the first review stage.
+    Bits of `warnings` are set only if they are valuable for the current
+    submission status, e.g. `UNASSIGNED_REVIEWERS` is set only for
+    submissions under review.
+    """
+    MISSING_TITLE = 1 << 0
+    MISSING_ABSTRACT = 1 << 1
+    NO_TOPICS = 1 << 2
+    NO_TYPE = 1 << 3
+    NO_REVIEW_MANUSCRIPT = 1 << 4
+    UNASSIGNED_REVIEWERS = 1 << 5
+    INCOMPLETE_REVIEWS = 1 << 6
+    MISSING_ARTIFACT = 1 << 7
+    MISSING_OPT_ARTIFACT = 1 << 8
+
+    submission = models.OneToOneField(
+        Submission, on_delete=models.CASCADE, primary_key=True,
+        related_name='facts')
+    num_authors = models.PositiveIntegerField(default=0)
+    num_countries = models.PositiveIntegerField(default=0)
+    num_reviews_required = models.PositiveIntegerField(default=0)
+    num_reviews_assigned = models.PositiveIntegerField(default=0)
+    num_reviews_submitted = models.PositiveIntegerField(default=0)
+    score = models.FloatField(null=True, blank=True)
+    num_missing_mandatory_artifacts = models.PositiveIntegerField(default=0)
+    num_missing_optional_artifacts = models.PositiveIntegerField(default=0)
+    warnings = models.PositiveIntegerField(default=0)
+
+    def has_warning(self, flag):
+        return bool(self.warnings & flag)
+
+    @property
+    def num_missing_reviews(self):
+        return max(0, self.num_reviews_required - self.num_reviews_assigned)
+
+    @property
+    def num_unfinished_reviews(self):
+        return self.num_reviews_assigned - self.num_reviews_submitted
+
+
+def _touch_review_reports(**filters):
+    ReviewReport.objects.filter(**filters).update(revision=F('revision') + 1)
+
+
+# Fields shown in the review report, saves changing none of them don't
+# outdate it:
+REPORT_SUBMISSION_FIELDS = ('title', 'abstract', 'status', 'stype',
+                            'conference')
+REPORT_REVIEW_STAGE_FIELDS = ('score', 'submission')
+REPORT_REVIEW_FIELDS = ('stage', 'reviewer', 'submitted', 'details',
+                        'technical_merit', 'clarity', 'originality',
+                        'relevance')
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Submission)
+def outdate_report_on_submission_change(sender, instance, signal, **kwargs):
+    if signal is post_delete or \
+            instance.has_changed(*REPORT_SUBMISSION_FIELDS):
+        _touch_review_reports(conference_id=instance.conference_id)
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=ReviewStage)
+def outdate_report_on_review_stage_change(sender, instance, signal, **kwargs):
+    if signal is post_delete or \
+            instance.has_changed(*REPORT_REVIEW_STAGE_FIELDS):
+        _touch_review_reports(conference__submission=instance.submission_id)
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Review)
+def outdate_report_on_review_change(sender, instance, signal, **kwargs):
+    if signal is post_delete or instance.has_changed(*REPORT_REVIEW_FIELDS):
+        _touch_review_reports(
+            conference__submission__reviewstage=instance.stage_id)
+
+
+# noinspection PyUnusedLocal
+@receiver(reviews_created, sender=Review)
+def outdate_report_on_reviews_created(sender, conference, **kwargs):
+    _touch_review_reports(conference=conference)
+
+
+# noinspection PyUnusedLocal
+@receiver(submissions_updated, sender=Submission)
+def outdate_report_on_submissions_update(sender, conference, **kwargs):
+    _touch_review_reports(conference=conference)
+
+
+#
+# Filter facets (see `chair.facets`):
+#
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Submission)
+@receiver([post_save, post_delete], sender=Topic)
+@receiver([post_save, post_delete], sender=SubmissionType)
+@receiver([post_save, post_delete], sender=ProceedingType)
+def outdate_facets_on_conference_item_change(sender, instance, **kwargs):
+    invalidate_conference_facets(instance.conference_id)
+
+
+# noinspection PyUnusedLocal
+@receiver(submissions_updated, sender=Submission)
+def outdate_facets_on_submissions_update(sender, conference, **kwargs):
+    invalidate_conference_facets(conference.pk)
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=ProceedingVolume)
+def outdate_facets_on_volume_change(sender, instance, **kwargs):
+    invalidate_conference_facets(ProceedingType.objects.filter(
+        pk=instance.type_id).values_list('conference_id', flat=True).first())
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=ArtifactDescriptor)
+def outdate_facets_on_artifact_descriptor_change(sender, instance, **kwargs):
+    invalidate_conference_facets(ProceedingType.objects.filter(
+        pk=instance.proc_type_id).values_list(
+        'conference_id', flat=True).first())
+
+
+# noinspection PyUnusedLocal
+@receiver(m2m_changed, sender=Submission.topics.through)
+def outdate_facets_on_submission_topics_change(sender, instance, action,
+                                               **kwargs):
+    # Instance is either a submission or a topic, both have a conference:
+    if action.startswith('post_'):
+        invalidate_conference_facets(instance.conference_id)
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Author)
+def outdate_facets_on_author_change(sender, instance, **kwargs):
+    invalidate_conference_facets(Submission.objects.filter(
+        pk=instance.submission_id).values_list(
+        'conference_id', flat=True).first())
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Profile)
+def outdate_facets_on_profile_change(sender, instance, **kwargs):
+    # Profiles are saved each time the user logs in, so facets and facts are
+    # updated only if country or affiliation were changed:
+    if kwargs['signal'] is post_delete or \
+            instance.has_changed('country', 'affiliation'):
+        invalidate_profile_facets()
+        if instance.has_changed('country'):
+            _update_facts(Author.objects.filter(
+                user_id=instance.user_id).values_list(
+                'submission_id', flat=True))
+
+
+#
+# Submission facts (see `chair.facts`):
+#
+def _update_facts(pks):
+    from chair.facts import schedule_facts_update
+    schedule_facts_update(pks)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Submission)
+def update_facts_on_submission_save(sender, instance, **kwargs):
+    _update_facts([instance.pk])
+
+
+# noinspection PyUnusedLocal
+@receiver(submissions_updated, sender=Submission)
+def update_facts_on_submissions_update(sender, pks, **kwargs):
+    _update_facts(pks)
+
+
+# noinspection PyUnusedLocal
+@receiver(m2m_changed, sender=Submission.topics.through)
+def update_facts_on_submission_topics_change(sender, instance, action,
+                                             reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Links are deleted before `post_clear`, so remember submissions
+        # of the topic now and update them when it is cleared:
+        instance._cleared_submission_pks = list(
+            instance.submission_set.values_list('pk', flat=True))
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        _update_facts([instance.pk])
+    elif action == 'post_clear':
+        _update_facts(instance.__dict__.pop('_cleared_submission_pks', []))
+    else:
+        _update_facts(pk_set)
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=ReviewStage)
+@receiver([post_save, post_delete], sender=CameraReady)
+@receiver([post_save, post_delete], sender=Attachment)
+def update_facts_on_submission_item_change(sender, instance, **kwargs):
+    _update_facts([instance.submission_id])
+
+
+# noinspection PyUnusedLocal
+@receiver(pre_delete, sender=Topic)
+def update_facts_on_topic_delete(sender, instance, **kwargs):
+    # Links to submissions are deleted without `m2m_changed` signal:
+    _update_facts(instance.submission_set.values_list('pk', flat=True))
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Review)
+def update_facts_on_review_change(sender, instance, **kwargs):
+    _update_facts(ReviewStage.objects.filter(
+        pk=instance.stage_id).values_list('submission_id', flat=True))
+
+
+# noinspection PyUnusedLocal
+@receiver(reviews_created, sender=Review)
+def update_facts_on_reviews_created(sender, reviews, **kwargs):
+    _update_facts(ReviewStage.objects.filter(
+        pk__in={review.stage_id for review in reviews}
+    ).values_list('submission_id', flat=True))
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Artifact)
+def update_facts_on_artifact_change(sender, instance, **kwargs):
+    _update_facts(CameraReady.objects.filter(
+        pk=instance.camera_ready_id).values_list('submission_id', flat=True))
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=ArtifactDescriptor)
+def update_facts_on_artifact_descriptor_save(sender, instance, **kwargs):
+    _update_facts(CameraReady.objects.filter(
+        proc_type=instance.proc_type_id).values_list(
+        'submission_id', flat=True))
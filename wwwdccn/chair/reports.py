@@ -0,0 +1,269 @@
+"""Review report of the conference in DOCX format.
+
+Views only queue the report (see `queue_review_report()`), and it is built
+by `build_review_report` command running as a worker, like `mailworker`.
+The file is stored in `ReviewReport.file` under `MEDIA_PRIVATE_ROOT`.
+While nothing shown in the report changes, the stored file is reused.
+"""
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q, Prefetch
+from django.utils import timezone
+from django_countries import countries
+from docx import Document
+from docx.enum.table import WD_ROW_HEIGHT_RULE
+from docx.shared import Cm
+
+from chair.models import ReviewReport
+from review.models import ReviewStats, ReviewStage, Review
+from review.utilities import get_review_stage
+from submissions.models import Submission
+from users.models import Profile
+
+
+def build_review_report(conference):
+    """Build the review report document.
+
+    The number of queries doesn't depend on the number of submissions:
+    submissions are loaded with their authors, review stages and reviews
+    prefetched, and only profiles of authors and reviewers are loaded.
+
+    :param conference: `Conference` instance
+    :return: `docx.Document`
+    """
+    stats, _ = ReviewStats.objects.get_or_create(conference=conference)
+
+    #
+    # Create document, write title and key statistics:
+    #
+    document = Document()
+    document.add_heading(f'{conference.short_name} Review Report')
+    document.add_paragraph('')
+    table = document.add_table(rows=9, cols=2)
+    table.rows[0].cells[0].text = 'Report date'
+    table.rows[0].cells[1].text = datetime.now().strftime('%d %b %Y, %H:%M')
+    for i, (key, details, dtype) in enumerate(zip(
+            ('average_score', 'q1_score', 'median_score', 'q3_score',
+             'num_submissions_reviewed',
+             'num_submissions_with_incomplete_reviews',
+             'num_submissions_with_missing_reviewers'),
+            ('Average score', 'Q1 (lowest)', 'Q2 (median)', 'Q3 (highest)',
+             'Number of submissions reviewed',
+             'Number of submissions with incomplete reviews',
+             'Number of submissions missing one or more reviewers'),
+            ('float', 'float', 'float', 'float', 'int', 'int', 'int')
+    )):
+        table.rows[i + 1].cells[0].text = details
+        if dtype == 'float':
+            value = f'{getattr(stats, key, 0.0):.2f}'
+        elif dtype == 'int':
+            value = f'{getattr(stats, key, 0):d}'
+        else:
+            value = getattr(stats, key, '')
+        table.rows[i + 1].cells[1].text = value
+    document.add_page_break()
+
+    #
+    # Write submissions and their reviews:
+    #
+    submissions = list(conference.submission_set.filter(status__in={
+        Submission.UNDER_REVIEW, Submission.ACCEPTED, Submission.REJECTED,
+        Submission.IN_PRINT, Submission.PUBLISHED}
+    ).select_related('stype').prefetch_related(
+        'authors',
+        Prefetch('reviewstage_set',
+                 queryset=ReviewStage.objects.order_by('pk')),
+        Prefetch('reviewstage_set__review_set',
+                 queryset=Review.objects.select_related(
+                     'reviewer').order_by('pk')),
+    ).order_by('pk'))
+
+    profiles = {profile.user_id: profile for profile in Profile.objects.filter(
+        Q(user__authorship__submission__conference=conference) |
+        Q(user__reviewer__conference=conference)
+    ).distinct()}
+    countries_dict = dict(countries)
+
+    def get_full_name(user_id):
+        profile = profiles.get(user_id)
+        return f'{profile.last_name} {profile.first_name}' if profile else ''
+
+    for submission in submissions:
+        stage = get_review_stage(submission)
+        reviews = list(stage.review_set.all()) if stage else []
+        num_reviews_required = (
+            submission.stype.num_reviews if submission.stype else 0)
+        num_reviews_submitted = len([rev for rev in reviews if rev.submitted])
+        score = stage.score if stage and stage.score else 0
+
+        try:
+            document.add_heading(
+                f'#{submission.pk}: {submission.title}', level=1)
+        except ValueError:
+            document.add_heading(
+                f'#{submission.pk}: [title hidden due to illegal characters',
+                level=1)
+
+        p = document.add_paragraph()
+        p.add_run('Status: ').bold = True
+        p.add_run(f'{submission.get_status_display()}')
+
+        p = document.add_paragraph()
+        p.add_run('Review Score: ').bold = True
+        p.add_run(f'{score:.2f}')
+
+        p = document.add_paragraph()
+        p.add_run('Reviews finished / assigned / required: ').bold = True
+        p.add_run(f'{num_reviews_submitted} / '
+                  f'{len(reviews)} / '
+                  f'{num_reviews_required}')
+
+        p = document.add_paragraph()
+        p.add_run('Authors: ').bold = True
+        for i, author in enumerate(submission.authors.all()):
+            profile = profiles.get(author.user_id)
+
+            p = document.add_paragraph(f'{i+1}. ')
+            p.add_run(get_full_name(author.user_id))
+            if not profile:
+                continue
+            rus_name = ' '.join((
+                profile.last_name_rus, profile.first_name_rus,
+                profile.middle_name_rus)).strip()
+            if rus_name:
+                p.add_run(f' [{rus_name}]')
+
+            country = countries_dict.get(profile.country, '')
+            p.add_run(
+                f' ({country}, {profile.affiliation}, {profile.degree})'
+            ).italic = True
+
+        p = document.add_paragraph()
+        p.add_run('Abstract: ').bold = True
+        try:
+            document.add_paragraph(submission.abstract)
+        except ValueError:
+            document.add_paragraph(
+                '[Abstract is hidden because it contains illegal '
+                'characters and can not be processed in DOC-export]')
+
+        for i, review in enumerate(reviews):
+            name = get_full_name(review.reviewer.user_id)
+            document.add_heading(f'Review #{i+1} by {name}', level=2)
+            review_data = (
+                ('Technical merit', review.technical_merit),
+                ('Originality', review.originality),
+                ('Relevance', review.relevance),
+                ('Clarity', review.clarity),
+                ('Finished', 'Yes' if review.submitted else 'No')
+            )
+            table = document.add_table(rows=len(review_data), cols=2)
+            for row_i, row in enumerate(review_data):
+                table.rows[row_i].cells[0].text = row[0]
+                table.rows[row_i].cells[1].text = \
+                    '-' if row[1] is None else str(row[1])
+            for row in table.rows:
+                row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
+                row.height = Cm(0.7)
+
+            try:
+                document.add_paragraph(review.details)
+            except ValueError:
+                p = document.add_paragraph()
+                p.add_run(
+                    '[Review details hidden since they contain illegal '
+                    'characters and can not be processed in DOC-export]'
+                ).italic = True
+
+    return document
+
+
+def claim_review_report(report):
+    """Mark the report as being built, unless it is being built already.
+
+    If building started more than `REVIEW_REPORT_TIMEOUT` seconds ago,
+    the previous build is considered dead and the report may be claimed.
+
+    :return: `True` if the report was claimed
+    """
+    now = timezone.now()
+    timeout = timedelta(seconds=settings.REVIEW_REPORT_TIMEOUT)
+    num_claimed = ReviewReport.objects.filter(pk=report.pk).filter(
+        ~Q(status=ReviewReport.RUNNING) | Q(started_at__lt=now - timeout)
+    ).update(status=ReviewReport.RUNNING, started_at=now, error='')
+    return num_claimed > 0
+
+
+def generate_review_report(report):
+    """Build the report and save the file. The report must be claimed with
+    `claim_review_report()` before calling this function.
+    """
+    # Remember the revision before reading data, so if anything changes
+    # while the report is being built, it will be outdated:
+    revision = ReviewReport.objects.values_list(
+        'revision', flat=True).get(pk=report.pk)
+    try:
+        document = build_review_report(report.conference)
+        buffer = BytesIO()
+        document.save(buffer)
+    except Exception as error:
+        ReviewReport.objects.filter(pk=report.pk).update(
+            status=ReviewReport.FAILED, finished_at=timezone.now(),
+            error=f'{type(error).__name__}: {error}')
+        raise
+
+    old_file_name = report.file.name if report.file else ''
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report.file.save(f'reviews-{timestamp}.docx',
+                     ContentFile(buffer.getvalue()), save=False)
+    ReviewReport.objects.filter(pk=report.pk).update(
+        file=report.file.name, file_revision=revision,
+        status=ReviewReport.READY, finished_at=timezone.now())
+    if old_file_name and old_file_name != report.file.name:
+        report.file.storage.delete(old_file_name)
+
+
+def queue_review_report(report):
+    """Ask the worker to build the report, unless it is queued or being
+    built already.
+
+    :return: `True` if the report was queued
+    """
+    num_queued = ReviewReport.objects.filter(pk=report.pk).exclude(
+        status__in=(ReviewReport.QUEUED, ReviewReport.RUNNING)
+    ).update(status=ReviewReport.QUEUED, error='')
+    return num_queued > 0
+
+
+def claim_queued_review_report():
+    """Mark the first queued report as being built.
+
+    :return: claimed `ReviewReport` or `None` if nothing is queued
+    """
+    while True:
+        pk = ReviewReport.objects.filter(
+            status=ReviewReport.QUEUED).values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        # Another worker could claim the report since it was selected:
+        if ReviewReport.objects.filter(
+                pk=pk, status=ReviewReport.QUEUED
+        ).update(status=ReviewReport.RUNNING, started_at=timezone.now()):
+            return ReviewReport.objects.get(pk=pk)
+
+
+def fail_abandoned_review_reports(**filters):
+    """Mark reports being built longer than `REVIEW_REPORT_TIMEOUT` seconds
+    as failed, since the process building them most likely died.
+
+    :return: number of reports marked failed
+    """
+    deadline = timezone.now() - timedelta(
+        seconds=settings.REVIEW_REPORT_TIMEOUT)
+    return ReviewReport.objects.filter(
+        status=ReviewReport.RUNNING, started_at__lt=deadline, **filters
+    ).update(status=ReviewReport.FAILED, finished_at=timezone.now(),
+             error='The build was interrupted, please rebuild the report')
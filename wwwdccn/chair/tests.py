@@ -1,3 +1,188 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from chair.forms import ExportSubmissionsForm, ApplyAssignmentForm
+from chair.models import ReviewReport
+from chair.reports import queue_review_report, fail_abandoned_review_reports
+from chair_mail.models import SystemNotification, DEFAULT_NOTIFICATIONS_DATA
+from conferences.models import Conference, SubmissionType, Topic
+from review.assignment import AssignmentPlan
+from review.models import Reviewer, Review
+from submissions.models import Submission, Author
+from users.models import User
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ExportSubmissionsFormTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.conference = Conference.objects.create(
+            full_name='Test Conference', short_name='TC')
+        for name, data in DEFAULT_NOTIFICATIONS_DATA.items():
+            SystemNotification.objects.create(
+                name=name, conference=cls.conference, **data)
+        cls.stype = SubmissionType.objects.create(
+            conference=cls.conference, name='Full paper', language='EN')
+        cls.topics = [
+            Topic.objects.create(conference=cls.conference, name=f'T{i}')
+            for i in range(3)]
+        cls.users = []
+        for i in range(4):
+            user = User.objects.create_user(f'user{i}@example.com', 'pass')
+            user.profile.first_name = f'First{i}'
+            user.profile.last_name = f'Last{i}'
+            user.profile.country = 'RU' if i % 2 else 'DE'
+            user.save()
+            cls.users.append(user)
+        cls.reviewer = Reviewer.objects.create(
+            user=cls.users[0], conference=cls.conference)
+
+    def create_submissions(self, num):
+        for i in range(num):
+            submission = Submission.objects.create(
+                conference=self.conference, title=f'Paper {i}',
+                stype=self.stype)
+            submission.topics.set(self.topics[:2])
+            for order, user in enumerate(self.users[1:]):
+                Author.objects.create(
+                    submission=submission, user=user, order=order)
+            submission.status = Submission.UNDER_REVIEW
+            submission.save()
+            Review.objects.create(
+                reviewer=self.reviewer,
+                stage=submission.reviewstage_set.first(),
+                technical_merit=4, originality=3, relevance=5, clarity=4,
+                submitted=True)
+
+    def export(self):
+        request = RequestFactory().post('/')
+        columns = [column for column, _ in ExportSubmissionsForm.COLUMNS]
+        with CaptureQueriesContext(connection) as context:
+            form = ExportSubmissionsForm(
+                {'columns': columns}, conference=self.conference)
+            self.assertTrue(form.is_valid())
+            records = list(form.apply(request))
+        return records, len(context.captured_queries)
+
+    def test_export_takes_fixed_number_of_queries(self):
+        self.export()  # fill the cache with facets of the form
+        self.create_submissions(2)
+        records, num_queries = self.export()
+        self.assertEqual(len(records), 2)
+
+        self.create_submissions(10)
+        records, num_queries_after = self.export()
+        self.assertEqual(len(records), 12)
+        self.assertEqual(num_queries, num_queries_after)
+
+    def test_export_records(self):
+        self.create_submissions(1)
+        records, _ = self.export()
+        record = records[0]
+        self.assertEqual(record[ExportSubmissionsForm.AUTHORS_COLUMN],
+                         'Last1 First1; Last2 First2; Last3 First3')
+        self.assertEqual(record[ExportSubmissionsForm.COUNTRY_COLUMN],
+                         'Germany; Russia')
+        self.assertEqual(record[ExportSubmissionsForm.TOPICS_COLUMN],
+                         'T0; T1')
+        self.assertEqual(record[ExportSubmissionsForm.REVIEW_SCORE_COLUMN],
+                         '4.0')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ReviewReportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.conference = Conference.objects.create(
+            full_name='Test Conference', short_name='TC')
+        for name, data in DEFAULT_NOTIFICATIONS_DATA.items():
+            SystemNotification.objects.create(
+                name=name, conference=cls.conference, **data)
+        cls.stype = SubmissionType.objects.create(
+            conference=cls.conference, name='Full paper', language='EN')
+        user = User.objects.create_user('user@example.com', 'pass')
+        cls.submission = Submission.objects.create(
+            conference=cls.conference, title='Paper', stype=cls.stype)
+        Author.objects.create(submission=cls.submission, user=user, order=0)
+        cls.submission.status = Submission.UNDER_REVIEW
+        cls.submission.save()
+        cls.review = Review.objects.create(
+            reviewer=Reviewer.objects.create(
+                user=user, conference=cls.conference),
+            stage=cls.submission.reviewstage_set.first(), details='Good')
+        cls.report = ReviewReport.objects.create(conference=cls.conference)
+
+    def build_queued(self):
+        call_command('build_review_report', once=True, stdout=StringIO())
+        self.report.refresh_from_db()
+
+    def test_worker_builds_queued_report(self):
+        self.assertTrue(queue_review_report(self.report))
+        self.assertFalse(queue_review_report(self.report))
+        self.build_queued()
+        self.assertEqual(self.report.status, ReviewReport.READY)
+        self.assertTrue(self.report.is_up_to_date())
+
+    def test_only_report_fields_outdate_report(self):
+        queue_review_report(self.report)
+        self.build_queued()
+
+        submission = Submission.objects.get(pk=self.submission.pk)
+        submission.save()
+        review = Review.objects.get(pk=self.review.pk)
+        review.locked = True
+        review.save()
+        self.report.refresh_from_db()
+        self.assertTrue(self.report.is_up_to_date())
+
+        review.details = 'Very good'
+        review.save()
+        self.report.refresh_from_db()
+        self.assertFalse(self.report.is_up_to_date())
+        self.assertTrue(self.report.file)
+
+    def test_abandoned_build_fails(self):
+        ReviewReport.objects.filter(pk=self.report.pk).update(
+            status=ReviewReport.RUNNING,
+            started_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(fail_abandoned_review_reports(), 1)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.status, ReviewReport.FAILED)
+        self.assertTrue(queue_review_report(self.report))
+
+
+class ApplyAssignmentFormTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.conference = Conference.objects.create(
+            full_name='Test Conference', short_name='TC')
+        cls.other_conference = Conference.objects.create(
+            full_name='Other Conference', short_name='OC')
+
+    def post(self, plan, conference):
+        initial = ApplyAssignmentForm(conference=self.conference, plan=plan)
+        return ApplyAssignmentForm(
+            {'assignments': initial.initial['assignments']},
+            conference=conference)
+
+    def test_previewed_plan_restored(self):
+        plan = AssignmentPlan(
+            self.conference, 2, [(1, 2), (3, 4)], missing={}, loads={},
+            common_topics={}, stages={})
+        form = self.post(plan, self.conference)
+        self.assertTrue(form.is_valid())
+        restored = form.plan()
+        self.assertEqual(restored.assignments, [(1, 2), (3, 4)])
+        self.assertEqual(restored.max_load, 2)
+
+        self.assertFalse(self.post(plan, self.other_conference).is_valid())
+        form = ApplyAssignmentForm(
+            {'assignments': 'broken'}, conference=self.conference)
+        self.assertFalse(form.is_valid())
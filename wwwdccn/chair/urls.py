@@ -15,6 +15,9 @@ urlpatterns = [
     path('<int:conf_pk>/submissions/', submissions.list_submissions, name='submissions'),
     path('<int:conf_pk>/submissions/create/', submissions.create_submission, name='submission-create'),
     path('<int:conf_pk>/submissions/compose_redirect/', submissions.compose_redirect, name='submissions-compose-redirect'),
+    path('<int:conf_pk>/submissions/feed/', submissions.feed_items, name='submissions-feed'),
+    path('<int:conf_pk>/submissions/assign_reviewers/', submissions.assign_reviewers, name='submissions-assign-reviewers'),
+    path('<int:conf_pk>/submissions/update/', submissions.update_submissions, name='submissions-update'),
     path('submissions/<int:sub_pk>/feed_item/', submissions.feed_item, name='submission-feed-item'),
     path('submissions/<int:sub_pk>/overview/', submissions.overview, name='submission-overview'),
     path('submissions/<int:sub_pk>/metadata/', submissions.metadata, name='submission-metadata'),
@@ -49,4 +52,7 @@ urlpatterns = [
     #
     path('<int:conf_pk>/export/submissions/', export.export_submissions, name='export-submissions'),
     path('<int:conf_pk>/export/reviews_doc/', export.export_reviews_doc, name='export-reviews-doc'),
+    path('<int:conf_pk>/export/reviews_doc/status/', export.review_report_status, name='export-reviews-doc-status'),
+    path('<int:conf_pk>/export/reviews_doc/rebuild/', export.rebuild_review_report, name='export-reviews-doc-rebuild'),
+    path('<int:conf_pk>/export/reviews_doc/download/', export.download_review_report, name='export-reviews-doc-download'),
 ]
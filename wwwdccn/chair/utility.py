@@ -1,3 +1,8 @@
+import csv
+from datetime import datetime
+
+from django.http import StreamingHttpResponse
+
 from review.models import ReviewDecisionType
 
 
@@ -15,3 +20,71 @@ def get_allowed_decision_types(submission, decision):
         conference=conference_id,
         allowed_proceedings__in=submission.stype.possible_proceedings.all()
     ).distinct()
+
+
+def get_allowed_decision_types_of(submissions, decision, conference):
+    """Bulk version of `get_allowed_decision_types()`.
+
+    Decision types of the conference are loaded once, then matched against
+    possible proceedings of each submission type in Python. To avoid
+    per-submission queries, submissions should be loaded with
+    `select_related('stype')` and `prefetch_related(
+    'stype__possible_proceedings')`.
+
+    :param submissions: an iterable of `Submission` instances
+    :param decision: `ReviewDecisionType.ACCEPT` or `ReviewDecisionType.REJECT`
+    :param conference: `Conference` instance the submissions belong to
+    :return: a dictionary `submission.pk -> list of ReviewDecisionType`
+    """
+    decision_types = list(ReviewDecisionType.objects.filter(
+        decision=decision, conference=conference
+    ).prefetch_related('allowed_proceedings'))
+
+    if decision == ReviewDecisionType.REJECT:
+        return {sub.pk: decision_types for sub in submissions}
+
+    allowed = {
+        dt.pk: {pt.pk for pt in dt.allowed_proceedings.all()}
+        for dt in decision_types
+    }
+    ret = {}
+    for sub in submissions:
+        if sub.stype_id is None:
+            ret[sub.pk] = []
+            continue
+        possible = {pt.pk for pt in sub.stype.possible_proceedings.all()}
+        ret[sub.pk] = [dt for dt in decision_types if allowed[dt.pk] & possible]
+    return ret
+
+
+class _Echo:
+    """Pseudo-buffer for `csv.writer`, which returns the written line
+    instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def create_csv_response(header, rows, file_name_prefix):
+    """Create a `StreamingHttpResponse` with a CSV file attachment.
+
+    Rows are written while the response is being sent, so if `rows` is
+    a generator (e.g. over `queryset.iterator()`), the whole table is never
+    kept in memory.
+
+    :param header: a list of column names
+    :param rows: an iterable of rows, each row is a list of values
+    :param file_name_prefix: attachment name prefix, a timestamp is appended
+    :return: `StreamingHttpResponse`
+    """
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    response['Content-Disposition'] = \
+        f'attachment; filename="{file_name_prefix}-{timestamp}.csv"'
+    return response
@@ -1,27 +1,37 @@
 import functools
-import mimetypes
+from collections import defaultdict
 from urllib.parse import urlencode
 
 from django.conf import settings
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.db.models import Prefetch
 from django.http import Http404, JsonResponse, HttpResponse, \
-    HttpResponseServerError
+    HttpResponseServerError, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.views.decorators.http import require_GET, require_POST
 from django.utils.translation import ugettext_lazy as _
 
 from chair.forms import FilterSubmissionsForm, \
-    ChairUploadReviewManuscriptForm, AssignReviewerForm
-from chair.utility import get_allowed_decision_types
+    ChairUploadReviewManuscriptForm, AssignReviewerForm, AssignReviewersForm, \
+    ApplyAssignmentForm, UpdateSubmissionsForm
+from chair.utility import get_allowed_decision_types, \
+    get_allowed_decision_types_of
+from chair_mail.mailing_lists import create_selection, get_selection_list
+from chair_mail.models import MSG_TYPE_SUBMISSION
 from conferences.utilities import validate_chair_access
-from conferences.models import Conference
+from conferences.models import Conference, ProceedingVolume
+from gears.downloads import serve_file
+from gears.paging import paginate_by_key
 from proceedings.forms import UpdateVolumeForm
-from review.models import Review, ReviewStats, ReviewDecisionType
+from proceedings.models import CameraReady, Artifact
+from review.models import Review, ReviewStats, ReviewDecisionType, \
+    ReviewStage, Reviewer
+from review.utilities import get_review_stage
 from submissions.forms import SubmissionDetailsForm, AuthorCreateForm, \
     AuthorDeleteForm, AuthorsReorderForm, InviteAuthorForm
-from submissions.models import Submission, Attachment
+from submissions.models import Submission, Attachment, Author
 
 
 def submission_view(params='submission'):
@@ -52,13 +62,13 @@ def list_submissions(request, conf_pk):
     validate_chair_access(request.user, conference)
     form = FilterSubmissionsForm(request.GET, instance=conference)
     submissions = conference.submission_set.all()
+    key, descending = 'pk', False
 
     if form.is_valid():
         submissions = form.apply(submissions)
+        key, descending = form.get_ordering()
 
-    pks = [sub.pk for sub in submissions]
-    paginator = Paginator(pks, settings.ITEMS_PER_PAGE)
-    page = paginator.page(request.GET.get('page', 1))
+    page = paginate_by_key(request, submissions, key, descending)
 
     context = {
         'conference': conference,
@@ -88,39 +98,122 @@ def delete_submission(request, submission):
 #############################################################################
 # SUBMISSIONS FEED
 #############################################################################
+FEED_TEMPLATE_NAMES = {
+    Submission.SUBMITTED: 'chair/submissions/feed/card_submitted.html',
+    Submission.UNDER_REVIEW: 'chair/submissions/feed/card_review.html',
+    Submission.ACCEPTED: 'chair/submissions/feed/card_accepted.html',
+    Submission.REJECTED: 'chair/submissions/feed/card_rejected.html',
+    Submission.IN_PRINT: 'chair/submissions/feed/card_inprint.html',
+    Submission.PUBLISHED: 'chair/submissions/feed/card_published.html',
+}
+
+
+def get_feed_submissions(conference, pks):
+    """Get submissions with all the data required to render feed cards.
+
+    Rendering cards of any number of submissions from this queryset takes
+    a fixed number of queries.
+    """
+    return Submission.objects.filter(
+        conference=conference, pk__in=pks
+    ).select_related(
+        'stype', 'facts'
+    ).prefetch_related(
+        'topics',
+        'stype__possible_proceedings',
+        Prefetch('authors', queryset=Author.objects.select_related(
+            'user__profile')),
+        Prefetch('reviewstage_set', queryset=ReviewStage.objects.select_related(
+            'decision__decision_type').order_by('pk')),
+        Prefetch('reviewstage_set__review_set',
+                 queryset=Review.objects.select_related(
+                     'reviewer__user__profile').order_by('pk')),
+        Prefetch('cameraready_set', queryset=CameraReady.objects.select_related(
+            'proc_type', 'volume')),
+        Prefetch('cameraready_set__artifact_set',
+                 queryset=Artifact.objects.select_related(
+                     'attachment', 'descriptor')),
+    )
+
+
+def render_feed_items(request, conference, submissions, list_view_url):
+    """Render feed cards for the given submissions.
+
+    Submissions are expected to be loaded with `get_feed_submissions()`.
+    Review stats, decision types and volumes are loaded once for all cards.
+
+    :return: a dictionary `submission.pk -> card HTML`
+    """
+    submissions = list(submissions)
+    stats, _ = ReviewStats.objects.get_or_create(conference=conference)
+    accept_decisions = get_allowed_decision_types_of(
+        submissions, ReviewDecisionType.ACCEPT, conference)
+    reject_decisions = get_allowed_decision_types_of(
+        submissions, ReviewDecisionType.REJECT, conference)
+    volumes = {}
+    if any(sub.status == Submission.ACCEPTED for sub in submissions):
+        for volume in ProceedingVolume.objects.filter(
+                type__conference=conference):
+            volumes.setdefault(volume.type_id, []).append(volume)
+
+    items = {}
+    for submission in submissions:
+        stage = get_review_stage(submission)
+        context = {
+            'submission': submission,
+            'review_stats': stats,
+            'list_view_url': list_view_url,
+            'decision': getattr(stage, 'decision', None),
+        }
+        if submission.status == Submission.ACCEPTED:
+            context['camera_forms'] = {
+                camera: UpdateVolumeForm(
+                    instance=camera,
+                    volumes=volumes.get(camera.proc_type_id, []))
+                for camera in submission.cameraready_set.all()
+                if camera.active
+            }
+        if submission.status == Submission.UNDER_REVIEW:
+            context['accept_decisions'] = accept_decisions[submission.pk]
+        if submission.status in [Submission.UNDER_REVIEW,
+                                 Submission.SUBMITTED]:
+            context['reject_decisions'] = reject_decisions[submission.pk]
+        items[submission.pk] = render_to_string(
+            FEED_TEMPLATE_NAMES[submission.status], context, request=request)
+    return items
+
+
 @require_GET
 @submission_view('submission,conference')
 def feed_item(request, submission, conference):
-    stats, _ = ReviewStats.objects.get_or_create(conference=conference)
-    context = {
-        'submission': submission,
-        'review_stats': stats,
-        'list_view_url': request.GET.get(
-            'list_view_url',
-            reverse('chair:submissions', kwargs={'conf_pk': conference.pk})),
-    }
-    template_names = {
-        Submission.SUBMITTED: 'chair/submissions/feed/card_submitted.html',
-        Submission.UNDER_REVIEW: 'chair/submissions/feed/card_review.html',
-        Submission.ACCEPTED: 'chair/submissions/feed/card_accepted.html',
-        Submission.REJECTED: 'chair/submissions/feed/card_rejected.html',
-        Submission.IN_PRINT: 'chair/submissions/feed/card_inprint.html',
-        Submission.PUBLISHED: 'chair/submissions/feed/card_published.html',
-    }
-    stage = submission.reviewstage_set.first()
-    context['decision'] = stage.decision if stage else None
-    if submission.status == Submission.ACCEPTED:
-        context['camera_forms'] = {
-            camera: UpdateVolumeForm(instance=camera)
-            for camera in submission.cameraready_set.filter(active=True)
-        }
-    if submission.status == Submission.UNDER_REVIEW:
-        context['accept_decisions'] = get_allowed_decision_types(
-            submission, ReviewDecisionType.ACCEPT)
-    if submission.status in [Submission.UNDER_REVIEW, Submission.SUBMITTED]:
-        context['reject_decisions'] = get_allowed_decision_types(
-            submission, ReviewDecisionType.REJECT)
-    return render(request, template_names[submission.status], context)
+    list_view_url = request.GET.get(
+        'list_view_url',
+        reverse('chair:submissions', kwargs={'conf_pk': conference.pk}))
+    submissions = get_feed_submissions(conference, [submission.pk])
+    items = render_feed_items(request, conference, submissions, list_view_url)
+    return HttpResponse(items[submission.pk])
+
+
+@require_GET
+def feed_items(request, conf_pk):
+    """Render feed cards for all submissions, which PKs are passed in `pk`
+    GET-parameter (could be repeated), in a single response.
+
+    Response is a JSON object with `items` dictionary `pk -> card HTML`.
+    """
+    conference = get_object_or_404(Conference, pk=conf_pk)
+    validate_chair_access(request.user, conference)
+    try:
+        pks = [int(pk) for pk in request.GET.getlist('pk')]
+    except ValueError:
+        return HttpResponseBadRequest()
+    list_view_url = request.GET.get(
+        'list_view_url',
+        reverse('chair:submissions', kwargs={'conf_pk': conference.pk}))
+    submissions = get_feed_submissions(
+        conference, pks[:settings.MAX_FEED_ITEMS])
+    items = render_feed_items(request, conference, submissions, list_view_url)
+    return JsonResponse(data={'items': items})
 
 
 #############################################################################
@@ -344,6 +437,106 @@ def assign_reviewer(request, submission):
     return redirect('chair:submission-reviewers', sub_pk=submission.pk)
 
 
+def assign_reviewers(request, conf_pk):
+    """Assign reviewers to all submissions under review at once. GET request
+    with `max_load` shows the plan (dry run), POST request applies exactly
+    the previewed plan.
+    """
+    conference = get_object_or_404(Conference, pk=conf_pk)
+    validate_chair_access(request.user, conference)
+    default_next = reverse('chair:submissions', kwargs={'conf_pk': conf_pk})
+    next_url = request.GET.get('next', default_next)
+
+    plan = None
+    if request.method == 'POST':
+        apply_form = ApplyAssignmentForm(request.POST, conference=conference)
+        if apply_form.is_valid():
+            reviews = apply_form.plan().apply()
+            messages.success(request, f'Assigned {len(reviews)} reviews')
+            return redirect(next_url)
+        for error in apply_form.errors.get('assignments', []):
+            messages.error(request, error)
+        form = AssignReviewersForm(conference=conference)
+    elif 'max_load' in request.GET:
+        form = AssignReviewersForm(request.GET, conference=conference)
+        if form.is_valid():
+            plan = form.plan()
+    else:
+        form = AssignReviewersForm(conference=conference)
+
+    return render(request, 'chair/submissions/assign_reviewers.html', {
+        'conference': conference,
+        'form': form,
+        'next': next_url,
+        'plan': plan,
+        'apply_form': ApplyAssignmentForm(
+            conference=conference, plan=plan) if plan else None,
+        'items': get_assignment_preview(plan) if plan else [],
+    })
+
+
+def update_submissions(request, conf_pk):
+    """Set a decision or a status of all submissions selected by the filter
+    (passed in the query string) at once. GET request shows the form, POST
+    request applies it.
+    """
+    conference = get_object_or_404(Conference, pk=conf_pk)
+    validate_chair_access(request.user, conference)
+    default_next = reverse('chair:submissions', kwargs={'conf_pk': conf_pk})
+    next_url = request.GET.get('next', default_next)
+
+    filter_form = FilterSubmissionsForm(request.GET, instance=conference)
+    if not filter_form.is_valid():
+        return HttpResponseBadRequest()
+    submissions = filter_form.apply(conference.submission_set.all())
+
+    if request.method == 'POST':
+        form = UpdateSubmissionsForm(request.POST, conference=conference)
+        if form.is_valid():
+            pks = form.apply(submissions, sender=request.user)
+            messages.success(request, f'Updated {len(pks)} submissions')
+            return redirect(next_url)
+    else:
+        form = UpdateSubmissionsForm(conference=conference)
+
+    return render(request, 'chair/submissions/update_submissions.html', {
+        'conference': conference,
+        'form': form,
+        'next': next_url,
+        'num_submissions': submissions.count(),
+    })
+
+
+def get_assignment_preview(plan):
+    """Get submissions of the assignment plan with reviewers to be assigned
+    and the number of reviews which couldn't be assigned.
+    """
+    reviewers = {rev.pk: rev for rev in Reviewer.objects.filter(
+        pk__in=plan.loads).select_related('user__profile')}
+    assigned = defaultdict(list)
+    for stage_id, reviewer_id in plan.assignments:
+        assigned[stage_id].append({
+            'reviewer': reviewers[reviewer_id],
+            'load': plan.loads[reviewer_id],
+            'common_topics': plan.common_topics[(stage_id, reviewer_id)],
+        })
+    stage_ids = sorted(set(assigned) | set(plan.missing),
+                       key=lambda pk: plan.stages[pk]['submission_id'])
+    titles = dict(Submission.objects.filter(
+        pk__in=[plan.stages[pk]['submission_id'] for pk in stage_ids]
+    ).values_list('pk', 'title'))
+    items = []
+    for pk in stage_ids:
+        sub_id = plan.stages[pk]['submission_id']
+        items.append({
+            'submission_id': sub_id,
+            'title': titles.get(sub_id, ''),
+            'assignments': assigned[pk],
+            'num_missing': plan.missing.get(pk, 0),
+        })
+    return items
+
+
 # noinspection PyUnusedLocal
 @require_POST
 @submission_view('submission')
@@ -363,11 +556,8 @@ def download_attachment(request, att_pk):
     attachment = get_object_or_404(Attachment, pk=att_pk)
     validate_chair_access(request.user, attachment.submission.conference)
     if attachment.file:
-        filename = attachment.get_chair_download_name()
-        mtype = mimetypes.guess_type(filename)[0]
-        response = HttpResponse(attachment.file.file, content_type=mtype)
-        response['Content-Disposition'] = f'filename={filename}'
-        return response
+        return serve_file(request, attachment.file,
+                          attachment.get_chair_download_name())
     raise Http404
 
 
@@ -381,10 +571,16 @@ def compose_redirect(request, conf_pk):
         return HttpResponseServerError()
 
     submissions = form.apply(Submission.objects.all())
+    filters = request.GET.copy()
+    filters.pop('next', None)
+    selection = create_selection(
+        conference, MSG_TYPE_SUBMISSION,
+        submissions.values_list('pk', flat=True),
+        query=filters.urlencode(), user=request.user)
     base_url = reverse('chair_mail:compose-submission',
                        kwargs={'conf_pk': conf_pk})
     query_string = urlencode({
-        'objects': ','.join(str(sub.pk) for sub in submissions),
+        'lists': get_selection_list(selection).name,
         'next': request.GET.get('next', reverse(
             'chair:submissions', kwargs={'conf_pk': conf_pk}))
     })
@@ -1,21 +1,21 @@
-import csv
-from datetime import datetime
 from urllib.parse import urlencode
 
 from django.conf import settings
-from django.core.paginator import Paginator
 from django.db.models import Value, CharField, Case, When, IntegerField, \
     Count, Q
 from django.db.models.functions import Concat
-from django.http import Http404, HttpResponseServerError, HttpResponse
+from django.http import Http404, HttpResponseServerError
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
 from django.views.decorators.http import require_GET
 
 from chair.forms import FilterProfilesForm
+from chair.utility import create_csv_response
 from conferences.utilities import validate_chair_access
-from chair_mail.models import EmailMessage
+from chair_mail.mailing_lists import create_selection, get_selection_list
+from chair_mail.models import EmailMessage, MSG_TYPE_USER
 from conferences.models import Conference
+from gears.paging import paginate_by_key
 from submissions.models import Submission
 from users.models import User, Profile
 
@@ -26,13 +26,13 @@ def list_users(request, conf_pk):
     validate_chair_access(request.user, conference)
 
     profiles = Profile.objects.all()
+    key, descending = 'pk', False
     form = FilterProfilesForm(request.GET, instance=conference)
     if form.is_valid():
         profiles = form.apply(profiles)
+        key, descending = form.get_ordering()
 
-    pks = profiles.values_list('user_id', flat=True)
-    paginator = Paginator(pks, settings.ITEMS_PER_PAGE)
-    page = paginator.page(request.GET.get('page', 1))
+    page = paginate_by_key(request, profiles, key, descending, item='user_id')
 
     context = {
         'conference': conference,
@@ -127,43 +127,36 @@ def export_csv(request, conf_pk):
         num_accepted_submissions=Count('user__authorship', filter=Q(
             user__authorship__submission__conference=conference,
             user__authorship__submission__status=Submission.ACCEPTED
-        ), distinct=True)).distinct()
-
-    # Create the HttpResponse object with the appropriate header.
-    response = HttpResponse(content_type='text/csv')
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-    response['Content-Disposition'] = \
-        f'attachment; filename="users-{timestamp}.csv"'
-    writer = csv.writer(response)
-
-    # import sys
-    # writer = csv.writer(sys.stdout)
-    writer.writerow(form.cleaned_data['columns'])
-
-    for order, pr in enumerate(list(profiles)):
-        record = {
-            form.ORDER_COLUMN: order + 1,
-            form.ID_COLUMN: pr.user_id,
-            form.FULL_NAME_COLUMN: f'{pr.last_name} {pr.first_name}',
-            form.FULL_NAME_RUS_COLUMN: ' '.join((
-                pr.last_name_rus, pr.first_name_rus, pr.middle_name_rus)),
-            form.DEGREE_COLUMN: pr.get_degree_display(),
-            form.COUNTRY_COLUMN: pr.get_country_display(),
-            form.CITY_COLUMN: pr.city,
-            form.AFFILIATION_COLUMN: pr.affiliation,
-            form.ROLE_COLUMN: pr.get_role_display(),
-            form.EMAIL_COLUMN: pr.email,
-            form.NUM_SUBMITTED_COLUMN: pr.num_submissions,
-            form.NUM_ACCEPTED_COLUMN: pr.num_accepted_submissions,
-            form.IEEE_MEMBER_COLUMN: 'IEEE Member' if pr.ieee_member else '',
-            form.STUDENT_COLUMN: 'Student' if pr.is_student() else '',
-        }
-        row = []
-        for col in form.cleaned_data['columns']:
-            row.append(record[col])
-        writer.writerow(row)
-
-    return response
+        ), distinct=True)).distinct().select_related('user')
+    columns = form.cleaned_data['columns']
+
+    # Rows are generated while the response is streamed, profiles are
+    # fetched from the database in chunks:
+    def generate_rows():
+        profiles_iter = profiles.iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE)
+        for order, pr in enumerate(profiles_iter):
+            record = {
+                form.ORDER_COLUMN: order + 1,
+                form.ID_COLUMN: pr.user_id,
+                form.FULL_NAME_COLUMN: f'{pr.last_name} {pr.first_name}',
+                form.FULL_NAME_RUS_COLUMN: ' '.join((
+                    pr.last_name_rus, pr.first_name_rus, pr.middle_name_rus)),
+                form.DEGREE_COLUMN: pr.get_degree_display(),
+                form.COUNTRY_COLUMN: pr.get_country_display(),
+                form.CITY_COLUMN: pr.city,
+                form.AFFILIATION_COLUMN: pr.affiliation,
+                form.ROLE_COLUMN: pr.get_role_display(),
+                form.EMAIL_COLUMN: pr.email,
+                form.NUM_SUBMITTED_COLUMN: pr.num_submissions,
+                form.NUM_ACCEPTED_COLUMN: pr.num_accepted_submissions,
+                form.IEEE_MEMBER_COLUMN:
+                    'IEEE Member' if pr.ieee_member else '',
+                form.STUDENT_COLUMN: 'Student' if pr.is_student() else '',
+            }
+            yield [record[col] for col in columns]
+
+    return create_csv_response(columns, generate_rows(), 'users')
 
 
 def compose_redirect(request, conf_pk):
@@ -175,9 +168,14 @@ def compose_redirect(request, conf_pk):
         return HttpResponseServerError()
 
     users = form.apply(Profile.objects.all()).values_list('user_id', flat=True)
+    filters = request.GET.copy()
+    filters.pop('next', None)
+    selection = create_selection(
+        conference, MSG_TYPE_USER, users, query=filters.urlencode(),
+        user=request.user)
     base_url = reverse('chair_mail:compose-user', kwargs={'conf_pk': conf_pk})
     query_string = urlencode({
-        'objects': ','.join(str(pk) for pk in users),
+        'lists': get_selection_list(selection).name,
         'next': request.GET.get('next', reverse(
             'chair:users', kwargs={'conf_pk': conf_pk}))
     })
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
@@ -5,7 +7,9 @@ from django.views.decorators.http import require_GET
 
 from conferences.utilities import validate_chair_access
 from chair_mail.mailing_lists import USER_LISTS, SUBMISSION_LISTS, ALL_LISTS, \
-    find_list
+    find_list, get_selection_list, SELECTION_PREFIX
+from chair_mail.forms import RecipientsForm
+from chair_mail.models import RecipientSelection
 from conferences.models import Conference
 from submissions.models import Submission
 from users.models import Profile, User
@@ -16,7 +20,7 @@ def serialize_mailing_list(ml, conference):
         'name': ml.name,
         'details': ml.details,
         'type': ml.type,
-        'objects': [obj.pk for obj in ml.query(conference)]
+        'count': ml.query(conference).count(),
     }
 
 
@@ -71,6 +75,15 @@ def list_mailing_lists(request, conf_pk):
         lists = ALL_LISTS
     else:
         return JsonResponse({'error': 'invalid list type'}, status=400)
+    # Recipient selections (see `create_selection()`) are listed only if
+    # their names are given in `extra` parameter:
+    names = request.GET.get('extra', '').split(',')
+    lists += tuple(get_selection_list(selection) for selection in
+                   RecipientSelection.objects.filter(
+                       conference=conference, token__in=[
+                           name[len(SELECTION_PREFIX):] for name in names
+                           if name.startswith(SELECTION_PREFIX)]
+                   ) if list_type in ('all', selection.type))
     data = {
         'type': 'mailing_list',
         'objects': [serialize_mailing_list(ml, conference) for ml in lists],
@@ -86,7 +99,29 @@ def mailing_list_details(request, conf_pk, name):
         ml = find_list(name)
     except KeyError:
         return JsonResponse({'error': 'list not found'}, status=400)
-    return JsonResponse(serialize_mailing_list(ml, conference))
+    paginator = Paginator(
+        ml.query(conference).order_by('pk').values_list('pk', flat=True),
+        settings.MAILING_LIST_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+    return JsonResponse({
+        'name': ml.name,
+        'details': ml.details,
+        'type': ml.type,
+        'count': paginator.count,
+        'page': page.number,
+        'num_pages': paginator.num_pages,
+        'objects': list(page),
+    })
+
+
+@require_GET
+def count_recipients(request, conf_pk, msg_type):
+    conference = get_object_or_404(Conference, pk=conf_pk)
+    validate_chair_access(request.user, conference)
+    form = RecipientsForm(request.GET, msg_type=msg_type)
+    if not form.is_valid():
+        return JsonResponse({'error': form.errors}, status=400)
+    return JsonResponse({'count': form.get_recipients(conference).count()})
 
 
 @require_GET
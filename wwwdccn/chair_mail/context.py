@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.db.models import Prefetch
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 
@@ -8,12 +9,20 @@ from markdown import markdown
 
 from chair_mail.utility import get_absolute_url, markdownify_link, \
     markdownify_list
-from review.models import Review
-from submissions.models import Submission
+from review.models import Review, ReviewStage
+from review.utilities import get_review_stage
+from submissions.models import Submission, Author
+from users.models import Profile
 
 Var = namedtuple('Var', ('name', 'description'))
 
 
+def _is_used(names, variables):
+    """Check whether any of `variables` (sequence of `Var` or `(name, _)`
+    pairs) is in `names`. If `names` is `None`, all variables are used."""
+    return names is None or any(var[0] in names for var in variables)
+
+
 #
 # FRAME CONTEXT (DO NOT USE IT IN GROUP MESSAGE RENDERING!!!)
 #
@@ -102,10 +111,9 @@ USER_PROFILE_VARS = tuple((var.name, var.description) for var in (
 ))
 
 
-def _get_user_profile_context(user):
+def _get_user_profile_context(user, profile):
     """Get context dictionary regarding user profile.
     """
-    profile = user.profile
     return {
         USERNAME.name: profile.get_full_name(),
         FIRST_NAME.name: profile.first_name,
@@ -168,21 +176,19 @@ USER_SUBMISSIONS_VARS = tuple((var.name, var.description) for var in (
 ))
 
 
-def _get_user_submissions_context(user, conference):
+def _get_user_submissions_context(papers):
     """Get context dictionary regarding user submissions.
+
+    :param papers: a list of submissions authored by the user
     """
     # TODO: add context for accepted and rejected papers
-    papers = (Submission.objects
-              .filter(conference=conference)
-              .filter(authors__user=user))
-    complete_ids = [p.pk for p in papers if not p.warnings()]
-    _submitted = papers.filter(status=Submission.SUBMITTED)
-    under_review = papers.filter(status=Submission.UNDER_REVIEW)
+    _submitted = [p for p in papers if p.status == Submission.SUBMITTED]
+    under_review = [p for p in papers if p.status == Submission.UNDER_REVIEW]
     submitted = {
         'all': _submitted,
-        'complete': _submitted.filter(pk__in=complete_ids),
-        'incomplete': _submitted.exclude(pk__in=complete_ids),
-        'empty': _submitted.filter(title='')
+        'complete': [p for p in _submitted if not p.warnings()],
+        'incomplete': [p for p in _submitted if p.warnings()],
+        'empty': [p for p in _submitted if p.title == '']
     }
 
     # Helper to build markdown representation of the queryset:
@@ -202,17 +208,17 @@ def _get_user_submissions_context(user, conference):
         )
 
     return {
-        NUM_PAPERS.name: papers.count(),
+        NUM_PAPERS.name: len(papers),
         PAPERS_LIST.name: ul(papers),
-        NUM_SUBMITTED_PAPERS.name: submitted['all'].count(),
+        NUM_SUBMITTED_PAPERS.name: len(submitted['all']),
         SUBMITTED_PAPERS_LIST.name: ul(submitted['all']),
-        NUM_COMPLETE_SUBMITTED_PAPERS.name: submitted['complete'].count(),
+        NUM_COMPLETE_SUBMITTED_PAPERS.name: len(submitted['complete']),
         COMPLETE_SUBMITTED_PAPERS_LIST.name:ul(submitted['complete']),
-        NUM_INCOMPLETE_SUBMITTED_PAPERS.name: submitted['incomplete'].count(),
+        NUM_INCOMPLETE_SUBMITTED_PAPERS.name: len(submitted['incomplete']),
         INCOMPLETE_SUBMITTED_PAPERS_LIST.name: ul(submitted['incomplete']),
-        NUM_EMPTY_PAPERS.name: submitted['empty'].count(),
+        NUM_EMPTY_PAPERS.name: len(submitted['empty']),
         EMPTY_PAPERS_LIST.name: ul(submitted['empty']),
-        NUM_UNDER_REVIEW_PAPERS.name: under_review.count(),
+        NUM_UNDER_REVIEW_PAPERS.name: len(under_review),
         UNDER_REVIEW_PAPERS_LIST.name: ul(under_review)
     }
 
@@ -245,15 +251,14 @@ USER_REVIEWS_VARS = tuple((var.name, var.description) for var in (
 ))
 
 
-def _get_user_review_context(user, conference):
+def _get_user_review_context(reviews):
     """Get context dictionary regarding user reviews.
+
+    :param reviews: a list of reviews assigned to the user, with
+        `stage__submission__stype` selected
     """
-    reviews = (Review.objects
-               .filter(stage__submission__conference=conference)
-               .filter(reviewer__user=user))
-    complete_reviews_ids = [rev.pk for rev in reviews if not rev.warnings()]
-    complete_reviews = reviews.filter(pk__in=complete_reviews_ids)
-    incomplete_reviews = reviews.exclude(pk__in=complete_reviews_ids)
+    complete_reviews = [rev for rev in reviews if not rev.warnings()]
+    incomplete_reviews = [rev for rev in reviews if rev.warnings()]
 
     # Helper to build <ul>-representation of the queryset:
     def ul(query):
@@ -265,11 +270,11 @@ def _get_user_review_context(user, conference):
         )
 
     return {
-        NUM_REVIEWS.name: reviews.count(),
+        NUM_REVIEWS.name: len(reviews),
         REVIEWS_LIST.name: ul(reviews),
-        NUM_COMPLETE_REVIEWS.name: complete_reviews.count(),
+        NUM_COMPLETE_REVIEWS.name: len(complete_reviews),
         COMPLETE_REVIEWS_LIST.name: ul(complete_reviews),
-        NUM_INCOMPLETE_REVIEWS.name: incomplete_reviews.count(),
+        NUM_INCOMPLETE_REVIEWS.name: len(incomplete_reviews),
         INCOMPLETE_REVIEWS_LIST.name: ul(incomplete_reviews),
     }
 
@@ -277,12 +282,61 @@ def _get_user_review_context(user, conference):
 #
 # ---- BUILDING USER CONTEXT AND VARS ----
 #
-def get_user_context(user, conference):
-    return {
-        **_get_user_profile_context(user),
-        **_get_user_submissions_context(user, conference),
-        **_get_user_review_context(user, conference),
-    }
+def get_users_context(users, conference, names=None):
+    """Build contexts of all the given users at once.
+
+    Profiles, submissions and reviews of all users are loaded with
+    a fixed number of queries, independent of the number of users, and
+    then each context is built in memory. If `names` is given, only groups
+    of variables (profile, submissions, reviews) having names from it are
+    built, so the data for other groups is not even loaded.
+
+    :param users: an iterable of `User` instances
+    :param conference: `Conference` instance
+    :param names: optional set of variable names, see `get_template_names()`
+    :return: a dictionary `user.pk -> context`
+    """
+    users = list(users)
+    user_pks = [user.pk for user in users]
+    contexts = {pk: {} for pk in user_pks}
+
+    if _is_used(names, USER_PROFILE_VARS):
+        profiles = {profile.user_id: profile for profile in
+                    Profile.objects.filter(user_id__in=user_pks)}
+        for user in users:
+            contexts[user.pk].update(
+                _get_user_profile_context(user, profiles[user.pk]))
+
+    if _is_used(names, USER_SUBMISSIONS_VARS):
+        papers = {pk: [] for pk in user_pks}
+        authors = (Author.objects
+                   .filter(user_id__in=user_pks,
+                           submission__conference=conference)
+                   .select_related('submission')
+                   .order_by('submission_id'))
+        for author in authors:
+            user_papers = papers[author.user_id]
+            if not user_papers or user_papers[-1].pk != author.submission_id:
+                user_papers.append(author.submission)
+        for pk in user_pks:
+            contexts[pk].update(_get_user_submissions_context(papers[pk]))
+
+    if _is_used(names, USER_REVIEWS_VARS):
+        reviews = {pk: [] for pk in user_pks}
+        for review in (Review.objects
+                       .filter(stage__submission__conference=conference,
+                               reviewer__user_id__in=user_pks)
+                       .select_related('reviewer', 'stage__submission__stype')
+                       .order_by('pk')):
+            reviews[review.reviewer.user_id].append(review)
+        for pk in user_pks:
+            contexts[pk].update(_get_user_review_context(reviews[pk]))
+
+    return contexts
+
+
+def get_user_context(user, conference, names=None):
+    return get_users_context([user], conference, names)[user.pk]
 
 
 USER_VARS = USER_PROFILE_VARS + USER_SUBMISSIONS_VARS + USER_REVIEWS_VARS
@@ -309,12 +363,63 @@ SUBMISSION_VARS = tuple((var.name, var.description) for var in (
 ))
 
 
-def get_submission_context(submission):
-    stage = submission.reviewstage_set.first()
+_SUB_REVIEW_VARS = (SUB_REVIEW_SCORE, SUB_REVIEWS_LIST, SUB_REVIEW_DECISION)
+
+
+def prefetch_submission_context(submissions, names=None):
+    """Prefetch all the data `get_submission_context()` needs, so building
+    contexts of many submissions takes a fixed number of queries.
+
+    Authors with their users are always prefetched. If `names` is given,
+    other data is prefetched only when the corresponding variables are used.
+
+    :param submissions: `Submission` queryset
+    :param names: optional set of variable names, see `get_template_names()`
+    :return: queryset with related objects prefetched
+    """
+    lookups = ['authors__user']
+    if _is_used(names, [SUB_AUTHORS]):
+        lookups.append('authors__user__profile')
+    if _is_used(names, [SUB_PROCEEDINGS_LIST]):
+        lookups.extend(['cameraready_set__proc_type',
+                        'cameraready_set__volume'])
+    if _is_used(names, _SUB_REVIEW_VARS):
+        lookups.extend([
+            Prefetch('reviewstage_set', queryset=ReviewStage.objects.order_by(
+                'pk').select_related('decision__decision_type')),
+            Prefetch('reviewstage_set__review_set',
+                     queryset=Review.objects.order_by('pk')),
+        ])
+    return submissions.prefetch_related(*lookups)
+
+
+def get_submission_context(submission, names=None):
+    """Build submission context. If `names` is given, variables requiring
+    related objects (authors, reviews, proceedings) are built only if their
+    names are in it.
+    """
+    context = {
+        SUB_ID.name: submission.pk,
+        SUB_TITLE.name: submission.title,
+        SUB_ABSTRACT.name: submission.abstract,
+        SUB_URL.name: markdownify_link(get_absolute_url(
+            reverse('submissions:overview', kwargs={'pk': submission.pk}))),
+    }
+    if _is_used(names, [SUB_AUTHORS]):
+        context[SUB_AUTHORS.name] = submission.get_authors_display()
+    if _is_used(names, _SUB_REVIEW_VARS):
+        context.update(_get_submission_review_context(submission))
+    if _is_used(names, [SUB_PROCEEDINGS_LIST]):
+        context.update(_get_submission_proceedings_context(submission))
+    return context
+
+
+def _get_submission_review_context(submission):
+    stage = get_review_stage(submission)
     reviews = []
     decision_type = None
     if stage:
-        reviews = list(stage.review_set.filter(submitted=True))
+        reviews = [rev for rev in stage.review_set.all() if rev.submitted]
         decision_type = stage.decision.decision_type if stage.decision else None
 
     review_lines = []
@@ -329,24 +434,22 @@ def get_submission_context(submission):
             f'**Review #{n + 1}**: {", ".join(scores)}\n\n'
             f'{r.details}')
 
+    return {
+        SUB_REVIEW_SCORE.name:
+            '-' if not stage or not stage.score else stage.score,
+        SUB_REVIEWS_LIST.name: '\n\n'.join(review_lines),
+        SUB_REVIEW_DECISION.name:
+            decision_type.description if decision_type else '',
+    }
+
+
+def _get_submission_proceedings_context(submission):
     proceedings = []
     for camera in submission.cameraready_set.all():
         proc_type, volume = camera.proc_type, camera.volume
         if camera.active and proc_type:
             vol_str = f', {volume.name}' if volume else ''
             proceedings.append(f'{proc_type.name}{vol_str}')
-
     return {
-        SUB_ID.name: submission.pk,
-        SUB_TITLE.name: submission.title,
-        SUB_ABSTRACT.name: submission.abstract,
-        SUB_AUTHORS.name: submission.get_authors_display(),
-        SUB_URL.name: markdownify_link(get_absolute_url(
-            reverse('submissions:overview', kwargs={'pk': submission.pk}))),
-        SUB_REVIEW_SCORE.name:
-            '-' if not stage or not stage.score else stage.score,
-        SUB_REVIEWS_LIST.name: '\n\n'.join(review_lines),
-        SUB_REVIEW_DECISION.name:
-            decision_type.description if decision_type else '',
         SUB_PROCEEDINGS_LIST.name: '\n-'.join(proceedings)
     }
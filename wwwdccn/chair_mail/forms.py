@@ -1,20 +1,19 @@
 from django import forms
-from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
-from django.template import Template, Context
+from django.template import Context
 from django.utils import timezone
 from html2text import html2text
-from markdown import markdown
 
 from chair_mail.context import get_conference_context, get_user_context, \
     get_submission_context
-from chair_mail.mailing_lists import find_list
-from chair_mail.utility import get_object_model
+from chair_mail.mailing_lists import find_list, get_recipients
+from chair_mail.outbox import queue_mail
+from chair_mail.utility import get_object_model, compile_template, \
+    render_markdown
 from submissions.models import Submission
 from users.models import User
 from .models import EmailFrame, MSG_TYPE_USER, MSG_TYPE_SUBMISSION, \
-    SystemNotification
+    SystemNotification, SUBSCRIPTION_CHOICES
 
 
 def parse_mailing_lists(names_string, separator=','):
@@ -59,44 +58,77 @@ class EmailFrameTestForm(forms.Form):
             self.cleaned_data['text_plain'], conference, subject, body_plain
         )
 
-        send_mail(
+        queue_mail(
             subject=f'[{conference.short_name}] {subject}',
             message=plain,
-            from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
             html_message=html,
+            sender=user,
         )
 
 
-class MessageForm(forms.Form):
-    subject = forms.CharField()
-    body = forms.CharField(widget=forms.Textarea(), required=False)
+class RecipientsForm(forms.Form):
+    """Recipients of a group message: mailing lists and objects to include,
+    mailing lists to exclude and the kind of subscription required.
+    """
     lists = forms.CharField(
         required=False, max_length=1000, widget=forms.HiddenInput)
     objects = forms.CharField(
         required=False, max_length=10000, widget=forms.HiddenInput)
+    exclude = forms.CharField(
+        required=False, max_length=1000, widget=forms.HiddenInput)
+    subscription = forms.ChoiceField(
+        required=False, choices=SUBSCRIPTION_CHOICES, label='Send to')
 
     def __init__(self, *args, msg_type=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.msg_type = msg_type
         self.object_type = get_object_model(msg_type)
         self.cleaned_lists = []
+        self.cleaned_exclude = []
         self.cleaned_objects = []
 
-    def clean_lists(self):
-        _lists = parse_mailing_lists(self.cleaned_data['lists'])
+    def _parse_lists(self, names_string):
+        try:
+            _lists = parse_mailing_lists(names_string)
+        except KeyError as error:
+            raise ValidationError(error.args[0])
         for ml in _lists:
             if ml.type != self.msg_type:
                 raise ValidationError(
                     f'unexpected {ml.type} mailing list {ml.name}')
-        self.cleaned_lists = _lists
+        return _lists
+
+    def clean_lists(self):
+        self.cleaned_lists = self._parse_lists(self.cleaned_data['lists'])
         return self.cleaned_data['lists']
 
+    def clean_exclude(self):
+        self.cleaned_exclude = self._parse_lists(self.cleaned_data['exclude'])
+        return self.cleaned_data['exclude']
+
     def clean_objects(self):
-        self.cleaned_objects = parse_objects(
-            self.object_type, self.cleaned_data['objects'], ',')
+        try:
+            self.cleaned_objects = parse_objects(
+                self.object_type, self.cleaned_data['objects'], ',')
+        except ValueError:
+            raise ValidationError('invalid objects')
         return self.cleaned_data['objects']
 
+    def get_recipients(self, conference):
+        """Get a queryset of users or submissions the message is sent to."""
+        return get_recipients(
+            conference, self.msg_type, lists=self.cleaned_lists,
+            objects=self.cleaned_objects, exclude=self.cleaned_exclude,
+            subscription=self.cleaned_data['subscription'])
+
+
+class MessageForm(RecipientsForm):
+    subject = forms.CharField()
+    body = forms.CharField(widget=forms.Textarea(), required=False)
+
+    field_order = ('subject', 'body')
+
     def clean(self):
         if not self.cleaned_lists and not self.cleaned_objects:
             raise ValidationError('You must specify at least one recipient')
@@ -124,10 +156,10 @@ class PreviewMessageForm(forms.Form):
     def render_html(self, conference):
         ctx_data = self.get_context(conference)
         context = Context(ctx_data, autoescape=False)
-        subject_template = Template(self.cleaned_data['subject'])
-        body_template = Template(self.cleaned_data['body'])
+        subject_template = compile_template(self.cleaned_data['subject'])
+        body_template = compile_template(self.cleaned_data['body'])
         subject = subject_template.render(context)
-        body = markdown(body_template.render(context))
+        body = render_markdown(body_template.render(context))
         return {
             'body': body,
             'subject': subject
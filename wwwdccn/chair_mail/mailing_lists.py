@@ -1,9 +1,15 @@
+import secrets
 from collections import namedtuple
+from datetime import timedelta
 
+from django.conf import settings
 from django.db.models import Q
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from chair_mail.models import MSG_TYPE_USER, MSG_TYPE_SUBMISSION
+from chair_mail.models import MSG_TYPE_USER, MSG_TYPE_SUBMISSION, \
+    RecipientSelection, SUBSCRIPTION_ANY, get_subscribed_users
+from chair_mail.utility import get_object_model, encode_pk_set
 from review.models import Reviewer
 from submissions.models import Author, Submission
 from users.models import User
@@ -97,13 +103,103 @@ SUBMISSION_LISTS = (
 ALL_LISTS = USER_LISTS + SUBMISSION_LISTS
 
 
+SELECTION_PREFIX = 'SELECTION_'
+
+
 def find_list(list_name):
+    if list_name.startswith(SELECTION_PREFIX):
+        selection = RecipientSelection.objects.filter(
+            token=list_name[len(SELECTION_PREFIX):]).first()
+        if selection is None:
+            raise KeyError(f'invalid mailing list {list_name}')
+        return get_selection_list(selection)
     try:
         return [a_list for a_list in ALL_LISTS if a_list.name == list_name][0]
     except IndexError:
         raise KeyError(f'invalid mailing list {list_name}')
 
 
+def create_selection(conference, msg_type, pks, query='', user=None):
+    """Store recipients selected with filters and return the selection.
+
+    Selections older than `RECIPIENT_SELECTION_MAX_AGE` days are deleted.
+
+    :param conference: `Conference` instance
+    :param msg_type: `MSG_TYPE_USER` or `MSG_TYPE_SUBMISSION`
+    :param pks: primary keys of the selected users or submissions
+    :param query: filter parameters (URL query string)
+    :param user: `User` who made the selection
+    :return: `RecipientSelection`
+    """
+    max_age = timedelta(days=settings.RECIPIENT_SELECTION_MAX_AGE)
+    RecipientSelection.objects.filter(
+        created_at__lt=timezone.now() - max_age).delete()
+    pks = set(pks)
+    return RecipientSelection.objects.create(
+        conference=conference, type=msg_type, token=secrets.token_hex(8),
+        query=query, pks=encode_pk_set(pks), num_objects=len(pks),
+        created_by=user)
+
+
+def get_selection_list(selection):
+    """Represent the recipient selection as a mailing list. Recipients are
+    resolved with a single query, and only for the conference the selection
+    was made in.
+    """
+    model = get_object_model(selection.type)
+    pks = selection.get_pks()
+
+    def query(conference):
+        if conference.pk != selection.conference_id:
+            return model.objects.none()
+        return model.objects.filter(pk__in=pks)
+
+    return ml(f'{SELECTION_PREFIX}{selection.token}',
+              f'{selection.num_objects} {selection.type}s selected '
+              f'with filters', selection.type, query)
+
+
+def get_recipients(conference, msg_type, lists=(), objects=None, exclude=(),
+                   subscription=SUBSCRIPTION_ANY):
+    """Resolve recipients of a group message with a single query.
+
+    Recipients are objects of the mailing lists `lists` and `objects`
+    (`UNION`), except objects of any mailing list from `exclude` (`EXCEPT`).
+    If `subscription` is given, users not receiving emails of this kind
+    are dropped, as well as submissions without such authors (`INTERSECT`).
+
+    :param conference: `Conference` instance
+    :param msg_type: `MSG_TYPE_USER` or `MSG_TYPE_SUBMISSION`
+    :param lists: mailing lists to include
+    :param objects: users or submissions (or their primary keys) to include
+    :param exclude: mailing lists to exclude
+    :param subscription: one of `SUBSCRIPTION_CHOICES` keys
+    :return: a queryset of users or submissions
+    """
+    model = get_object_model(msg_type)
+
+    def pks_of(queryset):
+        # Ordering is not allowed in parts of compound queries:
+        return queryset.order_by().values('pk')
+
+    included = [pks_of(ml.query(conference)) for ml in lists]
+    if objects:
+        included.append(pks_of(model.objects.filter(pk__in=objects)))
+    if not included:
+        return model.objects.none()
+    pks = included[0].union(*included[1:])
+    if exclude:
+        pks = pks.difference(*[pks_of(ml.query(conference)) for ml in exclude])
+    if subscription:
+        users = get_subscribed_users(subscription)
+        if msg_type == MSG_TYPE_SUBMISSION:
+            pks = pks.intersection(pks_of(Submission.objects.filter(
+                conference=conference, authors__user__in=users)))
+        else:
+            pks = pks.intersection(pks_of(users))
+    return model.objects.filter(pk__in=pks)
+
+
 def get_users_of(mailing_list, conference):
     if mailing_list.type == MSG_TYPE_USER:
         return mailing_list.query(conference)
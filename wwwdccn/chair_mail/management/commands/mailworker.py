@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chair_mail.outbox import claim_messages, deliver, record_results, \
+    RateLimiter
+
+
+class Command(BaseCommand):
+    help = 'Send email messages from the outbox. By default, runs forever ' \
+           'polling the outbox; with --once, exits when the outbox is empty'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when there are no more messages to send')
+        parser.add_argument(
+            '-w', '--workers', type=int,
+            default=settings.EMAIL_OUTBOX_WORKERS,
+            help='Number of sending threads')
+        parser.add_argument(
+            '-r', '--rate', type=float, default=settings.EMAIL_OUTBOX_RATE,
+            help='Maximum number of messages per second, 0 - no limit')
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EMAIL_SEND_CHUNK_SIZE,
+            help='Number of messages sent by a thread through one connection')
+        parser.add_argument(
+            '--poll', type=float, default=5.0,
+            help='Seconds to wait before checking an empty outbox again')
+
+    def handle(self, *args, **kwargs):
+        verbosity = kwargs['verbosity']
+        num_workers = max(kwargs['workers'], 1)
+        chunk_size = max(kwargs['chunk_size'], 1)
+        limiter = RateLimiter(kwargs['rate'])
+
+        total_sent, total_failed = 0, 0
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            while True:
+                emails = claim_messages(
+                    num_workers * chunk_size, settings.EMAIL_OUTBOX_LEASE)
+                if not emails:
+                    if kwargs['once']:
+                        break
+                    time.sleep(kwargs['poll'])
+                    continue
+
+                chunks = [emails[i:i + chunk_size]
+                          for i in range(0, len(emails), chunk_size)]
+                futures = [executor.submit(deliver, chunk, limiter.wait)
+                           for chunk in chunks]
+                num_sent, num_failed = 0, 0
+                for future in futures:
+                    sent, failed = record_results(
+                        future.result(),
+                        max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+                        retry_delay=settings.EMAIL_OUTBOX_RETRY_DELAY)
+                    num_sent += sent
+                    num_failed += failed
+                total_sent += num_sent
+                total_failed += num_failed
+
+                if verbosity > 1:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'+ sent {num_sent} of {len(emails)} messages'))
+                if num_failed:
+                    self.stdout.write(self.style.ERROR(
+                        f'! failed {num_failed} messages'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: sent {total_sent} messages, '
+            f'failed {total_failed} messages'))
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def set_status_from_sent_flag(apps, schema_editor):
+    # Messages sent before the outbox was introduced are marked SENT, while
+    # those which were never sent are marked FAILED, so the worker doesn't
+    # deliver outdated messages:
+    EmailMessage = apps.get_model('chair_mail', 'EmailMessage')
+    EmailMessage.objects.filter(sent=True).update(status='sent')
+    EmailMessage.objects.filter(sent=False).update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chair_mail', '0005_auto_20190925_1933'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailmessage',
+            name='email_to',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='emailmessage',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='emailmessage',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='emailmessage',
+            name='num_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='emailmessage',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='queued', max_length=16),
+        ),
+        migrations.RunPython(
+            set_status_from_sent_flag, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='emailmessage',
+            name='sent',
+        ),
+        migrations.AlterField(
+            model_name='emailmessage',
+            name='user_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='emails', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='emailmessage',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='chair_mail__status_3dfbfe_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('conferences', '0018_remove_artifactdescriptor_materials_url'),
+        ('chair_mail', '0006_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipientSelection',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('type', models.CharField(choices=[('user', 'Message to users'), ('submission', 'Message to submissions')], max_length=64)),
+                ('query', models.TextField(blank=True)),
+                ('pks', models.TextField(blank=True)),
+                ('num_objects', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('conference', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipient_selections', to='conferences.Conference')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chair_mail', '0007_recipient_selection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupmessage',
+            name='subscription',
+            field=models.CharField(blank=True, choices=[('', 'All recipients'), ('trans_email', 'Only users receiving transactional emails'), ('info_email', 'Only users receiving informational emails')], default='', max_length=16),
+        ),
+    ]
@@ -1,17 +1,17 @@
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
 from django.db.models import ForeignKey, OneToOneField, TextField, CharField, \
     SET_NULL, CASCADE, BooleanField, UniqueConstraint
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.template import Template, Context
+from django.template import Context
 from django.utils import timezone
-from markdown import markdown
-from html2text import html2text
 
-from chair_mail.context import get_conference_context, get_user_context, \
-    get_submission_context, get_frame_context
+from chair_mail.context import get_conference_context, get_users_context, \
+    get_submission_context, get_frame_context, prefetch_submission_context
+from chair_mail.utility import compile_template, html_to_text, \
+    render_markdown, get_template_names, decode_pk_set
 from conferences.models import Conference
 from submissions.models import Submission
 from users.models import User
@@ -24,6 +24,27 @@ MESSAGE_TYPE_CHOICES = (
     (MSG_TYPE_SUBMISSION, 'Message to submissions'),
 )
 
+# Kinds of emails users subscribe to (see `users.models.Subscriptions`).
+# A group message of some kind is sent only to subscribed users:
+SUBSCRIPTION_ANY = ''
+SUBSCRIPTION_TRANS = 'trans_email'
+SUBSCRIPTION_INFO = 'info_email'
+
+SUBSCRIPTION_CHOICES = (
+    (SUBSCRIPTION_ANY, 'All recipients'),
+    (SUBSCRIPTION_TRANS, 'Only users receiving transactional emails'),
+    (SUBSCRIPTION_INFO, 'Only users receiving informational emails'),
+)
+
+
+def get_subscribed_users(subscription):
+    """Get users receiving emails of the given kind, or all users if the kind
+    is `SUBSCRIPTION_ANY`.
+    """
+    if not subscription:
+        return User.objects.all()
+    return User.objects.filter(**{f'subscriptions__{subscription}': True})
+
 
 class EmailFrame(models.Model):
     text_html = models.TextField()
@@ -37,7 +58,7 @@ class EmailFrame(models.Model):
     def render(frame_template, conference, subject, body):
         context_data = get_frame_context(conference, subject, body)
         context = Context(context_data, autoescape=False)
-        return Template(frame_template).render(context)
+        return compile_template(frame_template).render(context)
 
     def render_html(self, subject, body):
         return EmailFrame.render(
@@ -47,7 +68,7 @@ class EmailFrame(models.Model):
     def render_plain(self, subject, body):
         text_plain = self.text_plain
         if not text_plain:
-            text_plain = html2text(self.text_html)
+            text_plain = html_to_text(self.text_html)
         return EmailFrame.render(
             text_plain, self.conference, subject, body
         )
@@ -75,11 +96,21 @@ class GroupMessage(models.Model):
         related_name='sent_group_emails'
     )
     sent = models.BooleanField(default=False)
+    subscription = models.CharField(
+        max_length=16, blank=True, default=SUBSCRIPTION_ANY,
+        choices=SUBSCRIPTION_CHOICES)
 
     @property
     def message_type(self):
         return ''
 
+    def enqueue(self, emails, sender):
+        """Put rendered (unsaved) `emails` into the outbox with a single
+        query. They are delivered later by the `mailworker` command."""
+        for email in emails:
+            email.sent_by = sender
+        EmailMessage.objects.bulk_create(emails)
+
 
 class UserMessage(GroupMessage):
     recipients = models.ManyToManyField(User, related_name='group_emails')
@@ -92,12 +123,12 @@ class UserMessage(GroupMessage):
         return MSG_TYPE_USER
 
     @staticmethod
-    def create(subject, body, conference, objects_to):
+    def create(subject, body, conference, objects_to,
+               subscription=SUBSCRIPTION_ANY):
         msg = UserMessage.objects.create(
-            subject=subject, body=body, conference=conference)
-        for user in objects_to:
-            msg.recipients.add(user)
-        msg.save()
+            subject=subject, body=body, conference=conference,
+            subscription=subscription)
+        msg.recipients.add(*objects_to)
         return msg
 
     def send(self, sender):
@@ -109,20 +140,30 @@ class UserMessage(GroupMessage):
         # 2) For each user, we render this template with the given context,
         #    and then build the whole message by inserting this body into
         #    the frame. Plain-text version is also formed from HTML.
+        #    All messages are rendered first, then put into the outbox at once.
+        #    Only variables met in the subject or body are computed.
         frame = self.conference.email_settings.frame
         conference_context = get_conference_context(self.conference)
-        for user in self.recipients.all():
+        emails = []
+        names = get_template_names(self.subject, self.body)
+        users = self.recipients.all()
+        if self.subscription:
+            users = users.filter(
+                pk__in=get_subscribed_users(self.subscription))
+        users = list(users)
+        users_context = get_users_context(users, self.conference, names)
+        for user in users:
             context = Context({
                 **conference_context,
-                **get_user_context(user, self.conference)
+                **users_context[user.pk]
             }, autoescape=False)
-            email = EmailMessage.create(
+            emails.append(EmailMessage.build(
                 group_message=self.group_message,
                 user_to=user,
                 context=context,
                 frame=frame
-            )
-            email.send(sender)
+            ))
+        self.enqueue(emails, sender)
 
         # 3) Update self status, write sending timestamp
         self.sent_at = timezone.now()
@@ -143,12 +184,12 @@ class SubmissionMessage(GroupMessage):
         return MSG_TYPE_SUBMISSION
 
     @staticmethod
-    def create(subject, body, conference, objects_to):
+    def create(subject, body, conference, objects_to,
+               subscription=SUBSCRIPTION_ANY):
         msg = SubmissionMessage.objects.create(
-            subject=subject, body=body, conference=conference)
-        for submission in objects_to:
-            msg.recipients.add(submission)
-        msg.save()
+            subject=subject, body=body, conference=conference,
+            subscription=subscription)
+        msg.recipients.add(*objects_to)
         return msg
 
     def send(self, sender):
@@ -160,24 +201,40 @@ class SubmissionMessage(GroupMessage):
         # 2) For each user, we render this template with the given context,
         #    and then build the whole message by inserting this body into
         #    the frame. Plain-text version is also formed from HTML.
+        #    All messages are rendered first, then put into the outbox at once.
+        #    Only variables met in the subject or body are computed.
         frame = self.conference.email_settings.frame
         conference_context = get_conference_context(self.conference)
-        for submission in self.recipients.all():
-            submission_context = get_submission_context(submission)
+        emails = []
+        names = get_template_names(self.subject, self.body)
+        submissions = list(prefetch_submission_context(
+            self.recipients.all(), names))
+        users = {author.user for submission in submissions
+                 for author in submission.authors.all()}
+        if self.subscription:
+            subscribed = set(get_subscribed_users(self.subscription).filter(
+                pk__in=[user.pk for user in users]
+            ).values_list('pk', flat=True))
+            users = {user for user in users if user.pk in subscribed}
+        users_context = get_users_context(users, self.conference, names)
+        for submission in submissions:
+            submission_context = get_submission_context(submission, names)
             for author in submission.authors.all():
                 user = author.user
+                if user not in users:
+                    continue
                 context = Context({
                     **conference_context,
                     **submission_context,
-                    **get_user_context(user, self.conference)
+                    **users_context[user.pk]
                 }, autoescape=False)
-                email = EmailMessage.create(
+                emails.append(EmailMessage.build(
                     group_message=self.group_message,
                     user_to=user,
                     context=context,
                     frame=frame
-                )
-                email.send(sender)
+                ))
+        self.enqueue(emails, sender)
 
         # 3) Update self status, write sending timestamp
         self.sent_at = timezone.now()
@@ -209,21 +266,48 @@ def get_message_leaf_model(msg):
 
 
 class EmailMessage(models.Model):
+    """A single email message, also serving as an outbox entry.
+
+    Messages are created in QUEUED status and delivered by the `mailworker`
+    management command. If delivery fails, the message is queued again
+    with `next_attempt_at` postponed, until `num_attempts` reaches the limit
+    and the message gets FAILED status. While a worker sends the message,
+    it is in SENDING status and `next_attempt_at` holds the time when the
+    message may be taken by another worker (e.g. if this one died).
+    """
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
     subject = models.TextField(max_length=1024)
     text_plain = models.TextField()
     text_html = models.TextField()
     user_to = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        null=True, blank=True,
         related_name='emails'
     )
+    email_to = models.EmailField(blank=True)
     sent_at = models.DateTimeField(auto_now_add=True)
-    sent = models.BooleanField(default=False)
     sent_by = models.ForeignKey(
         User,
         on_delete=models.SET_NULL, null=True,
         related_name='sent_emails'
     )
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    num_attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
 
     group_message = models.ForeignKey(
         GroupMessage,
@@ -232,14 +316,18 @@ class EmailMessage(models.Model):
         related_name='messages',
     )
 
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
     @staticmethod
-    def create(group_message, user_to, context, frame):
-        template_body = Template(group_message.body)
-        template_subject = Template(group_message.subject)
+    def build(group_message, user_to, context, frame):
+        """Render the message for `user_to` without saving it."""
+        template_body = compile_template(group_message.body)
+        template_subject = compile_template(group_message.subject)
         body_md = template_body.render(context)
-        body_html = markdown(body_md)
+        body_html = render_markdown(body_md)
         subject = template_subject.render(context)
-        return EmailMessage.objects.create(
+        return EmailMessage(
             user_to=user_to,
             group_message=group_message,
             subject=subject,
@@ -247,18 +335,62 @@ class EmailMessage(models.Model):
             text_plain=frame.render_plain(subject, body_md),
         )
 
+    @staticmethod
+    def create(group_message, user_to, context, frame):
+        email = EmailMessage.build(group_message, user_to, context, frame)
+        email.save()
+        return email
+
+    @property
+    def sent(self):
+        return self.status == EmailMessage.SENT
+
+    @property
+    def recipient(self):
+        return self.email_to if self.email_to else self.user_to.email
+
+    def as_mail_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            self.subject, self.text_plain, settings.DEFAULT_FROM_EMAIL,
+            [self.recipient], connection=connection)
+        if self.text_html:
+            message.attach_alternative(self.text_html, 'text/html')
+        return message
+
     def send(self, sender):
+        """Put the message into the outbox, unless it was already sent."""
         if not self.sent:
-            from_email = settings.DEFAULT_FROM_EMAIL
-            send_mail(self.subject, self.text_plain, from_email, [self.user_to],
-                      html_message=self.text_html)
-            self.sent_at = timezone.now()
+            self.status = EmailMessage.QUEUED
+            self.next_attempt_at = timezone.now()
             self.sent_by = sender
-            self.sent = True
             self.save()
         return self
 
 
+class RecipientSelection(models.Model):
+    """Recipients selected with chair filters (e.g., on submissions list),
+    stored on the server, so only the token is passed to the compose page.
+
+    The selection is frozen: `pks` keeps primary keys of the objects
+    matching the filter at the moment of selection, encoded as ranges
+    (see `encode_pk_set()`), and `query` keeps the filter parameters.
+    On the compose page the selection is shown as a mailing list named
+    `SELECTION_<token>`.
+    """
+    conference = ForeignKey(Conference, on_delete=CASCADE,
+                            related_name='recipient_selections')
+    token = CharField(max_length=32, unique=True)
+    type = CharField(max_length=64, choices=MESSAGE_TYPE_CHOICES)
+    query = TextField(blank=True)
+    pks = TextField(blank=True)
+    num_objects = models.PositiveIntegerField(default=0)
+    created_by = ForeignKey(User, on_delete=SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def get_pks(self):
+        return decode_pk_set(self.pks)
+
+
 class SystemNotification(models.Model):
     """This model represents a system notification fired on a specific event.
 
@@ -0,0 +1,158 @@
+"""Outbox of email messages.
+
+Views never talk to the email backend directly: they put `EmailMessage`
+records into the outbox (see `queue_mail()` and `GroupMessage.enqueue()`),
+and the `mailworker` management command delivers them using the functions
+defined here.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q, F
+from django.utils import timezone
+
+from chair_mail.models import EmailMessage
+from users.models import User
+
+
+def queue_mail(subject, message, recipient_list, html_message='',
+               sender=None):
+    """Put a message into the outbox, one `EmailMessage` per recipient.
+
+    The signature follows `django.core.mail.send_mail()`, messages are sent
+    from `settings.DEFAULT_FROM_EMAIL`. If a recipient address belongs to
+    a registered user, the message is also linked to this user.
+
+    :param subject: message subject
+    :param message: plain text
+    :param recipient_list: a list of email addresses
+    :param html_message: HTML text (optional)
+    :param sender: `User` who sent the message, if any
+    :return: a list of created `EmailMessage` objects
+    """
+    users = {user.email: user for user in
+             User.objects.filter(email__in=recipient_list)}
+    emails = [EmailMessage(
+        subject=subject,
+        text_plain=message,
+        text_html=html_message if html_message else '',
+        user_to=users.get(address),
+        email_to=address,
+        sent_by=sender,
+    ) for address in recipient_list]
+    return EmailMessage.objects.bulk_create(emails)
+
+
+def claim_messages(limit, lease):
+    """Take up to `limit` messages due for sending and mark them SENDING.
+
+    Messages being sent by another worker are skipped, unless their lease
+    has expired. On databases supporting `SELECT ... FOR UPDATE SKIP LOCKED`
+    several workers may claim messages simultaneously.
+
+    :param limit: maximum number of messages to claim
+    :param lease: number of seconds after which the message is considered
+        abandoned, if it is still not sent
+    :return: a list of `EmailMessage` objects, with `user_to` selected
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pks = list(
+            EmailMessage.objects.select_for_update(skip_locked=True).filter(
+                Q(status=EmailMessage.QUEUED) | Q(status=EmailMessage.SENDING),
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at', 'pk').values_list('pk', flat=True)[
+                :limit])
+        EmailMessage.objects.filter(pk__in=pks).update(
+            status=EmailMessage.SENDING,
+            num_attempts=F('num_attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=lease),
+        )
+    return list(EmailMessage.objects.filter(pk__in=pks).select_related(
+        'user_to').order_by('pk'))
+
+
+def deliver(emails, throttle=None):
+    """Send `emails` through a single email backend connection.
+
+    This function doesn't access the database, so it can be called from
+    worker threads. Results are saved with `record_results()`.
+
+    :param emails: a sequence of `EmailMessage` objects
+    :param throttle: optional callable, called before sending each message
+    :return: a list of `(email, error)` pairs, `error` is `None` if the
+        message was sent successfully
+    """
+    results = []
+    try:
+        with get_connection() as connection:
+            for email in emails:
+                if throttle is not None:
+                    throttle()
+                try:
+                    connection.send_messages(
+                        [email.as_mail_message(connection)])
+                except Exception as error:
+                    results.append((email, error))
+                else:
+                    results.append((email, None))
+    except Exception as error:
+        # Failed to open or close the connection, so all messages not
+        # processed yet are failed:
+        processed = {email.pk for email, _ in results}
+        results.extend((email, error) for email in emails
+                       if email.pk not in processed)
+    return results
+
+
+def record_results(results, max_attempts, retry_delay):
+    """Save delivery results returned by `deliver()`.
+
+    Sent messages are updated with a single query. Failed messages are
+    queued again with exponentially growing delay, or get FAILED status
+    if they reached `max_attempts`.
+
+    :return: a pair `(num_sent, num_failed)`
+    """
+    now = timezone.now()
+    sent_pks = [email.pk for email, error in results if error is None]
+    EmailMessage.objects.filter(pk__in=sent_pks).update(
+        status=EmailMessage.SENT, sent_at=now, last_error='')
+    num_failed = 0
+    for email, error in results:
+        if error is None:
+            continue
+        email.last_error = f'{type(error).__name__}: {error}'
+        if email.num_attempts >= max_attempts:
+            email.status = EmailMessage.FAILED
+            num_failed += 1
+        else:
+            delay = retry_delay * 2 ** (email.num_attempts - 1)
+            email.status = EmailMessage.QUEUED
+            email.next_attempt_at = now + timedelta(seconds=delay)
+        email.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+    return len(sent_pks), num_failed
+
+
+class RateLimiter:
+    """Limits the rate of `wait()` calls across all threads.
+
+    If `rate` (calls per second) is zero or `None`, no limit is applied.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_time, now)
+            self._next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
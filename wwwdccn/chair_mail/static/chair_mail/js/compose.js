@@ -131,7 +131,7 @@ const getListDialogHTML = function (object, rawData = undefined) {
   const rawObject = rawData !== undefined ? rawData : object;
   return `
 <div class="dccn-text-0">
-  <h6 class="font-weight-bold dccn-text-0"> ${object.name} (${rawObject.objects.length} items)
+  <h6 class="font-weight-bold dccn-text-0"> ${object.name} (${rawObject.count} items)
   </h6>
   <p class="m-0 p-0">${object.details}</p>
 </div>`;
@@ -195,22 +195,24 @@ const showObjectsListModal = function ({objects, title, size = 'lg'}) {
  *
  * @param listMailingListsURL: a URL to send HTTP GET request to for reading the mailing lists
  * @param listObjectsURL: a URL to send HTTP GET request to for reading the list of objects (users or submissions)
+ * @param mailingListURL: a URL of mailing list members pages, with `__NAME__` in place of the list name
  * @param onObjectChecked: handler taking `userID` as the input called when a user is checked
  * @param onObjectUnchecked: handler taking `userID` as the input called when a user is unchecked
  * @param onListChecked: handler taking `name` as the input called when a list is checked
  * @param onListUnchecked: handler taking `name` as the input called when a list is unchecked
  * @param onLoaded: optional handler without arguments, called when the model loads all data from the server
  *
- * (!!) IMPORTANT NOTE: for now, we load all mailing lists and users in
- * single AJAX query. In future, we should do something with this...
+ * (!!) IMPORTANT NOTE: for now, we load all users (or submissions) in
+ * single AJAX query. Mailing lists come with members counts only, and
+ * their members are loaded page by page when a list is checked.
  *
  * Returns a public API split into `lists` and `users` parts with methods for getting,
  * checking and un-checking items.
  */
-const Model = function ({listMailingListsURL, listObjectsURL, onObjectChecked, onObjectUnchecked,
+const Model = function ({listMailingListsURL, listObjectsURL, mailingListURL, onObjectChecked, onObjectUnchecked,
                           onListChecked, onListUnchecked, onLoaded=()=>{}}) {
   const state = {
-    lists: {},  // name -> {name, type, details, objects, checked}
+    lists: {},  // name -> {name, type, details, count, objects (undefined until loaded), checked}
     objects: {},  // id -> [submission|user]
     objectType: undefined,
   };
@@ -257,7 +259,8 @@ const Model = function ({listMailingListsURL, listObjectsURL, onObjectChecked, o
         name: prettifyListName(object['name']),
         type: object['type'],
         details: object['details'],
-        objects: object['objects'].map(id => id),
+        count: object['count'],
+        objects: undefined,
         checked: false
       }
       },
@@ -293,14 +296,39 @@ const Model = function ({listMailingListsURL, listObjectsURL, onObjectChecked, o
       });
     },
 
-    /** Add lists names to `object.lists` fields for each user in the list, for all lists **/
+    /** Add lists names to `object.lists` fields for each user in the list, for all loaded lists **/
     bindObjectsToLists: () => {
       Object.values(state.objects).forEach(obj => obj.lists = []);
-      Object.values(state.lists).forEach(ml => {
-        ml.objects.forEach(id => state.objects[id].lists.push(ml.id))
+      Object.values(state.lists).filter(ml => ml.objects !== undefined).forEach(ml => {
+        ml.objects.filter(id => id in state.objects).forEach(id => state.objects[id].lists.push(ml.id))
       });
     },
 
+    /** Load members of the mailing list page by page (if not loaded yet), then call `onFinish` **/
+    loadListObjects: (name, onFinish) => {
+      const ml = state.lists[name];
+      if (ml.objects !== undefined) {
+        onFinish();
+        return;
+      }
+      const url = mailingListURL.replace('__NAME__', encodeURIComponent(name));
+      const objects = [];
+      const loadPage = page => {
+        $.get(url, {page: page}, data => {
+          objects.push(...data['objects']);
+          if (data['page'] < data['num_pages']) {
+            loadPage(page + 1);
+          } else {
+            ml.objects = objects;
+            ml.count = data['count'];
+            api.bindObjectsToLists();
+            onFinish();
+          }
+        });
+      };
+      loadPage(1);
+    },
+
     /** Load lists and users into `state`, bind lists to users */
     load: (success=undefined) => {
       api.loadObjects(listObjectsURL, () => {
@@ -410,14 +438,16 @@ const Model = function ({listMailingListsURL, listObjectsURL, onObjectChecked, o
       isPartOfCheckedList: id => api.isPartOfCheckedList(id),
     },
     lists: {
-      check: name => api.check(state.lists[name], onListChecked),
+      check: name => api.loadListObjects(name, () => api.check(state.lists[name], onListChecked)),
       uncheck: name => api.uncheck(state.lists[name], onListUnchecked),
-      toggle: name => api.toggleCheck(state.lists[name], onListChecked, onListUnchecked),
+      toggle: name => api.loadListObjects(
+        name, () => api.toggleCheck(state.lists[name], onListChecked, onListUnchecked)),
       get: name => state.lists[name],
       all: () => Object.values(state.lists),
       checked: name => state.lists[name].checked,
       search: query => api.searchLists(query),
-      getObjects: name => name in state.lists ? state.lists[name].objects.map(id => state.objects[id]) : [],
+      getObjects: name => name in state.lists && state.lists[name].objects !== undefined
+        ? state.lists[name].objects.filter(id => id in state.objects).map(id => state.objects[id]) : [],
     },
     /** Return a list of all users, either checked directly or included in a checked list */
     allSelectedObjects: () => api.getAllSelectedObjects(),
@@ -885,6 +915,9 @@ const controller = (function () {
       composeToArea: $('#composeToArea'),
       objectsInput: $('#id_objects'),
       listsInput: $('#id_lists'),
+      excludeInput: $('#id_exclude'),
+      subscriptionInput: $('#id_subscription'),
+      recipientsCount: $('#recipientsCount'),
       subjectInput: $('#id_subject'),
       previewForm: $('.preview-form'),
       previewArea: $('.preview-message'),
@@ -894,6 +927,16 @@ const controller = (function () {
     }
   };
 
+  /** Request the number of recipients from the server, since it takes excluded lists and subscriptions into account */
+  const updateRecipientsCount = () => {
+    $.get(elements.composeTo.attr('data-count-recipients-url'), {
+      lists: elements.listsInput.val(),
+      objects: elements.objectsInput.val(),
+      exclude: elements.excludeInput.val(),
+      subscription: elements.subscriptionInput.val(),
+    }, data => elements.recipientsCount.text(data['count']));
+  };
+
   return {
     initialize: function () {
       // 0) Load all page elements:
@@ -908,27 +951,32 @@ const controller = (function () {
       state.model = Model({
         listMailingListsURL: elements.composeTo.attr('data-list-mailing-lists-url'),
         listObjectsURL: elements.composeTo.attr('data-list-objects-url'),
+        mailingListURL: elements.composeTo.attr('data-mailing-list-url'),
         onObjectChecked: (id) => {
           components.composeToArea.objects.add(id);
           components.objectsDialog.render();
           components.previewForm.update();
+          updateRecipientsCount();
         },
         onObjectUnchecked: (id) => {
           components.composeToArea.objects.remove(id);
           components.objectsDialog.render();
           components.previewForm.update();
+          updateRecipientsCount();
         },
         onListChecked: (id) => {
           components.composeToArea.lists.add(id);
           components.listsDialog.render();
           components.objectsDialog.render();
           components.previewForm.update();
+          updateRecipientsCount();
         },
         onListUnchecked: (id) => {
           components.composeToArea.lists.remove(id);
           components.listsDialog.render();
           components.objectsDialog.render();
           components.previewForm.update();
+          updateRecipientsCount();
         },
         onLoaded: () => {
           // 1.1) Create `composeTo` plugin:
@@ -981,6 +1029,7 @@ const controller = (function () {
 
           // 1.5) Initialize the composeToArea component, since it expects other components being ready:
           components.composeToArea.initialize();
+          updateRecipientsCount();
         },
       });
 
@@ -997,11 +1046,14 @@ const controller = (function () {
         return false;
       });
 
-      // 3) Bind dialogs to buttons:
+      // 3) Update the number of recipients when the subscription kind is changed:
+      elements.subscriptionInput.on('change', updateRecipientsCount);
+
+      // 4) Bind dialogs to buttons:
       $('.choose-objects-btn').on('click', () => components.objectsDialog.show());
       $('.choose-lists-btn').on('click', () => components.listsDialog.show());
 
-      // 4) Initialize the model:
+      // 5) Initialize the model:
       state.model.initialize();
     },
   }
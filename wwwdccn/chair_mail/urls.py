@@ -58,6 +58,10 @@ urlpatterns = [
          name='list-mailing-lists'),
     path('<int:conf_pk>/api/mailing_lists/<str:name>/',
          api.mailing_list_details, name='mailing-list-details'),
+    path('<int:conf_pk>/api/recipients/user/', api.count_recipients,
+         {'msg_type': MSG_TYPE_USER}, name='count-recipients-user'),
+    path('<int:conf_pk>/api/recipients/submission/', api.count_recipients,
+         {'msg_type': MSG_TYPE_SUBMISSION}, name='count-recipients-submission'),
     path('<int:conf_pk>/api/users/', api.list_users, name='list-users'),
     path('<int:conf_pk>/api/submissions/', api.list_submissions,
          name='list-submissions'),
@@ -1,6 +1,13 @@
+import re
+from functools import lru_cache
+
 from django.conf import settings
 from django.http import Http404
+from django.template import Template
+from django.template.base import Lexer, TokenType
 from django.urls import reverse
+from html2text import html2text
+from markdown import markdown
 
 
 def get_email_frame_or_404(conference):
@@ -16,6 +23,55 @@ def get_email_frame(conference):
     return None
 
 
+@lru_cache(maxsize=256)
+def compile_template(source):
+    """Get a compiled `Template` for the given source string.
+
+    Templates are cached by their source (least recently used ones are
+    evicted), so the subject, body and frame of a group message are parsed
+    once per process instead of once per recipient. Compiled templates
+    don't keep state between renderings, so sharing them is safe.
+    """
+    return Template(source)
+
+
+_IDENTIFIER_REGEX = re.compile(r'[A-Za-z_]\w*')
+
+
+@lru_cache(maxsize=256)
+def _get_source_names(source):
+    names = set()
+    for token in Lexer(source).tokenize():
+        if token.token_type in (TokenType.VAR, TokenType.BLOCK):
+            names.update(_IDENTIFIER_REGEX.findall(token.contents))
+    return frozenset(names)
+
+
+def get_template_names(*sources):
+    """Get all names met in variables and tags of the template sources.
+
+    The result is a superset of context variables the templates may use
+    (it also contains tag names, filter names, etc.), so it is safe to skip
+    building any context variable which is not in this set.
+    """
+    names = set()
+    for source in sources:
+        names.update(_get_source_names(source))
+    return frozenset(names)
+
+
+@lru_cache(maxsize=256)
+def render_markdown(text):
+    """Memoised `markdown()`, since many messages have identical bodies."""
+    return markdown(text)
+
+
+@lru_cache(maxsize=32)
+def html_to_text(html):
+    """Memoised `html2text()`, used to build plain-text frames."""
+    return html2text(html)
+
+
 def get_absolute_url(url):
     url = url.lstrip()
     _url = url.lower()
@@ -73,6 +129,16 @@ def reverse_list_objects_url(msg_type, conference):
     raise ValueError(f'unexpected message type "{msg_type}"')
 
 
+def reverse_count_recipients_url(msg_type, conference):
+    from .models import MSG_TYPE_USER, MSG_TYPE_SUBMISSION
+    kwargs = {'conf_pk': conference.pk}
+    if msg_type == MSG_TYPE_USER:
+        return reverse('chair_mail:count-recipients-user', kwargs=kwargs)
+    elif msg_type == MSG_TYPE_SUBMISSION:
+        return reverse('chair_mail:count-recipients-submission', kwargs=kwargs)
+    raise ValueError(f'unexpected message type "{msg_type}"')
+
+
 def get_object_url(msg_type, conference, obj):
     from .models import MSG_TYPE_USER, MSG_TYPE_SUBMISSION
     if msg_type == MSG_TYPE_USER:
@@ -103,6 +169,31 @@ def get_object_model(msg_type):
     raise ValueError(f'unexpected message type "{msg_type}"')
 
 
+def encode_pk_set(pks):
+    """Encode a set of primary keys as a string of sorted ranges, e.g.
+    `[1, 2, 3, 5, 7, 8]` -> `'1-3,5,7-8'`.
+    """
+    ranges = []
+    for pk in sorted(set(pks)):
+        if ranges and ranges[-1][1] == pk - 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return ','.join(str(first) if first == last else f'{first}-{last}'
+                    for first, last in ranges)
+
+
+def decode_pk_set(text):
+    """Decode a string built with `encode_pk_set()` into a list of keys."""
+    pks = []
+    for item in text.split(','):
+        if not item:
+            continue
+        first, _, last = item.partition('-')
+        pks.extend(range(int(first), int(last or first) + 1))
+    return pks
+
+
 def send_notification_message(conference, name, recipients, sender=None):
     from .models import SystemNotification
     notif = SystemNotification.objects.get(conference=conference, name=name)
@@ -110,9 +201,19 @@ def send_notification_message(conference, name, recipients, sender=None):
 
 
 def send_submission_status_notification_message(submission):
+    send_status_notification_message(
+        submission.conference, submission.status, [submission])
+
+
+def send_status_notification_message(conference, status, submissions,
+                                     sender=None):
+    """Notify authors of the submissions that their status was changed to
+    `status` with a single group message.
+
+    :param submissions: an iterable of `Submission` objects or their PKs
+    """
     from submissions.models import Submission
     from .models import SystemNotification
-    status = submission.status
     if status == Submission.SUBMITTED:
         name = SystemNotification.ASSIGN_STATUS_SUBMIT
     elif status == Submission.UNDER_REVIEW:
@@ -127,4 +228,4 @@ def send_submission_status_notification_message(submission):
         name = SystemNotification.ASSIGN_STATUS_PUBLISHED
     else:
         return
-    send_notification_message(submission.conference, name, [submission])
+    send_notification_message(conference, name, submissions, sender=sender)
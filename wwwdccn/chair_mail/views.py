@@ -18,7 +18,7 @@ from chair_mail.models import EmailSettings, EmailFrame, EmailMessage, \
     get_message_leaf_model, SystemNotification, DEFAULT_NOTIFICATIONS_DATA
 from chair_mail.utility import get_email_frame, get_email_frame_or_404, \
     reverse_preview_url, reverse_list_objects_url, get_object_name, \
-    get_object_url
+    get_object_url, reverse_count_recipients_url
 from conferences.models import Conference
 
 
@@ -175,14 +175,13 @@ def create_compose_view(msg_type, object_icon_class):
             next_url = request.POST.get('next', default_next_url)
             form = MessageForm(request.POST, msg_type=msg_type)
             if form.is_valid():
-                all_objects_to = list(form.cleaned_objects)
-                for ml in form.cleaned_lists:
-                    all_objects_to.extend(list(ml.query(conference)))
+                recipients = form.get_recipients(conference)
                 msg = message_class.create(
                     subject=form.cleaned_data['subject'],
                     body=form.cleaned_data['body'],
                     conference=conference,
-                    objects_to=list(set(all_objects_to)),
+                    objects_to=recipients.values_list('pk', flat=True),
+                    subscription=form.cleaned_data['subscription'],
                 )
                 msg.send(sender=request.user)
                 return redirect(next_url)
@@ -198,6 +197,7 @@ def create_compose_view(msg_type, object_icon_class):
             form = MessageForm(initial={
                 'objects': request.GET.get('objects', ''),
                 'lists': request.GET.get('lists', ''),
+                'exclude': request.GET.get('exclude', ''),
             }, msg_type=msg_type)
             next_url = request.GET.get('next', default_next_url)
 
@@ -212,6 +212,8 @@ def create_compose_view(msg_type, object_icon_class):
                 'preview_form': preview_form_class(),
                 'list_objects_url':
                     reverse_list_objects_url(msg_type, conference),
+                'count_recipients_url':
+                    reverse_count_recipients_url(msg_type, conference),
                 'object_icon_class': object_icon_class,
             })
     return handler
@@ -229,7 +231,9 @@ def message_details(request, conf_pk, msg_pk):
             'subject': msg.subject,
             'sent_at': msg.sent_at,
             'sent_by': msg.sent_by.pk if msg.sent_by else '',
-            'user_to': msg.user_to.pk,
+            'user_to': msg.user_to.pk if msg.user_to else '',
+            'email_to': msg.recipient,
+            'status': msg.status,
         })
     next_url = request.GET.get('next', default='')
     return render(
@@ -0,0 +1,76 @@
+"""Memoised checks of user roles in conferences.
+
+Each role (chair, author, reviewer) is checked with a single EXISTS query
+per conference, and the answer is kept in the `AccessResolver` of the user
+object. Since `request.user` is created for each request, answers live
+as long as the request.
+"""
+from conferences.models import Conference
+from review.models import Reviewer
+from submissions.models import Author
+
+
+def _get_pk(obj):
+    return getattr(obj, 'pk', obj)
+
+
+class AccessResolver:
+    """Answers questions like "is the user a chair of this conference?".
+
+    Conferences and submissions can be passed either as instances or
+    as primary keys. Anonymous users have no roles, and no queries are made
+    for them.
+    """
+    def __init__(self, user):
+        self.user = user
+        self._cache = {}
+
+    def _check(self, role, pk, get_queryset):
+        key = (role, pk)
+        if key not in self._cache:
+            if self.user.is_authenticated:
+                self._cache[key] = get_queryset().exists()
+            else:
+                self._cache[key] = False
+        return self._cache[key]
+
+    def is_chair(self, conference):
+        pk = _get_pk(conference)
+        return self._check('chair', pk, lambda: Conference.chairs.through.
+                           objects.filter(conference_id=pk,
+                                          user_id=self.user.pk))
+
+    def is_author(self, conference):
+        pk = _get_pk(conference)
+        return self._check('author', pk, lambda: Author.objects.filter(
+            submission__conference_id=pk, user_id=self.user.pk))
+
+    def is_reviewer(self, conference):
+        pk = _get_pk(conference)
+        return self._check('reviewer', pk, lambda: Reviewer.objects.filter(
+            conference_id=pk, user_id=self.user.pk))
+
+    def is_submission_author(self, submission):
+        """Check whether the user is an author or the creator of the
+        submission. Unlike other checks, `submission` must be an instance.
+        """
+        if submission.created_by_id is not None and \
+                submission.created_by_id == self.user.pk:
+            return True
+        return self._check(
+            'submission_author', submission.pk, lambda: Author.objects.filter(
+                submission_id=submission.pk, user_id=self.user.pk))
+
+
+def get_access(user):
+    """Get the `AccessResolver` of the user, creating it at first call.
+
+    :param user: `User` or `AnonymousUser` (or a lazy `request.user`)
+    :return: `AccessResolver`
+    """
+    resolver = getattr(user, '_access_resolver', None)
+    if resolver is None:
+        resolver = AccessResolver(user)
+        user._access_resolver = resolver
+    return resolver
+
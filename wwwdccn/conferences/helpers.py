@@ -1,8 +1,9 @@
+from conferences.access import get_access
 from submissions import helpers as submissions_helpers
 
 
 def can_edit_conference(user, conference):
-    return user in conference.chairs.all()
+    return get_access(user).is_chair(conference)
 
 
 def get_authors_of(submissions):
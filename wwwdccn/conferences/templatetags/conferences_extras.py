@@ -1,6 +1,7 @@
 from django import template
 from django.contrib.auth import get_user_model
 
+from conferences.access import get_access
 from conferences.helpers import (
     get_authors_of, get_countries_of, get_affiliations_of,
 )
@@ -25,11 +26,15 @@ def affiliations(conference):
     return get_affiliations_of(conference.submission_set.all())
 
 
+@register.filter
+def is_chair(conference, user):
+    return get_access(user).is_chair(conference)
+
+
 @register.filter
 def is_author(conference, user):
     assert isinstance(user, User)
-    authors = get_authors_of(conference.submission_set.all())
-    return user in authors
+    return get_access(user).is_author(conference)
 
 
 @register.filter
@@ -51,8 +56,7 @@ def list_submission_by(conference, user):
 @register.filter
 def is_reviewer(conference, user):
     assert isinstance(user, User)
-    reviewers = Reviewer.objects.filter(conference=conference, user=user)
-    return reviewers.count() > 0
+    return get_access(user).is_reviewer(conference)
 
 
 @register.filter
@@ -1,6 +1,8 @@
 from django.http import Http404
 
+from conferences.access import get_access
+
 
 def validate_chair_access(user, conference):
-    if user not in conference.chairs.all():
+    if not get_access(user).is_chair(conference):
         raise Http404
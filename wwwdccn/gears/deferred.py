@@ -0,0 +1,117 @@
+"""Deferred updates of dependent data, coalesced within a cascade of saves.
+
+Receivers often update data dependent on the saved object (review stages
+and camera-ready of a submission, facts, statistics, search documents).
+Saving one object may cause a cascade of saves, and each of them would
+repeat these updates. Instead, receivers call `defer_update(func, keys)`,
+and `func(keys)` is called once with keys collected from all calls:
+
+- updates are collected inside `coalesce_updates()` block and applied when
+  the block exits, so the caller sees them right after the block (e.g.,
+  `Submission.save()` returns when review stages are already created);
+- late updates (`late=True`) of caches (facts, statistics, search
+  documents) are collected until the transaction commits.
+
+Without a block (or a transaction, for late updates) `func(keys)` is called
+immediately. Each function is called inside its own transaction. Updates
+deferred while it runs are joined with pending ones, so a function is called
+again only if new keys were added after it was called. Late updates are
+called after all others.
+
+Functions should process any number of keys with a fixed number of queries
+and ignore keys of deleted objects.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+_local = threading.local()
+
+
+class _Dispatcher:
+    def __init__(self):
+        self.pending = {}  # (late, func) -> set of keys, ordered
+
+    def add(self, func, keys, late):
+        self.pending.setdefault((late, func), set()).update(keys)
+
+    def __call__(self):
+        # Updates deferred while functions run are joined with pending ones:
+        previous, _local.current = getattr(_local, 'current', None), self
+        try:
+            while self.pending:
+                key = min(self.pending, key=lambda item: item[0])
+                keys = self.pending.pop(key)
+                with transaction.atomic():
+                    key[1](keys)
+        finally:
+            _local.current = previous
+
+
+class _CommitDispatcher(_Dispatcher):
+    pass
+
+
+def _run(func, keys, late):
+    dispatcher = _Dispatcher()
+    dispatcher.add(func, keys, late)
+    dispatcher()
+
+
+def defer_update(func, keys, late=False):
+    """Call `func(keys)` when the current `coalesce_updates()` block exits
+    (or the transaction commits, if `late` is `True`), joining keys with
+    other calls of the same function, or immediately.
+
+    :param func: a function accepting a set of keys
+    :param keys: an iterable of keys (e.g., primary keys), `None` is ignored
+    :param late: if `True`, the function is called after the transaction
+        commits, and after all other updates
+    """
+    keys = {key for key in keys if key is not None}
+    if not keys:
+        return
+    current = getattr(_local, 'current', None)
+    if not late:
+        if current is not None:
+            current.add(func, keys, late)
+        else:
+            _run(func, keys, late)
+        return
+    if isinstance(current, _CommitDispatcher):
+        current.add(func, keys, late)
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _run(func, keys, late)
+        return
+    # Join the dispatcher of this transaction, if any. If it was registered
+    # in a savepoint rolled back later, the callback is dropped together with
+    # the savepoint, and a new one is registered:
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, _CommitDispatcher):
+            break
+    else:
+        callback = _CommitDispatcher()
+        transaction.on_commit(callback)
+    callback.add(func, keys, late)
+
+
+@contextmanager
+def coalesce_updates():
+    """Collect updates deferred inside the block and apply them on exit.
+
+    Nested blocks join the outer one. If the block raises an exception,
+    collected updates are dropped.
+    """
+    if getattr(_local, 'current', None) is not None:
+        yield
+        return
+    dispatcher = _local.current = _Dispatcher()
+    try:
+        yield
+    finally:
+        _local.current = None
+    dispatcher()
@@ -0,0 +1,181 @@
+"""Serving private media files (manuscripts, attachments) to users.
+
+Views check permissions and then call `serve_file()`, which sends the file
+in one of three modes, defined by `settings.MEDIA_DOWNLOAD_MODE`:
+
+- 'accel': Django only sends `X-Accel-Redirect` header, and nginx serves
+  the file from an internal location (`settings.MEDIA_ACCEL_PREFIX`).
+  Works with local media only.
+
+- 'redirect': the user is redirected to a short-lived signed URL of the
+  CDN (OpenStack Swift temporary URL, supported by Selectel storage).
+  Works with SFTP media only and requires `settings.MEDIA_SIGNED_URL_KEY`.
+
+- 'stream' (default and fallback): the file is streamed in chunks by Django
+  with support of `ETag`, `If-None-Match` and single `Range` requests.
+"""
+import hashlib
+import hmac
+import mimetypes
+import re
+import time
+from urllib.parse import quote, urlencode, urlsplit
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, \
+    StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from storages.backends.sftpstorage import SFTPStorage
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def serve_file(request, field_file, filename):
+    """Send the file stored in `field_file` to the user.
+
+    :param request: `HttpRequest`
+    :param field_file: `FieldFile` instance (e.g. `attachment.file`)
+    :param filename: file name to be shown to the user
+    :return: `HttpResponse`
+    """
+    content_type = mimetypes.guess_type(filename)[0]
+    mode = settings.MEDIA_DOWNLOAD_MODE
+    storage = field_file.storage
+
+    if mode == 'accel' and settings.USE_LOCAL_MEDIA:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = \
+            f'{settings.MEDIA_ACCEL_PREFIX}{quote(field_file.name)}'
+    elif (mode == 'redirect' and isinstance(storage, SFTPStorage) and
+          settings.MEDIA_SIGNED_URL_KEY):
+        response = HttpResponseRedirect(
+            get_signed_url(field_file, filename))
+        response['Cache-Control'] = 'private, no-store'
+        return response
+    else:
+        response = stream_file(request, field_file, content_type)
+    response['Content-Disposition'] = f'filename={filename}'
+    return response
+
+
+def get_signed_url(field_file, filename=''):
+    """Build a temporary URL of the file stored at CDN.
+
+    The signature follows OpenStack Swift TempURL middleware: HMAC-SHA1 of
+    method, expiration time and the object path, signed with
+    `settings.MEDIA_SIGNED_URL_KEY`. The URL expires in
+    `settings.MEDIA_SIGNED_URL_TTL` seconds.
+    """
+    url = field_file.storage.url(field_file.name)
+    path = urlsplit(url).path
+    expires = int(time.time()) + settings.MEDIA_SIGNED_URL_TTL
+    signature = hmac.new(
+        settings.MEDIA_SIGNED_URL_KEY.encode(),
+        f'GET\n{expires}\n{path}'.encode(),
+        hashlib.sha1
+    ).hexdigest()
+    params = {'temp_url_sig': signature, 'temp_url_expires': expires}
+    if filename:
+        params['filename'] = filename
+    return f'{url}?{urlencode(params)}'
+
+
+def stream_file(request, field_file, content_type):
+    """Stream the file in chunks, supporting conditional and range requests.
+    """
+    f, size, mtime = _open(field_file)
+    etag = '"{}"'.format(hashlib.md5(
+        f'{field_file.name}:{size}:{mtime}'.encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        f.close()
+        return response
+
+    start, end = 0, size - 1
+    byte_range = _parse_range(request, etag, size)
+    if byte_range == 'invalid':
+        f.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    chunk_size = settings.MEDIA_DOWNLOAD_CHUNK_SIZE
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+        response.block_size = chunk_size
+    else:
+        start, end = byte_range
+        f.seek(start)
+        response = StreamingHttpResponse(
+            _read_range(f, end - start + 1, chunk_size),
+            status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
+
+
+def _open(field_file):
+    """Open the file for reading, return `(file, size, mtime)`.
+
+    Files opened by `SFTPStorage` are fully read into memory at first
+    access, so for this storage the remote file is opened directly.
+    """
+    storage = field_file.storage
+    if isinstance(storage, SFTPStorage):
+        # noinspection PyProtectedMember
+        f = storage.sftp.open(storage._remote_path(field_file.name), 'rb')
+        f.prefetch()
+        stat = f.stat()
+        return f, stat.st_size, stat.st_mtime
+    f = storage.open(field_file.name, 'rb')
+    try:
+        mtime = storage.get_modified_time(field_file.name).timestamp()
+    except NotImplementedError:
+        mtime = None
+    return f, storage.size(field_file.name), mtime
+
+
+def _parse_range(request, etag, size):
+    """Parse the `Range` header.
+
+    :return: `None` if the whole file should be sent, a pair `(start, end)`
+        (inclusive), or `'invalid'` if the range is not satisfiable.
+        Multiple ranges are not supported, the whole file is sent for them.
+    """
+    header = request.META.get('HTTP_RANGE', '').strip()
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if if_range and if_range != etag:
+        return None
+    match = RANGE_RE.match(header)
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+    if start > end or start >= size:
+        return 'invalid'
+    return start, end
+
+
+def _read_range(f, length, chunk_size):
+    try:
+        while length > 0:
+            data = f.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
@@ -0,0 +1,25 @@
+"""Generation tokens for invalidating groups of cached values.
+
+Cached values depending on some data (e.g., facets of conference
+submissions) are stored under keys that include the generation token of
+that data. When the data changes, the token is dropped, so the next read
+gets a new token and builds the value again, while old values expire:
+
+    key = f'facets:{get_generation(f"conference:{pk}")}'
+    ...
+    invalidate_generation(f'conference:{pk}')
+"""
+import uuid
+
+from django.core.cache import cache
+
+
+def get_generation(name):
+    """Get the current token of the generation, creating it if missing."""
+    return cache.get_or_set(
+        f'generation:{name}', lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_generation(name):
+    """Drop the token, so values cached under the old one are not used."""
+    cache.delete(f'generation:{name}')
@@ -0,0 +1,17 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+# noinspection PyUnusedLocal
+def create_cache_table(apps, schema_editor):
+    # The table of the shared cache (see `CACHES` setting) is not a model,
+    # so it is created by the command (tables which exist are skipped):
+    call_command('createcachetable', database=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
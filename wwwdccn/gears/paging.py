@@ -0,0 +1,170 @@
+"""Keyset (cursor) pagination for long lists.
+
+Instead of `OFFSET`, a page is selected with a condition on the ordering
+key of the last (or first) item of the previous page, so only the current
+page is fetched. Items are ordered by `(key, pk)`, the `pk` breaks ties.
+
+Query string parameters:
+
+- `after`: cursor of the last item of the previous page;
+- `before`: cursor of the first item of the next page;
+- `last`: if present, the last page is shown;
+- `start`: index of the first item of the page, used only for display.
+"""
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+CURSOR_PARAMS = ('after', 'before', 'last', 'start')
+
+
+class KeysetPage:
+    """A page of items selected by `paginate_by_key()`.
+
+    Iterating over the page gives item values (e.g., primary keys).
+    """
+    def __init__(self, items, cursors, count, start, per_page,
+                 has_previous, has_next):
+        self.items = items
+        self.count = count
+        self.start_index = start if items else 0
+        self.end_index = start + len(items) - 1 if items else 0
+        self.has_previous = has_previous
+        self.has_next = has_next
+        self.previous_cursor = _encode(cursors[0]) if cursors else ''
+        self.next_cursor = _encode(cursors[-1]) if cursors else ''
+        self.previous_start = max(start - per_page, 1)
+        self.next_start = start + len(items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+
+def paginate_by_key(request, queryset, key='pk', descending=False,
+                    item='pk', per_page=None):
+    """Get a page of `queryset` ordered by `(key, pk)`.
+
+    The total number of items is cached for `LIST_COUNT_CACHE_TIMEOUT`
+    seconds under a key built from the request path and filter parameters,
+    so it is computed once while the user pages through the list.
+
+    :param request: `HttpRequest` with cursor parameters in `GET`
+    :param queryset: a queryset of filtered items, its ordering is ignored
+    :param key: name of a field or annotation to order by
+    :param descending: if `True`, items are ordered in descending order
+    :param item: name of the field returned as the page items
+    :param per_page: number of items per page, `ITEMS_PER_PAGE` by default
+    :return: `KeysetPage`
+    """
+    per_page = per_page or settings.ITEMS_PER_PAGE
+    fields = ['pk'] if key == 'pk' else [key, 'pk']
+    after = _decode(request.GET.get('after'), fields, queryset)
+    before = _decode(request.GET.get('before'), fields, queryset)
+    show_last = after is None and before is None and 'last' in request.GET
+    backward = before is not None or show_last
+
+    reverse = descending != backward
+    lookup = 'lt' if reverse else 'gt'
+    cursor = before if backward else after
+    page_queryset = queryset
+    if cursor is not None:
+        page_queryset = queryset.filter(_follows(fields, cursor, lookup))
+    direction = '-' if reverse else ''
+    rows = list(page_queryset.order_by(
+        *[f'{direction}{field}' for field in fields]
+    ).values_list(item, *fields)[:per_page + 1])
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+        has_previous, has_next = has_more, before is not None
+    else:
+        has_previous, has_next = after is not None, has_more
+
+    count = _get_count(request, queryset)
+    if show_last:
+        start = max(count - len(rows) + 1, 1)
+    elif not has_previous:
+        start = 1
+    else:
+        try:
+            start = max(int(request.GET.get('start', 1)), 1)
+        except ValueError:
+            start = 1
+    return KeysetPage(
+        items=[row[0] for row in rows],
+        cursors=[list(row[1:]) for row in rows],
+        count=count, start=start, per_page=per_page,
+        has_previous=has_previous, has_next=has_next)
+
+
+def _follows(fields, cursor, lookup):
+    if len(fields) == 1:
+        return Q(**{f'pk__{lookup}': cursor[0]})
+    key, value, pk = fields[0], cursor[0], cursor[1]
+    return (Q(**{f'{key}__{lookup}': value}) |
+            Q(**{key: value, f'pk__{lookup}': pk}))
+
+
+def _get_count(request, queryset):
+    params = sorted((name, value) for name, values in request.GET.lists()
+                    for value in values if name not in CURSOR_PARAMS)
+    digest = hashlib.md5(
+        json.dumps([request.path, params]).encode()).hexdigest()
+    cache_key = f'paging-count:{digest}'
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, settings.LIST_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def _encode(values):
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _get_field(queryset, name):
+    if name == 'pk':
+        return queryset.model._meta.pk
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    return queryset.model._meta.get_field(name)
+
+
+def _decode(cursor, fields, queryset):
+    """Decode the cursor and convert its values to the types of the ordering
+    fields. Malformed cursors (including crafted ones with values of wrong
+    types, or null values, which ordering keys never have) give `None`, so
+    the first page is shown.
+    """
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data.decode())
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields) or any(
+            value is None or isinstance(value, (list, dict))
+            for value in values):
+        return None
+    try:
+        return [_get_field(queryset, name).to_python(value)
+                for name, value in zip(fields, values)]
+    except ValidationError:
+        return None
@@ -1,3 +1,34 @@
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
 
-# Create your tests here.
+from gears.paging import paginate_by_key, _encode
+from users.models import User
+
+
+class PaginateByKeyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(f'user{i}@example.com', 'pass')
+            for i in range(5)]
+
+    def get_page(self, key='pk', **params):
+        request = RequestFactory().get('/', params)
+        return paginate_by_key(
+            request, User.objects.all(), key=key, per_page=2)
+
+    def test_pages_follow_cursors(self):
+        page = self.get_page()
+        self.assertEqual(list(page), [u.pk for u in self.users[:2]])
+        page = self.get_page(after=page.next_cursor)
+        self.assertEqual(list(page), [u.pk for u in self.users[2:4]])
+        page = self.get_page(before=page.previous_cursor)
+        self.assertEqual(list(page), [u.pk for u in self.users[:2]])
+
+    def test_bad_cursor_gives_first_page(self):
+        first_page = [u.pk for u in self.users[:2]]
+        for key, values in (('pk', ['abc']), ('pk', [None]), ('pk', [[1]]),
+                            ('email', [{'a': 1}, 1]), ('email', ['a', 'y']),
+                            ('pk', [1, 2])):
+            page = self.get_page(key=key, after=_encode(values))
+            self.assertEqual(list(page), first_page)
+        self.assertEqual(list(self.get_page(after='%%%')), first_page)
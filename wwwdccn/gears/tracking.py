@@ -0,0 +1,63 @@
+"""Tracking of model field changes since the object was loaded or saved.
+
+Receivers often need to know whether a field was changed by the save (e.g.,
+submission status) to skip work otherwise. Instead of selecting the old
+object before saving, models inherit `TrackChangesMixin`, which remembers
+values of the fields loaded from the database (see `Model.from_db()`) and
+updates them after `save()` and `refresh_from_db()`:
+
+    class Submission(TrackChangesMixin, models.Model):
+        ...
+
+    submission.has_changed('status')
+
+Values are remembered after `post_save` is sent, so receivers see changes
+made by the save being processed.
+"""
+
+
+class TrackChangesMixin:
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_values()
+        return instance
+
+    def _remember_values(self, fields=None):
+        """Remember current values of the fields (all by default), skipping
+        those not loaded.
+        """
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.name not in fields and \
+                    field.attname not in fields:
+                continue
+            if field.attname in self.__dict__:
+                self._loaded_values[field.attname] = \
+                    self.__dict__[field.attname]
+
+    def has_changed(self, *fields):
+        """Check whether any of the fields differs from the value it had
+        when the object was loaded or saved last time.
+
+        New objects and fields which were not loaded (e.g., deferred ones)
+        are always considered changed.
+        """
+        # Values are compared as stored in the instance, not as returned by
+        # field descriptors (e.g., country codes instead of `Country`):
+        loaded = getattr(self, '_loaded_values', {})
+        for name in fields:
+            attname = self._meta.get_field(name).attname
+            if attname not in loaded or \
+                    loaded[attname] != self.__dict__.get(attname):
+                return True
+        return False
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._remember_values(fields)
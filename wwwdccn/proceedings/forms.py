@@ -21,7 +21,13 @@ class UpdateVolumeForm(ModelForm):
             )
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, volumes=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['volume'].queryset = self.instance.proc_type.volumes.all()
         self.fields['volume'].empty_label = EMPTY_VOLUME_LABEL
+        # If volumes of the proceedings type were already loaded (e.g. when
+        # rendering many forms at once), we build choices from them to
+        # avoid querying volumes for each form:
+        if volumes is not None:
+            self.fields['volume'].choices = [('', EMPTY_VOLUME_LABEL)] + [
+                (vol.pk, vol.name) for vol in volumes]
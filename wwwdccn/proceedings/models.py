@@ -1,13 +1,19 @@
+from collections import defaultdict
+
+from django.db import connection
 from django.db.models import Model, ForeignKey, CASCADE, SET_NULL, BooleanField
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 
 from conferences.models import ProceedingType, ProceedingVolume, \
-    ArtifactDescriptor
-from submissions.models import Submission, Attachment
+    ArtifactDescriptor, SubmissionType
+from gears.deferred import defer_update
+from gears.tracking import TrackChangesMixin
+from review.models import ReviewDecision
+from submissions.models import Submission, Attachment, submissions_updated
 
 
-class CameraReady(Model):
+class CameraReady(TrackChangesMixin, Model):
     submission = ForeignKey(
         Submission, on_delete=CASCADE, null=True, blank=True)
 
@@ -31,30 +37,86 @@ class CameraReady(Model):
                f' volume ({self.volume_id}){is_active}'
 
 
-@receiver(post_save, sender=Submission)
-def create_cameras_on_submission_accept(**kwargs):
+def update_camera_readies(submission_pks):
     """When a submission is accepted, create cameras for allowed proceeding
     types and mark them active. Cameras for all other proceeding types
     (those were possible due to submission type) mark as inactive.
 
     In all other cases except submission being printed or published,
     mark all existing cameras as inactive.
+
+    Cameras are created and updated with a fixed number of queries. Since
+    `post_save` is not sent, callers are responsible for updating facts of
+    the submissions.
     """
-    submission = kwargs['instance']
-    stage = submission.reviewstage_set.first()
-    decision_type = stage.decision.decision_type if stage else None
-    if decision_type is not None and submission.status == Submission.ACCEPTED:
-        allowed_proc_types = list(decision_type.allowed_proceedings.all())
-        all_proc_types = list(submission.stype.possible_proceedings.all())
-        for proc_type in all_proc_types:
-            camera, _ = CameraReady.objects.get_or_create(
-                submission=submission, proc_type=proc_type)
-            camera.active = proc_type in allowed_proc_types
-            camera.save()
-    elif submission not in {Submission.IN_PRINT, Submission.PUBLISHED}:
-        for camera in submission.cameraready_set.all():
-            camera.active = False
-            camera.save()
+    submissions = {}
+    for pk, status, stype_id, decision_type_id in Submission.objects.filter(
+            pk__in=submission_pks).order_by('reviewstage__pk').values_list(
+            'pk', 'status', 'stype_id',
+            'reviewstage__decision__decision_type'):
+        # Only the decision of the first review stage is taken:
+        submissions.setdefault(pk, (status, stype_id, decision_type_id))
+    allowed_proc_types = defaultdict(set)
+    for decision_type_id, proc_type_id in ProceedingType.objects.filter(
+            decision_types__in={item[2] for item in submissions.values()}
+    ).values_list('decision_types', 'pk'):
+        allowed_proc_types[decision_type_id].add(proc_type_id)
+    all_proc_types = defaultdict(list)
+    for stype_id, proc_type_id in \
+            SubmissionType.possible_proceedings.through.objects.filter(
+                submissiontype__in={item[1] for item in submissions.values()}
+            ).order_by('pk').values_list('submissiontype', 'proceedingtype'):
+        all_proc_types[stype_id].append(proc_type_id)
+    cameras = defaultdict(dict)
+    for camera in CameraReady.objects.filter(submission__in=submissions):
+        cameras[camera.submission_id][camera.proc_type_id] = camera
+
+    new_cameras, updated = [], {True: [], False: []}
+    for pk, (status, stype_id, decision_type_id) in submissions.items():
+        if decision_type_id is not None and status == Submission.ACCEPTED:
+            for proc_type_id in all_proc_types[stype_id]:
+                active = proc_type_id in allowed_proc_types[decision_type_id]
+                camera = cameras[pk].get(proc_type_id)
+                if camera is None:
+                    new_cameras.append(CameraReady(
+                        submission_id=pk, proc_type_id=proc_type_id,
+                        active=active))
+                elif camera.active != active:
+                    updated[active].append(camera.pk)
+        elif status not in {Submission.IN_PRINT, Submission.PUBLISHED}:
+            updated[False].extend(
+                camera.pk for camera in cameras[pk].values() if camera.active)
+
+    for active, pks in updated.items():
+        if pks:
+            CameraReady.objects.filter(pk__in=pks).update(active=active)
+            update_camera_attachments(pks)
+    if new_cameras:
+        create_camera_readies(new_cameras)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Submission)
+def update_cameras_on_submission_save(sender, instance, **kwargs):
+    # Cameras depend on the status, the type and the review decision of the
+    # submission. Decision changes are handled by the receiver below, since
+    # the status may stay the same (e.g., another kind of acceptance):
+    if instance.has_changed('status', 'stype'):
+        defer_update(update_camera_readies, [instance.pk])
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=ReviewDecision)
+def update_cameras_on_decision_save(sender, instance, created, **kwargs):
+    # Decisions created along with review stages are empty:
+    if not created or instance.decision_type_id is not None:
+        defer_update(update_camera_readies, [instance.stage.submission_id])
+
+
+# noinspection PyUnusedLocal
+@receiver(submissions_updated, sender=Submission)
+def update_cameras_on_submissions_update(sender, pks, **kwargs):
+    defer_update(update_camera_readies, pks)
 
 
 class Artifact(Model):
@@ -120,11 +182,15 @@ def create_artifacts_on_artifact_descriptor_create(
                 camera_ready=camera, descriptor=instance)
 
 
-def _update_attachment_access(attachment, descriptor, camera):
-    access = Attachment.INACTIVE
+def _get_attachment_access(descriptor, camera):
     if camera and camera.active:
-        access = Attachment.READWRITE if descriptor.editable else \
+        return Attachment.READWRITE if descriptor.editable else \
             Attachment.READONLY
+    return Attachment.INACTIVE
+
+
+def _update_attachment_access(attachment, descriptor, camera):
+    access = _get_attachment_access(descriptor, camera)
     if attachment.access != access:
         attachment.access = access
         return True
@@ -148,20 +214,62 @@ def update_attachment_on_descriptor_update(sender, instance, created, **kwargs):
             Attachment.objects.bulk_update(updated, ['access'])
 
 
+def update_camera_attachments(camera_pks):
+    """Update access to attachments of the cameras artifacts."""
+    updated = []
+    for art in Artifact.objects.filter(
+            camera_ready__in=camera_pks, attachment__isnull=False
+    ).select_related('attachment', 'descriptor', 'camera_ready'):
+        attachment, descriptor = art.attachment, art.descriptor
+        if _update_attachment_access(
+                attachment=attachment, descriptor=descriptor,
+                camera=art.camera_ready):
+            updated.append(attachment)
+    if updated:
+        Attachment.objects.bulk_update(updated, ['access'])
+
+
+def create_camera_readies(cameras):
+    """Create cameras along with artifacts and attachments for all their
+    proceedings artifact descriptors with a fixed number of queries.
+    """
+    CameraReady.objects.bulk_create(cameras)
+    keys = {(cam.submission_id, cam.proc_type_id): cam for cam in cameras}
+    for pk, submission_id, proc_type_id in CameraReady.objects.filter(
+            submission__in={cam.submission_id for cam in cameras}
+    ).values_list('pk', 'submission', 'proc_type'):
+        if (submission_id, proc_type_id) in keys:
+            keys[(submission_id, proc_type_id)].pk = pk
+    descriptors = defaultdict(list)
+    for descriptor in ArtifactDescriptor.objects.filter(
+            proc_type__in={cam.proc_type_id for cam in cameras}):
+        descriptors[descriptor.proc_type_id].append(descriptor)
+
+    items = [(cam, descriptor, Attachment(
+        submission_id=cam.submission_id,
+        access=_get_attachment_access(descriptor, cam),
+        code=descriptor.code, name=descriptor.name, label=descriptor.name
+    )) for cam in cameras for descriptor in descriptors[cam.proc_type_id]]
+    attachments = [attachment for _, _, attachment in items]
+    if connection.features.can_return_ids_from_bulk_insert:
+        Attachment.objects.bulk_create(attachments)
+    else:
+        # Artifacts need primary keys of the attachments, and only some
+        # databases (e.g., PostgreSQL) return them from bulk inserts:
+        for attachment in attachments:
+            attachment.save()
+    Artifact.objects.bulk_create(
+        Artifact(camera_ready_id=cam.pk, descriptor=descriptor,
+                 attachment_id=attachment.pk)
+        for cam, descriptor, attachment in items)
+
+
 # noinspection PyUnusedLocal
 @receiver(post_save, sender=CameraReady)
 def update_attachment_on_camera_update(sender, instance, created, **kwargs):
     assert isinstance(instance, CameraReady)
-    if not created:
-        updated = []
-        for art in instance.artifact_set.all():
-            attachment, descriptor = art.attachment, art.descriptor
-            if _update_attachment_access(
-                    attachment=attachment, descriptor=descriptor,
-                    camera=instance):
-                updated.append(attachment)
-        if updated:
-            Attachment.objects.bulk_update(updated, ['access'])
+    if not created and instance.has_changed('active'):
+        defer_update(update_camera_attachments, [instance.pk])
 
 
 # noinspection PyUnusedLocal
@@ -8,7 +8,9 @@ register = template.Library()
 
 @register.filter
 def camera_ready_set_of(submission):
-    return CameraReady.objects.filter(submission=submission, active=True)
+    # We filter cameras in Python to make use of prefetched cameras (if any):
+    return [camera for camera in submission.cameraready_set.all()
+            if camera.active]
 
 
 @register.filter
@@ -0,0 +1,237 @@
+"""Reviewer suggestions based on similarity of texts (affinity index).
+
+A submission is described by the terms of its title, abstract and topics.
+Term counts are stored in `SubmissionTerms` and updated by receivers in
+`review.models` when the submission changes. A reviewer is described by
+the submissions the reviewer authored.
+
+For each conference, term counts are weighted with TF-IDF into normalized
+sparse vectors, and reviewer vectors are put into an inverted index. The
+index also keeps authors and affiliations needed to check conflicts of
+interest. It is kept in the shared cache for `AFFINITY_INDEX_CACHE_TIMEOUT`
+seconds under a key with generation tokens (see `gears.generations`), which
+receivers drop when submissions, authors, reviewers or affiliations
+change. So `suggest_reviewers()` only reads the cached index and doesn't
+query submissions, authors or reviewers.
+"""
+import json
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from gears.generations import get_generation, invalidate_generation
+from review.assignment import has_conflict, normalize_affiliation
+from review.models import Reviewer, SubmissionTerms
+from submissions.models import Author, Submission
+
+
+WORD_REGEX = re.compile(r'[^\W\d_]{3,}')
+TITLE_WEIGHT = 2
+TOPIC_WEIGHT = 3
+
+STOP_WORDS = frozenset((
+    'about', 'and', 'are', 'based', 'been', 'between', 'both', 'but', 'can',
+    'for', 'from', 'has', 'have', 'into', 'its', 'more', 'not', 'our',
+    'paper', 'such', 'than', 'that', 'the', 'their', 'them', 'these', 'this',
+    'those', 'through', 'using', 'was', 'well', 'were', 'which', 'while',
+    'with', 'within', 'also', 'may', 'one', 'two', 'use', 'used', 'how',
+    'all', 'each', 'other', 'new', 'show', 'shown', 'results', 'approach',
+    'propose', 'proposed', 'method', 'methods', 'problem', 'work',
+))
+
+
+PROFILES_GENERATION = 'affinity:profiles'
+
+
+def _get_conference_generation(conference_id):
+    return f'affinity:conference:{conference_id}'
+
+
+def invalidate_conference_index(conference_id):
+    invalidate_generation(_get_conference_generation(conference_id))
+
+
+def invalidate_profile_index():
+    invalidate_generation(PROFILES_GENERATION)
+
+
+def get_terms(title, abstract, topics):
+    """Count terms of a submission: words of the title and abstract (title
+    words have higher weight) and topics.
+
+    :param title: submission title
+    :param abstract: submission abstract
+    :param topics: an iterable of topic IDs
+    :return: a dictionary `term -> count`
+    """
+    counts = Counter()
+    for text, weight in ((title, TITLE_WEIGHT), (abstract, 1)):
+        for word in WORD_REGEX.findall(text.lower()):
+            if word not in STOP_WORDS:
+                counts[word] += weight
+    for topic_id in topics:
+        counts[f'#topic:{topic_id}'] += TOPIC_WEIGHT
+    return dict(counts)
+
+
+def update_submission_terms(pks):
+    """Compute and save terms of the submissions with given primary keys.
+
+    :param pks: an iterable of submission primary keys
+    :return: a dictionary `pk -> terms` of existing submissions
+    """
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return {}
+    topics = defaultdict(list)
+    for sub_id, topic_id in Submission.topics.through.objects.filter(
+            submission__in=pks).values_list('submission', 'topic'):
+        topics[sub_id].append(topic_id)
+    terms = {
+        pk: get_terms(title, abstract, topics[pk])
+        for pk, title, abstract in Submission.objects.filter(
+            pk__in=pks).values_list('pk', 'title', 'abstract')
+    }
+    with transaction.atomic():
+        SubmissionTerms.objects.filter(submission__in=pks).delete()
+        SubmissionTerms.objects.bulk_create(
+            SubmissionTerms(submission_id=pk, terms=json.dumps(value))
+            for pk, value in terms.items())
+    return terms
+
+
+def _load_terms(pks):
+    """Load stored terms of submissions, computing missing ones."""
+    terms = {pk: json.loads(value) for pk, value in
+             SubmissionTerms.objects.filter(submission__in=pks).values_list(
+                 'submission', 'terms')}
+    missing = set(pks) - set(terms)
+    if missing:
+        terms.update(update_submission_terms(missing))
+    return terms
+
+
+def _normalize_vector(vector):
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {t: w / norm for t, w in vector.items()} if norm else {}
+
+
+def get_affinity_index(conference):
+    """Get the affinity index of the conference from cache, building it if
+    needed.
+    """
+    key = 'affinity-index:{}:{}:{}'.format(
+        conference.pk,
+        get_generation(_get_conference_generation(conference.pk)),
+        get_generation(PROFILES_GENERATION))
+    index = cache.get(key)
+    if index is None:
+        index = build_affinity_index(conference)
+        cache.set(key, index, settings.AFFINITY_INDEX_CACHE_TIMEOUT)
+    return index
+
+
+def build_affinity_index(conference):
+    """Build the affinity index of the conference with a fixed number of
+    queries (terms of submissions without stored terms are computed).
+
+    :return: a dictionary with keys:
+        - 'vectors': `submission_id -> {term: weight}`;
+        - 'postings': `term -> [(reviewer_id, weight), ...]`;
+        - 'reviewers': `reviewer_id -> (user_id, affiliation, coauthors)`;
+        - 'authors': `submission_id -> (authors IDs, affiliations)`.
+    """
+    # 1) Load reviewers, authors of the conference and reviewers papers:
+    reviewers = {
+        pk: (user_id, normalize_affiliation(affiliation), set())
+        for pk, user_id, affiliation in Reviewer.objects.filter(
+            conference=conference, user__isnull=False
+        ).values_list('pk', 'user_id', 'user__profile__affiliation')
+    }
+    users = [item[0] for item in reviewers.values()]
+    submission_ids = list(Submission.objects.filter(
+        conference=conference).values_list('pk', flat=True))
+    authors = {pk: (set(), set()) for pk in submission_ids}
+    for sub_id, user_id, affiliation in Author.objects.filter(
+            submission__conference=conference).values_list(
+            'submission', 'user', 'user__profile__affiliation'):
+        authors[sub_id][0].add(user_id)
+        if normalize_affiliation(affiliation):
+            authors[sub_id][1].add(normalize_affiliation(affiliation))
+    papers = defaultdict(set)
+    coauthors = defaultdict(set)
+    for user_id, sub_id, coauthor_id in Author.objects.filter(
+            submission__authors__user__in=users).values_list(
+            'submission__authors__user', 'submission', 'user'):
+        papers[user_id].add(sub_id)
+        coauthors[user_id].add(coauthor_id)
+    for user_id, _, reviewer_coauthors in reviewers.values():
+        reviewer_coauthors.update(coauthors[user_id])
+
+    # 2) Compute TF-IDF vectors. Document frequencies are counted over the
+    #    conference submissions only:
+    all_ids = set(submission_ids).union(*papers.values())
+    terms = _load_terms(all_ids)
+    num_docs = len(submission_ids)
+    frequency = Counter()
+    for pk in submission_ids:
+        frequency.update(terms.get(pk, {}).keys())
+    idf = {t: math.log((1 + num_docs) / (1 + num)) + 1
+           for t, num in frequency.items()}
+
+    def get_vector(pk):
+        return _normalize_vector({
+            t: (1 + math.log(count)) * idf[t]
+            for t, count in terms.get(pk, {}).items() if t in idf})
+
+    vectors = {pk: get_vector(pk) for pk in submission_ids}
+
+    # 3) Build reviewer vectors as sums of their papers vectors:
+    postings = defaultdict(list)
+    for reviewer_id, (user_id, _, _) in reviewers.items():
+        vector = Counter()
+        for pk in papers[user_id]:
+            vector.update(vectors[pk] if pk in vectors else get_vector(pk))
+        for t, w in _normalize_vector(vector).items():
+            postings[t].append((reviewer_id, w))
+
+    return {
+        'vectors': vectors,
+        'postings': dict(postings),
+        'reviewers': reviewers,
+        'authors': authors,
+    }
+
+
+def suggest_reviewers(submission, limit=None):
+    """Find reviewers of the submission conference with the most similar
+    papers, skipping reviewers with conflicts of interest.
+
+    :param submission: `Submission` instance
+    :param limit: maximum number of reviewers returned (all by default)
+    :return: a list of `(reviewer_id, score)` pairs, best matches first,
+        `score` is cosine similarity between 0 and 1.
+    """
+    index = get_affinity_index(submission.conference)
+    if submission.pk not in index['vectors']:
+        # The index was built before the submission was created, and the
+        # token was not dropped (e.g., the cache was unavailable):
+        invalidate_conference_index(submission.conference_id)
+        index = get_affinity_index(submission.conference)
+    scores = defaultdict(float)
+    for t, weight in index['vectors'].get(submission.pk, {}).items():
+        for reviewer_id, reviewer_weight in index['postings'].get(t, ()):
+            scores[reviewer_id] += weight * reviewer_weight
+    authors, affiliations = index['authors'].get(
+        submission.pk, (set(), set()))
+    suggestions = [
+        (reviewer_id, score) for reviewer_id, score in scores.items()
+        if not has_conflict(*index['reviewers'][reviewer_id],
+                            authors, affiliations)
+    ]
+    suggestions.sort(key=lambda item: (-item[1], item[0]))
+    return suggestions[:limit] if limit is not None else suggestions
@@ -0,0 +1,382 @@
+"""Bulk assignment of reviewers to submissions under review.
+
+The assignment is solved as a min-cost flow problem. Each review stage
+missing N reviews sends N units of flow through edges `stage -> reviewer`
+(a unit on the edge means the reviewer is assigned), and each reviewer
+passes at most `max_load - load` units to the sink, where `load` is the
+number of reviews the reviewer already has in the conference.
+
+- Edges `stage -> reviewer` are cheaper if the reviewer's topics (topics
+  of the reviewer's own submissions) overlap with the submission topics.
+- Each next review of a reviewer costs more than the previous one, so
+  the load is spread evenly.
+- Pairs with conflicts of interest have no edges at all. Conflicts are
+  authors of the submission, their co-authors in any conference and
+  people from the same affiliation as any of the authors.
+
+`plan_assignment()` loads data with a fixed number of queries and builds
+the plan without changing anything, so it serves as a dry run, and
+`AssignmentPlan.apply()` creates all reviews in one transaction.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from review.models import Review, ReviewStage, Reviewer, reviews_created
+from submissions.models import Author, Submission
+
+
+TOPIC_COST = 10  # cost of each submission topic the reviewer doesn't have
+LOAD_COST = 3  # cost of each review the reviewer already has
+
+
+class MinCostFlow:
+    """Minimum cost flow with primal-dual method.
+
+    Shortest paths are found with Dijkstra algorithm on reduced costs
+    (Johnson potentials), and then the flow is pushed along all shortest
+    paths at once with Dinic blocking flows over edges of zero reduced cost.
+    So the number of Dijkstra runs is the number of distinct path costs,
+    not the amount of flow. Costs must be non-negative integers.
+    """
+    def __init__(self, num_nodes):
+        # Each edge is `[to, capacity, cost, index of the reverse edge]`:
+        self.graph = [[] for _ in range(num_nodes)]
+        self.potential = [0] * num_nodes
+
+    def add_edge(self, u, v, capacity, cost):
+        """Add an edge `u -> v` and return its index in `graph[u]`."""
+        self.graph[u].append([v, capacity, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+        return len(self.graph[u]) - 1
+
+    def flow(self, source, sink):
+        """Push the maximum flow of minimum cost from `source` to `sink`.
+
+        :return: a pair `(flow, cost)`
+        """
+        total_flow, total_cost = 0, 0
+        while self._update_potential(source, sink):
+            while True:
+                level = self._get_levels(source)
+                if level[sink] < 0:
+                    break
+                pointers = [0] * len(self.graph)
+                while True:
+                    amount, cost = self._augment(
+                        source, sink, level, pointers)
+                    if not amount:
+                        break
+                    total_flow += amount
+                    total_cost += cost
+        return total_flow, total_cost
+
+    def _update_potential(self, source, sink):
+        """Find distances from `source` with Dijkstra algorithm and add them
+        to potentials. Return `False` if `sink` is not reachable."""
+        graph, potential = self.graph, self.potential
+        dist = [math.inf] * len(graph)
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            offset = d + potential[u]
+            for v, capacity, cost, _ in graph[u]:
+                if capacity > 0:
+                    nd = offset + cost - potential[v]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+        if dist[sink] == math.inf:
+            return False
+        for v, d in enumerate(dist):
+            if d < math.inf:
+                potential[v] += d
+        return True
+
+    def _is_admissible(self, u, edge):
+        v, capacity, cost, _ = edge
+        return (capacity > 0 and
+                cost + self.potential[u] - self.potential[v] == 0)
+
+    def _get_levels(self, source):
+        """BFS levels of nodes over edges of zero reduced cost."""
+        level = [-1] * len(self.graph)
+        level[source] = 0
+        queue = [source]
+        for u in queue:
+            for edge in self.graph[u]:
+                if level[edge[0]] < 0 and self._is_admissible(u, edge):
+                    level[edge[0]] = level[u] + 1
+                    queue.append(edge[0])
+        return level
+
+    def _augment(self, source, sink, level, pointers):
+        """Find a path along levels with DFS and push flow through it.
+        Return the amount of flow and its cost, or `(0, 0)`."""
+        graph = self.graph
+        path = []
+        u = source
+        while u != sink:
+            edges = graph[u]
+            while pointers[u] < len(edges):
+                edge = edges[pointers[u]]
+                if (level[edge[0]] == level[u] + 1 and
+                        self._is_admissible(u, edge)):
+                    break
+                pointers[u] += 1
+            if pointers[u] < len(edges):
+                path.append(u)
+                u = edges[pointers[u]][0]
+            elif path:
+                level[u] = -1  # dead end
+                u = path.pop()
+                pointers[u] += 1
+            else:
+                return 0, 0
+        edges = [graph[u][pointers[u]] for u in path]
+        amount = min(edge[1] for edge in edges)
+        for edge in edges:
+            edge[1] -= amount
+            graph[edge[0]][edge[3]][1] += amount
+        return amount, amount * sum(edge[2] for edge in edges)
+
+
+class AssignmentPlan:
+    """Reviews to be created by the bulk assignment.
+
+    - `assignments`: a list of `(stage_id, reviewer_id)` pairs;
+    - `missing`: a dictionary `stage_id -> number of reviews` which could not
+      be assigned (e.g., too many conflicts or too low `max_load`);
+    - `loads`: a dictionary `reviewer_id -> number of reviews` the reviewers
+      will have after the plan is applied;
+    - `common_topics`: a dictionary `(stage_id, reviewer_id) -> number of
+      common topics` for the planned pairs.
+    """
+    def __init__(self, conference, max_load, assignments, missing, loads,
+                 common_topics, stages):
+        self.conference = conference
+        self.max_load = max_load
+        self.assignments = assignments
+        self.missing = missing
+        self.loads = loads
+        self.common_topics = common_topics
+        self.stages = stages
+
+    @property
+    def num_missing(self):
+        return sum(self.missing.values())
+
+    def apply(self):
+        """Create planned reviews in one transaction, skipping pairs
+        assigned since the plan was built, locked stages, stages which
+        got enough reviews and reviewers who got `max_load` reviews in the
+        meantime.
+
+        :return: a list of created `Review` instances
+        """
+        stage_ids = {stage_id for stage_id, _ in self.assignments}
+        reviewer_ids = {reviewer_id for _, reviewer_id in self.assignments}
+        with transaction.atomic():
+            # Stage and reviewer rows are locked, so concurrent applies of
+            # plans wait for each other and see reviews created by them:
+            stages = {pk: (num_required, locked) for pk, num_required, locked
+                      in ReviewStage.objects.select_for_update().filter(
+                          pk__in=stage_ids).values_list(
+                          'pk', 'num_reviews_required', 'locked')}
+            reviewers = set(Reviewer.objects.select_for_update().filter(
+                pk__in=reviewer_ids, conference=self.conference
+            ).values_list('pk', flat=True))
+            existing = set(Review.objects.filter(
+                stage__in=stage_ids).values_list('stage', 'reviewer'))
+            free = {pk: num_required for pk, (num_required, _)
+                    in stages.items()}
+            for stage_id, _ in existing:
+                free[stage_id] -= 1
+            loads = dict(Review.objects.filter(
+                reviewer__in=reviewers).order_by().values_list(
+                'reviewer').annotate(num=Count('pk')))
+            reviews = []
+            for stage_id, reviewer_id in self.assignments:
+                if (stage_id not in stages or stages[stage_id][1] or
+                        free[stage_id] <= 0 or
+                        (stage_id, reviewer_id) in existing or
+                        reviewer_id not in reviewers or
+                        loads.get(reviewer_id, 0) >= self.max_load):
+                    continue
+                free[stage_id] -= 1
+                loads[reviewer_id] = loads.get(reviewer_id, 0) + 1
+                reviews.append(
+                    Review(stage_id=stage_id, reviewer_id=reviewer_id))
+            Review.objects.bulk_create(reviews)
+            reviews_created.send(
+                sender=Review, conference=self.conference, reviews=reviews)
+        return reviews
+
+
+def plan_assignment(conference, max_load=None):
+    """Assign reviewers to all submissions under review, which miss reviews.
+
+    :param conference: `Conference` instance
+    :param max_load: maximum number of reviews of a reviewer, including
+        already assigned ones. By default, the smallest load allowing to
+        assign as many reviews as conflicts permit is chosen.
+    :return: `AssignmentPlan`
+    """
+    # 1) Load stages of submissions under review along with their
+    #    assigned reviewers:
+    stages = {}
+    for stage in ReviewStage.objects.filter(
+            submission__conference=conference,
+            submission__status=Submission.UNDER_REVIEW
+    ).order_by('pk').values('pk', 'submission_id', 'num_reviews_required',
+                            'locked'):
+        stages.setdefault(stage['submission_id'], stage)
+    stages = {stage['pk']: stage for stage in stages.values()
+              if not stage['locked']}
+    assigned = defaultdict(set)
+    for stage_id, reviewer_id in Review.objects.filter(
+            stage__in=list(stages)).values_list('stage', 'reviewer'):
+        assigned[stage_id].add(reviewer_id)
+    need = {pk: stage['num_reviews_required'] - len(assigned[pk])
+            for pk, stage in stages.items()}
+    need = {pk: num for pk, num in need.items() if num > 0}
+    submission_ids = [stages[pk]['submission_id'] for pk in need]
+
+    # 2) Load reviewers, their current loads and affiliations:
+    reviewers = list(Reviewer.objects.filter(
+        conference=conference, user__isnull=False
+    ).order_by('pk').values('pk', 'user_id', 'user__profile__affiliation'))
+    loads = dict(Review.objects.filter(
+        reviewer__conference=conference
+    ).order_by().values_list('reviewer').annotate(num=Count('pk')))
+    loads = {rev['pk']: loads.get(rev['pk'], 0) for rev in reviewers}
+    users = [rev['user_id'] for rev in reviewers]
+
+    # 3) Load topics, authors and co-authors:
+    topics = defaultdict(set)
+    for sub_id, topic_id in Submission.topics.through.objects.filter(
+            submission__in=submission_ids).values_list(
+            'submission', 'topic'):
+        topics[sub_id].add(topic_id)
+    user_topics = defaultdict(set)
+    for user_id, topic_id in Submission.topics.through.objects.filter(
+            submission__conference=conference,
+            submission__authors__user__in=users
+    ).values_list('submission__authors__user', 'topic'):
+        user_topics[user_id].add(topic_id)
+    authors = defaultdict(set)
+    affiliations = defaultdict(set)
+    for sub_id, user_id, affiliation in Author.objects.filter(
+            submission__in=submission_ids).values_list(
+            'submission', 'user', 'user__profile__affiliation'):
+        authors[sub_id].add(user_id)
+        if normalize_affiliation(affiliation):
+            affiliations[sub_id].add(normalize_affiliation(affiliation))
+    coauthors = defaultdict(set)
+    for user_id, coauthor_id in Author.objects.filter(
+            submission__authors__user__in=users).values_list(
+            'submission__authors__user', 'user'):
+        coauthors[user_id].add(coauthor_id)
+
+    # 4) Find pairs without conflicts and count their common topics:
+    common_topics = {}
+    for pk in need:
+        sub_id = stages[pk]['submission_id']
+        sub_authors = authors[sub_id]
+        for rev in reviewers:
+            user_id = rev['user_id']
+            if rev['pk'] in assigned[pk] or has_conflict(
+                    user_id, normalize_affiliation(
+                        rev['user__profile__affiliation']),
+                    coauthors[user_id], sub_authors, affiliations[sub_id]):
+                continue
+            common_topics[(pk, rev['pk'])] = len(
+                topics[sub_id] & user_topics[user_id])
+
+    # 5) Solve. If the load is not given, find the smallest one assigning
+    #    as many reviews as possible. A reviewer gets at most one review
+    #    of each stage, so no load above `max(loads) + len(need)` assigns
+    #    more. The number of assigned reviews never decreases with the
+    #    load (though it may stay the same for several increments, e.g.
+    #    when the only reviewer without conflicts is already busy), so the
+    #    load is found with binary search starting from the even spread:
+    costs = [
+        (pk, reviewer_id, TOPIC_COST * (
+            len(topics[stages[pk]['submission_id']]) - common))
+        for (pk, reviewer_id), common in common_topics.items()]
+
+    if max_load is not None:
+        assignments = _solve(need, loads, costs, max_load)
+    else:
+        total = sum(loads.values()) + sum(need.values())
+        lower = math.ceil(total / len(reviewers)) if reviewers else 0
+        upper = max(max(loads.values(), default=0) + len(need), lower)
+        solutions = {upper: _solve(need, loads, costs, upper)}
+        while lower < upper:
+            middle = (lower + upper) // 2
+            solutions[middle] = _solve(need, loads, costs, middle)
+            if len(solutions[middle]) == len(solutions[upper]):
+                upper = middle
+            else:
+                lower = middle + 1
+        max_load, assignments = upper, solutions[upper]
+
+    new_loads = dict(loads)
+    missing = dict(need)
+    for pk, reviewer_id in assignments:
+        new_loads[reviewer_id] += 1
+        missing[pk] -= 1
+    return AssignmentPlan(
+        conference, max_load, assignments,
+        {pk: num for pk, num in missing.items() if num > 0}, new_loads,
+        {pair: common_topics[pair] for pair in assignments}, stages)
+
+
+def _solve(need, loads, costs, max_load):
+    """Solve the assignment as min-cost flow problem.
+
+    :param need: a dictionary `stage_id -> number of missing reviews`
+    :param loads: a dictionary `reviewer_id -> number of reviews`
+    :param costs: an iterable of `(stage_id, reviewer_id, cost)`
+    :param max_load: maximum number of reviews per reviewer
+    :return: a list of `(stage_id, reviewer_id)` pairs
+    """
+    source, sink = 0, 1
+    stage_nodes = {pk: 2 + i for i, pk in enumerate(need)}
+    reviewer_nodes = {pk: 2 + len(need) + i for i, pk in enumerate(loads)}
+    network = MinCostFlow(2 + len(need) + len(loads))
+    for pk, num in need.items():
+        network.add_edge(source, stage_nodes[pk], num, 0)
+    for pk, load in loads.items():
+        for i in range(load, max_load):
+            network.add_edge(reviewer_nodes[pk], sink, 1, LOAD_COST * i)
+    edges = {}
+    for stage_id, reviewer_id, cost in costs:
+        edges[(stage_id, reviewer_id)] = network.add_edge(
+            stage_nodes[stage_id], reviewer_nodes[reviewer_id], 1, cost)
+    network.flow(source, sink)
+    return [pair for pair, index in edges.items()
+            if network.graph[stage_nodes[pair[0]]][index][1] == 0]
+
+
+def normalize_affiliation(affiliation):
+    return ' '.join((affiliation or '').lower().split())
+
+
+def has_conflict(user_id, affiliation, coauthors, authors, affiliations):
+    """Check whether a reviewer has a conflict of interest with a submission.
+
+    :param user_id: ID of the reviewer user
+    :param affiliation: normalized affiliation of the reviewer
+    :param coauthors: IDs of users who ever wrote a paper with the reviewer
+    :param authors: IDs of the submission authors
+    :param affiliations: normalized affiliations of the submission authors
+    """
+    return (user_id in authors or bool(coauthors & authors) or
+            bool(affiliation) and affiliation in affiliations)
@@ -0,0 +1,93 @@
+"""Bulk review decisions and status changes of many submissions at once.
+
+Saving `ReviewDecision` or `Submission` one by one causes a cascade of
+receivers and a notification message for each submission. Here statuses and
+decisions are written with queryset updates in one transaction, and then
+`submissions_updated` signal is sent, so receivers update review stages,
+camera-ready, facts, etc. of all the submissions together (see
+`gears.deferred`). Authors are notified with a single group message.
+"""
+from django.db import transaction
+
+from gears.deferred import coalesce_updates
+from review.models import ReviewStage, ReviewDecision, ReviewDecisionType, \
+    create_review_stages
+from submissions.models import Submission, submissions_updated
+
+
+DECISION_STATUS = {
+    ReviewDecisionType.ACCEPT: Submission.ACCEPTED,
+    ReviewDecisionType.REJECT: Submission.REJECTED,
+}
+
+
+def update_status(conference, submissions, status, sender=None):
+    """Set status of the submissions (only those of the conference).
+
+    :param submissions: a queryset of submissions
+    :param status: new status, one of `Submission.STATUS_CHOICE`
+    :param sender: a user notifications are sent by
+    :return: a list of PKs of submissions which status was changed
+    """
+    from chair_mail.utility import send_status_notification_message
+    with transaction.atomic(), coalesce_updates():
+        pks = list(Submission.objects.select_for_update().filter(
+            conference=conference, pk__in=submissions.order_by().values('pk')
+        ).exclude(status=status).order_by('pk').values_list('pk', flat=True))
+        if not pks:
+            return []
+        Submission.objects.filter(pk__in=pks).update(status=status)
+        submissions_updated.send(
+            sender=Submission, conference=conference, pks=pks)
+        send_status_notification_message(
+            conference, status, pks, sender=sender)
+    return pks
+
+
+def apply_decision(conference, submissions, decision_type, sender=None):
+    """Set the decision of the submissions (only those of the conference),
+    creating review stages if needed, and then set their statuses to
+    accepted or rejected.
+
+    :param submissions: a queryset of submissions
+    :param decision_type: `ReviewDecisionType` of the conference
+    :param sender: a user notifications are sent by
+    :return: a list of PKs of submissions which decision or status was
+        changed
+    """
+    with transaction.atomic(), coalesce_updates():
+        rows = list(Submission.objects.filter(
+            conference=conference, pk__in=submissions.order_by().values('pk')
+        ).values_list('pk', 'stype__num_reviews'))
+        pks = [pk for pk, _ in rows]
+
+        # 1) Create missing review stages, take the first stage of each
+        #    submission and update its decision:
+        stages = {}
+        for sub_pk, stage_pk in ReviewStage.objects.filter(
+                submission__in=pks).order_by('pk').values_list(
+                'submission', 'pk'):
+            stages.setdefault(sub_pk, stage_pk)
+        create_review_stages([
+            ReviewStage(submission_id=pk, num_reviews_required=num or 0,
+                        locked=False)
+            for pk, num in rows if pk not in stages])
+        for sub_pk, stage_pk in ReviewStage.objects.filter(
+                submission__in=pks).order_by('pk').values_list(
+                'submission', 'pk'):
+            stages.setdefault(sub_pk, stage_pk)
+        decisions = ReviewDecision.objects.filter(
+            stage__in=stages.values()).exclude(decision_type=decision_type)
+        changed = set(decisions.values_list('stage__submission', flat=True))
+        decisions.update(decision_type=decision_type)
+
+        # 2) Update statuses. Submissions which already had the status got
+        #    another decision type, so their camera-ready should be updated:
+        updated = update_status(
+            conference, Submission.objects.filter(pk__in=pks),
+            DECISION_STATUS[decision_type.decision], sender=sender)
+        other = sorted(changed - set(updated))
+        if other:
+            submissions_updated.send(
+                sender=Submission, conference=conference, pks=other)
+    return sorted(changed.union(updated))
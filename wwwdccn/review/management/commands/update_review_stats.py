@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from conferences.models import Conference
+from review.models import ReviewStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild review statistics (ReviewStats) from scratch for all ' \
+           'conferences or for the given one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-c', '--conference', type=int,
+                            help='Conference ID')
+
+    def handle(self, *args, **kwargs):
+        verbosity = kwargs['verbosity']
+        conference_id = kwargs['conference']
+
+        conferences = Conference.objects.all()
+        if conference_id is not None:
+            conferences = conferences.filter(id=conference_id)
+            if not conferences.exists():
+                self.stdout.write(self.style.ERROR(
+                    f'! conference with ID={conference_id} not found'))
+                return
+
+        num_updated = 0
+        for conference in conferences:
+            stats, _ = ReviewStats.objects.get_or_create(conference=conference)
+            stats.update_stats()
+            num_updated += 1
+            if verbosity > 1:
+                self.stdout.write(self.style.SUCCESS(
+                    f'+ updated stats of conference {conference.pk}: '
+                    f'{stats.num_submissions_reviewed} reviewed, '
+                    f'{stats.num_submissions_with_incomplete_reviews} '
+                    f'incomplete, median score {stats.median_score:.2f}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: updated review stats of {num_updated} conferences'))
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0009_remove_descriptor_from_attachment'),
+        ('review', '0015_auto_20191008_1419'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionTerms',
+            fields=[
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='terms', serialize=False, to='submissions.Submission')),
+                ('terms', models.TextField(default='{}')),
+            ],
+        ),
+    ]
@@ -1,19 +1,21 @@
 import statistics
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Model, CharField, ForeignKey, CASCADE, SET_NULL, \
-    IntegerField, FloatField, OneToOneField, ManyToManyField
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+    IntegerField, FloatField, OneToOneField, ManyToManyField, Count, Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver, Signal
 from django.utils.translation import ugettext_lazy as _
 
 from conferences.models import Conference, ProceedingType, ProceedingVolume, \
     ArtifactDescriptor
-from submissions.models import Submission
-from users.models import User
+from gears.deferred import defer_update, coalesce_updates
+from gears.tracking import TrackChangesMixin
+from submissions.models import Submission, Author, submissions_updated
+from users.models import User, Profile
 
 
-class ReviewStage(Model):
+class ReviewStage(TrackChangesMixin, Model):
     submission = models.ForeignKey(Submission, on_delete=SET_NULL, null=True)
     num_reviews_required = models.IntegerField()
     score = models.FloatField(null=True, blank=True, default=None)
@@ -38,32 +40,69 @@ class ReviewStage(Model):
         return self.decision.decision_type
 
 
+def update_review_stages(submission_pks):
+    """Create missing review stages of submissions under review, lock stages
+    (and their reviews) of submissions with decisions and unlock stages of
+    submissions under review.
+
+    Only the first stage of a submission is considered. Locks are updated
+    with a fixed number of queries.
+    """
+    submissions = Submission.objects.filter(pk__in=submission_pks)
+    stages = {}
+    for stage in ReviewStage.objects.filter(
+            submission__in=submissions).order_by('pk').values(
+            'pk', 'submission_id', 'locked'):
+        stages.setdefault(stage['submission_id'], stage)
+    to_create, to_lock, to_unlock = [], [], []
+    for pk, status, num_reviews in submissions.values_list(
+            'pk', 'status', 'stype__num_reviews'):
+        stage = stages.get(pk)
+        if status == Submission.UNDER_REVIEW:
+            if stage is None:
+                to_create.append(ReviewStage(
+                    submission_id=pk, num_reviews_required=num_reviews or 0,
+                    locked=False))
+            elif stage['locked']:
+                to_unlock.append(stage['pk'])
+        elif status in [Submission.ACCEPTED, Submission.REJECTED]:
+            if stage and not stage['locked']:
+                to_lock.append(stage['pk'])
+    for pks, locked in ((to_lock, True), (to_unlock, False)):
+        if pks:
+            ReviewStage.objects.filter(pk__in=pks).update(locked=locked)
+            Review.objects.filter(stage__in=pks).exclude(
+                locked=locked).update(locked=locked)
+    if to_create:
+        create_review_stages(to_create)
+
+
+def create_review_stages(stages):
+    """Create review stages along with their decisions with a fixed number
+    of queries. Since `post_save` is not sent, callers are responsible for
+    updating facts of the stages submissions.
+    """
+    ReviewStage.objects.bulk_create(stages)
+    ReviewDecision.objects.bulk_create(
+        ReviewDecision(stage_id=pk) for pk in ReviewStage.objects.filter(
+            submission__in=[stage.submission_id for stage in stages],
+            decision__isnull=True).values_list('pk', flat=True))
+
+
+# noinspection PyUnusedLocal
 @receiver(post_save, sender=Submission)
-def create_review_stage(**kwargs):
+def update_review_stage_on_submission_save(sender, instance, **kwargs):
     """When submission status is UNDER_REVIEW, we create a ReviewStage for it.
+    Stages of accepted and rejected submissions are locked.
     """
-    submission = kwargs.get('instance')
-    if (submission.status == Submission.UNDER_REVIEW and
-            submission.reviewstage_set.count() == 0):
-        sub_type = submission.stype
-        num_reviews_required = sub_type.num_reviews if sub_type else 0
-        ReviewStage.objects.create(
-            submission=submission, num_reviews_required=num_reviews_required,
-            locked=False)
+    if instance.has_changed('status'):
+        defer_update(update_review_stages, [instance.pk])
 
 
-@receiver(post_save, sender=Submission)
-def update_review_stage_lock(**kwargs):
-    submission = kwargs.get('instance')
-    stage = submission.reviewstage_set.first()
-    if submission.status in [Submission.ACCEPTED, Submission.REJECTED]:
-        if stage and not stage.locked:
-            stage.locked = True
-            stage.save()
-    elif submission.status == Submission.UNDER_REVIEW:
-        if stage and stage.locked:
-            stage.locked = False
-            stage.save()
+# noinspection PyUnusedLocal
+@receiver(submissions_updated, sender=Submission)
+def update_review_stages_on_submissions_update(sender, pks, **kwargs):
+    defer_update(update_review_stages, pks)
 
 
 # Create your models here.
@@ -72,6 +111,17 @@ class Reviewer(models.Model):
     conference = models.ForeignKey(Conference, on_delete=models.CASCADE)
 
 
+class SubmissionTerms(Model):
+    """Term counts of the submission title, abstract and topics, used to
+    suggest reviewers (see `review.affinity`).
+
+    Terms are updated by receivers below when the submission changes.
+    """
+    submission = OneToOneField(
+        Submission, on_delete=CASCADE, primary_key=True, related_name='terms')
+    terms = models.TextField(default='{}')  # JSON: term -> count
+
+
 SCORE = (
     ('1', _('1 - Very Poor')),
     ('2', _('2 - Below Average')),
@@ -81,7 +131,7 @@ SCORE = (
 )
 
 
-class Review(models.Model):
+class Review(TrackChangesMixin, models.Model):
     NUM_SCORES = 4
 
     # Score choices codes:
@@ -177,17 +227,26 @@ class Review(models.Model):
         return sum(values) / len(values) if values else 0
 
 
+# Sent after reviews are created with `bulk_create()` (e.g., by the bulk
+# reviewer assignment), since `post_save` is not sent in this case:
+reviews_created = Signal(providing_args=['conference', 'reviews'])
+
+
 @receiver([post_save, post_delete], sender=Review)
 def update_average_score_after_review_save(sender, instance, **kwargs):
     """Whenever a Review is updated or deleted, its owner should
     recompute the average score.
     """
-    instance.stage.update_score(commit=True)
+    if kwargs['signal'] is post_delete or \
+            instance.has_changed('stage', *instance.score_fields()):
+        instance.stage.update_score(commit=True)
 
 
 @receiver(post_save, sender=ReviewStage)
 def update_reviews_lock(**kwargs):
     stage = kwargs.get('instance')
+    if not stage.has_changed('locked'):
+        return
     updated_reviews = []
     for review in stage.review_set.all():
         if review.locked != stage.locked:
@@ -227,16 +286,20 @@ class ReviewDecision(Model):
                           related_name='decision')
 
     def save(self, *args, **kwargs):
-        ret = super().save(*args, **kwargs)
-        decision = self.decision_type.decision if self.decision_type else None
-        if decision:
-            submission = self.stage.submission
-            if decision == ReviewDecisionType.ACCEPT:
-                submission.status = Submission.ACCEPTED
-                submission.save()
-            elif decision == ReviewDecisionType.REJECT:
-                submission.status = Submission.REJECTED
-                submission.save()
+        # Updates caused by the submission status change are coalesced and
+        # applied before it returns (see `gears.deferred`):
+        with transaction.atomic(), coalesce_updates():
+            ret = super().save(*args, **kwargs)
+            decision = (self.decision_type.decision if self.decision_type
+                        else None)
+            if decision:
+                submission = self.stage.submission
+                if decision == ReviewDecisionType.ACCEPT:
+                    submission.status = Submission.ACCEPTED
+                    submission.save()
+                elif decision == ReviewDecisionType.REJECT:
+                    submission.status = Submission.REJECTED
+                    submission.save()
         return ret
 
 
@@ -283,36 +346,56 @@ class ReviewStats(Model):
 
     def update_stats(self):
         """Compute and record statistics.
-        """
-        from review.utilities import review_finished, count_required_reviews, \
-            get_average_score
 
-        # 1) Count submissions with complete, incomplete and missing reviews
-        stype_cache = {
-            st.pk: st for st in self.conference.submissiontype_set.all()
-        }
+        All data is loaded with a fixed number of queries (submissions,
+        their review stages and review counters), so the cost doesn't depend
+        on the number of submissions in the conference.
+        """
+        # 1) Load submissions (except drafts) along with the number of
+        #    required reviews, first review stages and reviews counters:
         submissions = self.conference.submission_set.exclude(
             status=Submission.SUBMITTED)
+        num_required = dict(submissions.values_list('pk', 'stype__num_reviews'))
+
+        stages = {}
+        for stage in ReviewStage.objects.filter(
+                submission__in=submissions).order_by('pk').values(
+                'pk', 'submission_id', 'num_reviews_required', 'score'):
+            stages.setdefault(stage['submission_id'], stage)
+
+        counters = {
+            item['stage']: item for item in Review.objects.filter(
+                stage__in=[st['pk'] for st in stages.values()]
+            ).values('stage').annotate(
+                num_assigned=Count('pk'),
+                num_submitted=Count('pk', filter=Q(submitted=True)))
+        }
 
+        # 2) Count submissions with complete, incomplete and missing reviews
         self.num_submissions_reviewed = 0
         self.num_submissions_with_incomplete_reviews = 0
         self.num_submissions_with_missing_reviewers = 0
-        for submission in submissions:
-            if review_finished(submission, stype_cache):
+        for sub_pk, required in num_required.items():
+            stage = stages.get(sub_pk)
+            counter = counters.get(stage['pk'], {}) if stage else {}
+            if counter.get('num_submitted', 0) >= (required or 0):
                 self.num_submissions_reviewed += 1
             else:
-                stage = submission.reviewstage_set.first()
-                if stage.get_num_missing_reviews() > 0:
+                num_missing = 0
+                if stage:
+                    num_missing = (stage['num_reviews_required'] -
+                                   counter.get('num_assigned', 0))
+                if num_missing > 0:
                     self.num_submissions_with_missing_reviewers += 1
                 self.num_submissions_with_incomplete_reviews += 1
 
-        # 2) Compute submission scores:
-        self.average_score = get_average_score(submissions)
+        # 3) Compute submission scores:
         self.median_score = 0.0
         self.q1_score = 0.0
         self.q3_score = 0.0
-        scores = [get_average_score(submission) for submission in submissions]
+        scores = [stages[pk]['score'] for pk in num_required if pk in stages]
         scores = [score for score in scores if score is not None and score > 0]
+        self.average_score = sum(scores) / len(scores) if scores else 0.0
         if scores:
             self.median_score = statistics.median(scores)
             under_median_scores = [
@@ -324,7 +407,7 @@ class ReviewStats(Model):
             if upper_median_scores:
                 self.q3_score = statistics.median(upper_median_scores)
 
-        # 3) Save!
+        # 4) Save!
         self.save()
 
     EXCELLENT_QUALITY = 'excellent'
@@ -349,13 +432,123 @@ class ReviewStats(Model):
         return ReviewStats.UNKNOWN_QUALITY
 
 
+def update_review_stats(conference_ids):
+    """Compute and record review statistics of the conferences."""
+    for conference_id in Conference.objects.filter(
+            pk__in=conference_ids).values_list('pk', flat=True):
+        stats, _ = ReviewStats.objects.get_or_create(
+            conference_id=conference_id)
+        stats.update_stats()
+
+
+def schedule_stats_update(conference_id):
+    """Schedule review statistics update for the conference.
+
+    Statistics is updated when the current transaction is committed (or
+    immediately, if not in a transaction). Multiple updates of the same
+    conference scheduled within a transaction are coalesced into one.
+    """
+    defer_update(update_review_stats, [conference_id], late=True)
+
+
 # noinspection PyUnusedLocal
-@receiver(post_save, sender=Review)
+@receiver([post_save, post_delete], sender=Review)
 def update_statistics(sender, instance, **kwargs):
     assert isinstance(instance, Review)
-    conference = instance.paper.conference
-    stats, _ = ReviewStats.objects.get_or_create(conference=conference)
-    stats.update_stats()
+    # Statistics depend on submitted reviews and their scores only:
+    if kwargs['signal'] is post_save and not instance.has_changed(
+            'stage', 'submitted', *instance.score_fields()):
+        return
+    if instance.stage_id is not None:
+        conference_id = Submission.objects.filter(
+            reviewstage=instance.stage_id).values_list(
+            'conference_id', flat=True).first()
+        schedule_stats_update(conference_id)
+
+
+# noinspection PyUnusedLocal
+@receiver(reviews_created, sender=Review)
+def update_statistics_on_reviews_created(sender, conference, **kwargs):
+    schedule_stats_update(conference.pk)
+
+
+#
+# Affinity index (see `review.affinity`):
+#
+def _invalidate_affinity(conference_ids):
+    from review.affinity import invalidate_conference_index
+    for conference_id in set(conference_ids):
+        if conference_id is not None:
+            invalidate_conference_index(conference_id)
+
+
+def _get_author_reviewer_conferences(submission_pks):
+    # Terms of a submission define papers of its authors, who may review in
+    # other conferences:
+    return list(Reviewer.objects.filter(
+        user__authorship__submission__in=submission_pks
+    ).values_list('conference_id', flat=True))
+
+
+def _update_terms(submission):
+    from review.affinity import update_submission_terms
+    update_submission_terms([submission.pk])
+    _invalidate_affinity([submission.conference_id] +
+                         _get_author_reviewer_conferences([submission.pk]))
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Submission)
+def update_terms_on_submission_save(sender, instance, created, **kwargs):
+    if instance.has_changed('title', 'abstract'):
+        _update_terms(instance)
+
+
+# noinspection PyUnusedLocal
+@receiver(m2m_changed, sender=Submission.topics.through)
+def update_terms_on_submission_topics_change(sender, instance, action,
+                                             reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        _update_terms(instance)
+    else:
+        # Topic is changed, so update its submissions (all of them, if the
+        # topic was cleared, since `pk_set` is unknown):
+        from review.affinity import update_submission_terms
+        pks = pk_set if pk_set is not None else Submission.objects.filter(
+            conference=instance.conference_id).values_list('pk', flat=True)
+        update_submission_terms(pks)
+        _invalidate_affinity([instance.conference_id] +
+                             _get_author_reviewer_conferences(pks))
+
+
+# noinspection PyUnusedLocal
+@receiver(post_delete, sender=Submission)
+@receiver([post_save, post_delete], sender=Reviewer)
+def outdate_affinity_on_conference_item_change(sender, instance, **kwargs):
+    _invalidate_affinity([instance.conference_id])
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Author)
+def outdate_affinity_on_author_change(sender, instance, **kwargs):
+    # Authors define both conflicts of the submission conference and papers
+    # of reviewers (in any conference where the user is a reviewer):
+    _invalidate_affinity(list(Submission.objects.filter(
+        pk=instance.submission_id).values_list(
+        'conference_id', flat=True)) + list(Reviewer.objects.filter(
+        user=instance.user_id).values_list('conference_id', flat=True)))
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Profile)
+def outdate_affinity_on_profile_change(sender, instance, created, **kwargs):
+    # Profiles are saved each time the user logs in, so the index is
+    # rebuilt only when the affiliation changes:
+    if instance.has_changed('affiliation'):
+        from review.affinity import invalidate_profile_index
+        invalidate_profile_index()
 
 
 # def _send_email(user, review, subject, template_html, template_plain):
@@ -2,7 +2,7 @@ from django import template
 from django.db.models import Q
 
 from review.models import Review, ReviewStats, ReviewDecisionType
-from review.utilities import get_average_score
+from review.utilities import get_average_score, get_review_stage
 
 register = template.Library()
 
@@ -74,14 +74,14 @@ def average_score(obj):
 
 @register.filter
 def missing_reviews(submission):
-    stage = submission.reviewstage_set.first()
+    stage = get_review_stage(submission)
     num_missing = stage.get_num_missing_reviews() if stage else 0
     return ['-' for _ in range(num_missing)]
 
 
 @register.filter
 def review_stage_of(submission):
-    return submission.reviewstage_set.first()
+    return get_review_stage(submission)
 
 
 @register.filter
@@ -1,3 +1,230 @@
-from django.test import TestCase
+import tempfile
+from unittest.mock import patch
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from chair_mail.models import SystemNotification, DEFAULT_NOTIFICATIONS_DATA
+from conferences.models import Conference, SubmissionType, ProceedingType, \
+    ArtifactDescriptor
+from review.assignment import plan_assignment
+from review.decisions import apply_decision
+from review.models import Reviewer, Review, ReviewDecisionType
+from submissions.models import Submission, Author
+from users.models import User
+
+
+# Deferred updates run on commit, so transactions must be really committed:
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ReviewDecisionSaveTest(TransactionTestCase):
+    def setUp(self):
+        self.conference = Conference.objects.create(
+            full_name='Test Conference', short_name='TC')
+        for name, data in DEFAULT_NOTIFICATIONS_DATA.items():
+            SystemNotification.objects.create(
+                name=name, conference=self.conference, **data)
+        self.proc_types = [
+            ProceedingType.objects.create(
+                conference=self.conference, name=f'P{i}')
+            for i in range(2)]
+        for proc_type in self.proc_types:
+            ArtifactDescriptor.objects.create(
+                proc_type=proc_type, name='Final manuscript', mandatory=True)
+        self.stype = SubmissionType.objects.create(
+            conference=self.conference, name='Full paper', language='EN',
+            num_reviews=2)
+        self.stype.possible_proceedings.set(self.proc_types)
+        self.accept = ReviewDecisionType.objects.create(
+            conference=self.conference, decision=ReviewDecisionType.ACCEPT)
+        self.accept.allowed_proceedings.set(self.proc_types[:1])
+        self.users = [
+            User.objects.create_user(f'user{i}@example.com', 'pass')
+            for i in range(6)]
+        self.reviewers = [
+            Reviewer.objects.create(user=user, conference=self.conference)
+            for user in self.users[1:]]
+
+    def create_submission(self, num_reviews):
+        submission = Submission.objects.create(
+            conference=self.conference, title='Paper', stype=self.stype)
+        Author.objects.create(
+            submission=submission, user=self.users[0], order=0)
+        submission.status = Submission.UNDER_REVIEW
+        submission.save()
+        stage = submission.reviewstage_set.first()
+        for reviewer in self.reviewers[:num_reviews]:
+            Review.objects.create(reviewer=reviewer, stage=stage)
+        return stage
+
+    def accept_submission(self, stage):
+        decision = stage.decision
+        decision.decision_type = self.accept
+        with CaptureQueriesContext(connection) as context:
+            decision.save()
+        return [query['sql'] for query in context.captured_queries]
+
+    def test_decision_updates_dependent_data_once(self):
+        stage = self.create_submission(num_reviews=2)
+        queries = self.accept_submission(stage)
+
+        stage.refresh_from_db()
+        self.assertTrue(stage.locked)
+        self.assertTrue(all(stage.review_set.values_list('locked', flat=True)))
+        cameras = stage.submission.cameraready_set.order_by('proc_type')
+        self.assertEqual(
+            [(cam.proc_type_id, cam.active) for cam in cameras],
+            [(self.proc_types[0].pk, True), (self.proc_types[1].pk, False)])
+        for table in ('chair_submissionfacts', 'search_submissiondocument'):
+            self.assertEqual(1, sum(
+                sql.startswith(f'DELETE FROM "{table}"') for sql in queries))
+
+    def test_decision_queries_do_not_depend_on_number_of_reviews(self):
+        num_queries = len(self.accept_submission(
+            self.create_submission(num_reviews=1)))
+        num_queries_after = len(self.accept_submission(
+            self.create_submission(num_reviews=5)))
+        self.assertEqual(num_queries, num_queries_after)
+
+    def test_decision_type_change_updates_cameras(self):
+        stage = self.create_submission(num_reviews=1)
+        self.accept_submission(stage)
+        other = ReviewDecisionType.objects.create(
+            conference=self.conference, decision=ReviewDecisionType.ACCEPT,
+            description='Short paper')
+        other.allowed_proceedings.set(self.proc_types[1:])
+        decision = stage.decision
+        decision.decision_type = other
+        decision.save()
+        cameras = stage.submission.cameraready_set.order_by('proc_type')
+        self.assertEqual(
+            [(cam.proc_type_id, cam.active) for cam in cameras],
+            [(self.proc_types[0].pk, False), (self.proc_types[1].pk, True)])
+
+    def test_bulk_decision_matches_decision_saves(self):
+        stages = [self.create_submission(num_reviews=1) for _ in range(2)]
+        self.accept_submission(stages[0])
+        with patch.object(SystemNotification, 'send') as send:
+            pks = apply_decision(
+                self.conference, Submission.objects.all(), self.accept)
+        self.assertEqual(pks, [stages[1].submission_id])
+
+        def get_state(stage):
+            stage.refresh_from_db()
+            cameras = stage.submission.cameraready_set.order_by('proc_type')
+            return (stage.submission.status, stage.locked, [
+                (cam.proc_type_id, cam.active, cam.artifact_set.count())
+                for cam in cameras])
+        self.assertEqual(get_state(stages[0]), get_state(stages[1]))
+        send.assert_called_once_with(pks, sender=None)
+
+    def test_submission_save_tracks_status_change(self):
+        stage = self.create_submission(num_reviews=1)
+        submission = Submission.objects.get(pk=stage.submission_id)
+        self.assertFalse(submission.has_changed('status'))
+        with patch('chair_mail.utility.'
+                   'send_submission_status_notification_message') as send:
+            submission.title = 'New title'
+            submission.save()
+            send.assert_not_called()
+            submission.status = Submission.REJECTED
+            self.assertTrue(submission.has_changed('status'))
+            submission.save()
+            send.assert_called_once_with(submission)
+        self.assertFalse(submission.has_changed('status'))
+        stage.refresh_from_db()
+        self.assertTrue(stage.locked)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PlanAssignmentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.conference = Conference.objects.create(
+            full_name='Test Conference', short_name='TC')
+        for name, data in DEFAULT_NOTIFICATIONS_DATA.items():
+            SystemNotification.objects.create(
+                name=name, conference=cls.conference, **data)
+        cls.stype = SubmissionType.objects.create(
+            conference=cls.conference, name='Full paper', language='EN',
+            num_reviews=1)
+        cls.author = User.objects.create_user('author@example.com', 'pass')
+        cls.author.profile.affiliation = 'Some University'
+        cls.author.profile.save()
+
+    def create_reviewers(self, *affiliations):
+        reviewers = []
+        for affiliation in affiliations:
+            user = User.objects.create_user(
+                f'reviewer{Reviewer.objects.count()}@example.com', 'pass')
+            user.profile.affiliation = affiliation
+            user.profile.save()
+            reviewers.append(Reviewer.objects.create(
+                user=user, conference=self.conference))
+        return reviewers
+
+    def create_stages(self, num):
+        stages = []
+        for _ in range(num):
+            submission = Submission.objects.create(
+                conference=self.conference, title='Paper', stype=self.stype)
+            Author.objects.create(submission=submission, user=self.author)
+            submission.status = Submission.UNDER_REVIEW
+            submission.save()
+            stages.append(submission.reviewstage_set.first())
+        return stages
+
+    def test_auto_load_spreads_reviews_evenly(self):
+        reviewers = self.create_reviewers('A', 'B')
+        stages = self.create_stages(4)
+        plan = plan_assignment(self.conference)
+        self.assertEqual(plan.max_load, 2)
+        self.assertEqual(plan.missing, {})
+        self.assertEqual(plan.loads, {rev.pk: 2 for rev in reviewers})
+        self.assertEqual(sorted(stage_id for stage_id, _ in plan.assignments),
+                         [stage.pk for stage in stages])
+
+    def test_auto_load_grows_past_conflicts(self):
+        # The first reviewer has a conflict (same affiliation as the author),
+        # while the second one already has five reviews:
+        conflicting, busy = self.create_reviewers('some  university', 'B')
+        for stage in self.create_stages(5):
+            Review.objects.create(reviewer=busy, stage=stage)
+        stage = self.create_stages(1)[0]
+        plan = plan_assignment(self.conference)
+        self.assertEqual(plan.assignments, [(stage.pk, busy.pk)])
+        self.assertEqual(plan.missing, {})
+        self.assertEqual(plan.max_load, 6)
+
+        plan = plan_assignment(self.conference, max_load=5)
+        self.assertEqual(plan.assignments, [])
+        self.assertEqual(plan.missing, {stage.pk: 1})
+
+    def test_apply_checks_quotas(self):
+        self.create_reviewers('A', 'B')
+        stages = self.create_stages(2)
+        plan = plan_assignment(self.conference)
+        self.assertEqual(len(plan.assignments), 2)
+        # Another review of the first stage is added before applying (by a
+        # new reviewer, so loads of the planned ones don't change):
+        other, = self.create_reviewers('C')
+        Review.objects.create(reviewer=other, stage=stages[0])
+
+        reviews = plan.apply()
+        self.assertEqual([review.stage_id for review in reviews],
+                         [stages[1].pk])
+        for stage in stages:
+            self.assertEqual(stage.review_set.count(), 1)
+
+    def test_apply_checks_loads(self):
+        reviewer, = self.create_reviewers('A')
+        first, second = self.create_stages(2)
+        plan = plan_assignment(self.conference, max_load=1)
+        self.assertEqual(len(plan.assignments), 1)
+        # The reviewer gets a review of the other stage before applying:
+        planned_stage_id = plan.assignments[0][0]
+        other = second if planned_stage_id == first.pk else first
+        Review.objects.create(reviewer=reviewer, stage=other)
+
+        self.assertEqual(plan.apply(), [])
+        self.assertEqual(reviewer.reviews.count(), 1)
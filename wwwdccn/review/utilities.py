@@ -1,6 +1,20 @@
 from submissions.models import Submission
 
 
+def get_review_stage(submission):
+    """Get the first review stage of the submission, or `None`.
+
+    Unlike `submission.reviewstage_set.first()`, this function uses review
+    stages loaded with `prefetch_related('reviewstage_set')` (if any), so it
+    doesn't hit the database when called for prefetched submissions.
+
+    :param submission: `Submission` instance
+    :return: `ReviewStage` instance or `None`
+    """
+    stages = sorted(submission.reviewstage_set.all(), key=lambda st: st.pk)
+    return stages[0] if stages else None
+
+
 def count_required_reviews(submission, cached_stypes=None):
     """Return the number of required reviews for the submission.
     If `cached_stypes` provided, it should contain a `stype.pk -> stype`
@@ -56,7 +70,7 @@ def get_average_score(obj):
     :return: average score or `0` if score can not be estimated.
     """
     if isinstance(obj, Submission):
-        stage = obj.reviewstage_set.first()
+        stage = get_review_stage(obj)
         return stage.score if stage else 0
 
     try:
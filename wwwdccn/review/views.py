@@ -1,6 +1,5 @@
 from django.conf import settings
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.http import Http404, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
@@ -10,6 +9,7 @@ from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 
 from conferences.models import Conference
+from chair_mail.outbox import queue_mail
 from conferences.utilities import validate_chair_access
 from review.forms import EditReviewForm, UpdateReviewDecisionForm
 from review.models import Review, Reviewer, ReviewDecision, ReviewStage
@@ -61,12 +61,11 @@ def decline_review(request, pk):
     }
     text = render_to_string('review/email/review_declined_by_user.txt', context)
     conference = review.reviewer.conference
-    send_mail(
+    queue_mail(
         f"[DCCN2019] Refuse to review submission #{review.paper.pk}",
         message=text,
         recipient_list=[chair.email for chair in conference.chairs.all()],
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        fail_silently=False,
+        sender=request.user,
     )
 
     # Delete the review:
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from search.utilities import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search documents of all submissions and profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of objects processed at once')
+
+    def handle(self, *args, **kwargs):
+        num_submissions, num_profiles = rebuild_search_index(
+            chunk_size=max(kwargs['chunk_size'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            f'= finished: indexed {num_submissions} submissions and '
+            f'{num_profiles} profiles'))
@@ -0,0 +1,93 @@
+# Generated by Django 2.2.28 on 2026-10-17 21:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TRIGRAM_INDEXES = (
+    ('search_profiledocument', 'search_profiledoc_text_trgm'),
+    ('search_submissiondocument', 'search_submissiondoc_text_trgm'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, index in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX {index} ON {table} USING gin (text gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, index in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index}')
+
+
+def normalize_text(*parts):
+    return ' '.join(
+        ' '.join(str(part) for part in parts if part).lower().split())
+
+
+def get_profile_words(profile):
+    return (profile.first_name, profile.last_name, profile.first_name_rus,
+            profile.middle_name_rus, profile.last_name_rus,
+            profile.affiliation)
+
+
+def fill_documents(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    Author = apps.get_model('submissions', 'Author')
+    Submission = apps.get_model('submissions', 'Submission')
+    ProfileDocument = apps.get_model('search', 'ProfileDocument')
+    SubmissionDocument = apps.get_model('search', 'SubmissionDocument')
+
+    profiles = {profile.user_id: profile
+                for profile in Profile.objects.all()}
+    ProfileDocument.objects.bulk_create([ProfileDocument(
+        profile_id=profile.pk,
+        text=normalize_text(profile.pk, *get_profile_words(profile))
+    ) for profile in profiles.values()], batch_size=500)
+
+    words = {}
+    for author in Author.objects.order_by('order'):
+        profile = profiles.get(author.user_id)
+        if profile:
+            words.setdefault(author.submission_id, []).extend(
+                get_profile_words(profile))
+    SubmissionDocument.objects.bulk_create([SubmissionDocument(
+        submission_id=pk,
+        text=normalize_text(pk, title, *words.get(pk, ()))
+    ) for pk, title in Submission.objects.values_list('pk', 'title')],
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('submissions', '0009_remove_descriptor_from_attachment'),
+        ('users', '0009_profile_avatar_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileDocument',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='users.Profile')),
+                ('text', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubmissionDocument',
+            fields=[
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='submissions.Submission')),
+                ('text', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,122 @@
+from django.db import models, transaction
+from django.db.models import Prefetch
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from gears.deferred import defer_update
+from submissions.models import Submission, Author
+from users.models import Profile
+
+
+class SubmissionDocument(models.Model):
+    """Search text of the submission: ID, title, names of the authors (both
+    Latin and Cyrillic) and their affiliations, in lower case.
+
+    Documents are updated when submissions, authors or profiles are saved,
+    see also `rebuild_search_index` command.
+    """
+    submission = models.OneToOneField(
+        Submission, on_delete=models.CASCADE, primary_key=True,
+        related_name='search_document')
+    text = models.TextField(blank=True)
+
+
+class ProfileDocument(models.Model):
+    """Search text of the profile: ID, Latin and Cyrillic names and
+    affiliation, in lower case.
+    """
+    profile = models.OneToOneField(
+        Profile, on_delete=models.CASCADE, primary_key=True,
+        related_name='search_document')
+    text = models.TextField(blank=True)
+
+
+def normalize_text(*parts):
+    """Join non-empty parts into a lower case string with single spaces."""
+    return ' '.join(
+        ' '.join(str(part) for part in parts if part).lower().split())
+
+
+def get_profile_words(profile):
+    return (profile.first_name, profile.last_name, profile.first_name_rus,
+            profile.middle_name_rus, profile.last_name_rus,
+            profile.affiliation)
+
+
+def get_profile_text(profile):
+    return normalize_text(profile.pk, *get_profile_words(profile))
+
+
+def get_submission_text(submission):
+    """Build the search text. Authors of the submission with their profiles
+    should be prefetched.
+    """
+    words = []
+    for author in submission.authors.all():
+        words.extend(get_profile_words(author.user.profile))
+    return normalize_text(submission.pk, submission.title, *words)
+
+
+def update_submission_documents(submission_pks):
+    """Rebuild search documents of the given submissions with a fixed number
+    of queries.
+    """
+    submissions = Submission.objects.filter(
+        pk__in=list(submission_pks)
+    ).prefetch_related(
+        Prefetch('authors', queryset=Author.objects.select_related(
+            'user__profile'))
+    )
+    documents = [SubmissionDocument(
+        submission_id=submission.pk, text=get_submission_text(submission)
+    ) for submission in submissions]
+    with transaction.atomic():
+        SubmissionDocument.objects.filter(
+            submission_id__in=[doc.submission_id for doc in documents]
+        ).delete()
+        SubmissionDocument.objects.bulk_create(documents)
+
+
+def update_profile_documents(profiles):
+    """Rebuild search documents of the given profiles."""
+    documents = [ProfileDocument(profile_id=profile.pk,
+                                 text=get_profile_text(profile))
+                 for profile in profiles]
+    with transaction.atomic():
+        ProfileDocument.objects.filter(
+            profile_id__in=[doc.profile_id for doc in documents]
+        ).delete()
+        ProfileDocument.objects.bulk_create(documents)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Submission)
+def update_document_on_submission_save(sender, instance, update_fields,
+                                       **kwargs):
+    if update_fields and 'title' not in update_fields:
+        return
+    defer_update(update_submission_documents, [instance.pk], late=True)
+
+
+# noinspection PyUnusedLocal
+@receiver([post_save, post_delete], sender=Author)
+def update_document_on_author_change(sender, instance, **kwargs):
+    # Authors are also deleted when the submission is deleted, so the
+    # document is updated after commit, when the submission is already gone
+    # and no document is written for it:
+    defer_update(
+        update_submission_documents, [instance.submission_id], late=True)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Profile)
+def update_document_on_profile_save(sender, instance, **kwargs):
+    text = get_profile_text(instance)
+    document = ProfileDocument.objects.filter(profile=instance).first()
+    if document and document.text == text:
+        return
+    ProfileDocument.objects.update_or_create(
+        profile=instance, defaults={'text': text})
+    # Names and affiliation are also a part of submission documents:
+    update_submission_documents(Author.objects.filter(
+        user_id=instance.user_id).values_list('submission_id', flat=True))
@@ -0,0 +1,71 @@
+import tempfile
+
+from django.test import TransactionTestCase, override_settings
+
+from chair_mail.models import SystemNotification, DEFAULT_NOTIFICATIONS_DATA
+from conferences.models import Conference
+from search.utilities import filter_by_term, search_profiles
+from submissions.models import Submission, Author
+from users.models import User, Profile
+
+
+# Documents of submissions are updated on commit:
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class FilterByTermTest(TransactionTestCase):
+    def setUp(self):
+        self.conference = Conference.objects.create(
+            full_name='Test Conference', short_name='TC')
+        for name, data in DEFAULT_NOTIFICATIONS_DATA.items():
+            SystemNotification.objects.create(
+                name=name, conference=self.conference, **data)
+        self.users = []
+        for first_name, last_name, affiliation in (
+                ('Ivan', 'Petrov', 'Moscow State University'),
+                ('Anna', 'Schmidt', 'TU Berlin')):
+            user = User.objects.create_user(
+                f'{last_name.lower()}@example.com', 'pass')
+            user.profile.first_name = first_name
+            user.profile.last_name = last_name
+            user.profile.affiliation = affiliation
+            user.profile.save()
+            self.users.append(user)
+        self.submissions = [
+            Submission.objects.create(
+                conference=self.conference, title=title)
+            for title in ('Queueing Networks', 'Wireless Channels')]
+        for submission, user in zip(self.submissions, self.users):
+            Author.objects.create(submission=submission, user=user)
+
+    def filter_submissions(self, term):
+        return list(filter_by_term(
+            Submission.objects.order_by('pk'), term).values_list(
+            'pk', flat=True))
+
+    def test_submissions_match_title_and_authors(self):
+        first, second = [submission.pk for submission in self.submissions]
+        self.assertEqual(self.filter_submissions('queueing'), [first])
+        self.assertEqual(self.filter_submissions('SCHMIDT'), [second])
+        self.assertEqual(self.filter_submissions('berl wireless'), [second])
+        self.assertEqual(self.filter_submissions('petrov wireless'), [])
+        self.assertEqual(self.filter_submissions(''), [first, second])
+
+    def test_submission_documents_follow_changes(self):
+        first, second = [submission.pk for submission in self.submissions]
+        Author.objects.create(submission=self.submissions[0],
+                              user=self.users[1], order=1)
+        self.assertEqual(self.filter_submissions('schmidt'), [first, second])
+        profile = self.users[1].profile
+        profile.last_name = 'Mueller'
+        profile.save()
+        self.assertEqual(self.filter_submissions('mueller'), [first, second])
+        self.submissions[1].delete()
+        self.assertEqual(self.filter_submissions('mueller'), [first])
+
+    def test_profiles_search(self):
+        profiles = Profile.objects.order_by('pk')
+        self.assertEqual(
+            list(filter_by_term(profiles, 'state univ')),
+            [self.users[0].profile])
+        self.assertEqual(list(search_profiles('anna')),
+                         [self.users[1].profile])
+        self.assertEqual(list(search_profiles('  ')), [])
@@ -0,0 +1,87 @@
+"""Searching submissions and profiles by their search documents.
+
+A term matches a document if every word of the term is a substring of the
+document text. On PostgreSQL the lookup is served by a GIN trigram index
+(see migrations) and results are ranked by trigram similarity; on other
+databases documents are scanned and ranked by matching a word start.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, When, Value, IntegerField, Q
+
+from search.models import update_submission_documents, \
+    update_profile_documents
+from submissions.models import Submission
+from users.models import Profile
+
+
+def filter_by_term(queryset, term, field='search_document__text'):
+    """Filter objects which search documents contain all words of the term.
+
+    Since each object has a single document, no duplicates are produced.
+    """
+    for word in term.lower().split():
+        queryset = queryset.filter(**{f'{field}__contains': word})
+    return queryset
+
+
+def rank_by_term(queryset, term, field='search_document__text'):
+    """Annotate `search_rank` and order objects by it, best matches first.
+    """
+    term = ' '.join(term.lower().split())
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        rank = TrigramSimilarity(field, term)
+    else:
+        words = term.split()
+        rank = Case(
+            When(Q(**{f'{field}__contains': f' {words[0]}'}), then=Value(1)),
+            default=Value(0), output_field=IntegerField()
+        ) if words else Value(0, output_field=IntegerField())
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', 'pk')
+
+
+def search_profiles(term, queryset=None, limit=None):
+    """Find profiles matching the term, ranked and capped by `limit`
+    (`settings.SEARCH_RESULTS_LIMIT` by default).
+    """
+    if not term.strip():
+        return Profile.objects.none()
+    if queryset is None:
+        queryset = Profile.objects.all()
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    return rank_by_term(filter_by_term(queryset, term), term)[:limit]
+
+
+def search_submissions(term, queryset=None, limit=None):
+    """Find submissions matching the term, ranked and capped by `limit`
+    (`settings.SEARCH_RESULTS_LIMIT` by default).
+    """
+    if not term.strip():
+        return Submission.objects.none()
+    if queryset is None:
+        queryset = Submission.objects.all()
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    return rank_by_term(filter_by_term(queryset, term), term)[:limit]
+
+
+def rebuild_search_index(chunk_size=500):
+    """Rebuild search documents of all submissions and profiles.
+
+    :return: a pair `(num_submissions, num_profiles)`
+    """
+    submission_pks = list(Submission.objects.values_list('pk', flat=True))
+    for i in range(0, len(submission_pks), chunk_size):
+        update_submission_documents(submission_pks[i:i + chunk_size])
+
+    num_profiles = 0
+    profiles = Profile.objects.order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(profiles.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        update_profile_documents(chunk)
+        num_profiles += len(chunk)
+        last_pk = chunk[-1].pk
+    return len(submission_pks), num_profiles
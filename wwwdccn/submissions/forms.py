@@ -1,7 +1,5 @@
 from django import forms
-from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.db.models import Max
 from django.forms import ModelForm
 from django.template.loader import render_to_string
@@ -9,6 +7,7 @@ from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import ValidationError
 
+from chair_mail.outbox import queue_mail
 from gears.widgets import CustomFileInput
 from .models import Submission, Author, Attachment
 
@@ -245,13 +244,12 @@ class InviteAuthorForm(forms.Form):
         }
         html = render_to_string('submissions/email/invitation.html', context)
         text = render_to_string('submissions/email/invitation.txt', context)
-        send_mail(
+        queue_mail(
             'Invitation to DCCN Conference Registration System',
             message=text,
             html_message=html,
             recipient_list=[self.cleaned_data['email']],
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            fail_silently=False,
+            sender=request.user,
         )
 
 
@@ -4,9 +4,12 @@ from django.conf import settings
 from django.db.models import Model, ForeignKey, CASCADE
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
 
 from conferences.models import Topic, SubmissionType, Conference
+from gears.deferred import coalesce_updates
+from gears.tracking import TrackChangesMixin
 
 User = get_user_model()
 
@@ -23,7 +26,7 @@ def get_review_manuscript_full_path(instance, filename):
     return f'{path}/{name}.{ext}'
 
 
-class Submission(models.Model):
+class Submission(TrackChangesMixin, models.Model):
     SUBMITTED = 'SUBMIT'
     UNDER_REVIEW = 'REVIEW'
     REJECTED = 'REJECT'
@@ -101,11 +104,13 @@ class Submission(models.Model):
     def save(self, *args, **kwargs):
         from chair_mail.utility import \
             send_submission_status_notification_message
-        old = Submission.objects.filter(pk=self.pk).first()
-        status_updated = old is None or old.status != self.status
-        ret = super().save(*args, **kwargs)
-        if status_updated:
-            send_submission_status_notification_message(self)
+        # Updates of review stages, camera-ready, etc. caused by the save are
+        # coalesced and applied before it returns (see `gears.deferred`):
+        with transaction.atomic(), coalesce_updates():
+            status_updated = self.has_changed('status')
+            ret = super().save(*args, **kwargs)
+            if status_updated:
+                send_submission_status_notification_message(self)
         return ret
 
     def __str__(self):
@@ -127,10 +132,12 @@ class Submission(models.Model):
         return ''
 
     def is_chaired_by(self, user):
-        return user in self.conference.chairs.all()
+        from conferences.access import get_access
+        return get_access(user).is_chair(self.conference_id)
 
     def is_author(self, user):
-        return bool(self.authors.filter(user=user)) or (self.created_by == user)
+        from conferences.access import get_access
+        return get_access(user).is_submission_author(self)
 
     def details_editable_by(self, user):
         return self.is_chaired_by(user) or (
@@ -160,7 +167,7 @@ class Submission(models.Model):
     def get_authors_display(self):
         return ', '.join(
             author.user.profile.get_full_name()
-            for author in self.authors.order_by('order')
+            for author in self.authors.all()
         )
 
     def warnings(self):
@@ -177,6 +184,12 @@ class Submission(models.Model):
         )
 
 
+# Sent after submissions (with given `pks`) are updated with a queryset
+# `update()` (e.g., statuses by `review.decisions`), since `post_save` is
+# not sent in this case:
+submissions_updated = Signal(providing_args=['conference', 'pks'])
+
+
 class Author(models.Model):
     class Meta:
         ordering = ['order']
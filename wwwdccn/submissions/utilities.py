@@ -2,7 +2,6 @@ from collections import namedtuple
 
 from django.urls import reverse
 
-from proceedings.models import Artifact
 from submissions.models import Submission
 
 
@@ -22,6 +21,14 @@ warning_class = namedtuple(
 
 
 def list_warnings(submission):
+    """List warnings of the submission.
+
+    Warnings are read from the submission facts (see `chair.facts`), so only
+    names of missing artifacts are loaded from the database, when needed.
+    """
+    # Imported here, since chair models depend on this application:
+    from chair.facts import get_submission_facts
+    from chair.models import SubmissionFacts as Facts
     wc = warning_class
 
     pk = submission.pk
@@ -33,45 +40,41 @@ def list_warnings(submission):
                                    kwargs={'sub_pk': pk})
 
     assert isinstance(submission, Submission)
+    facts = get_submission_facts(submission)
     warnings = []
-    if not submission.title.strip():
+    if facts.has_warning(Facts.MISSING_TITLE):
         warnings.append(wc('Missing title', url_details, link_label='edit...'))
-    if not submission.abstract.strip():
+    if facts.has_warning(Facts.MISSING_ABSTRACT):
         warnings.append(wc('Missing abstract', url_details,
                            link_label='edit...'))
-    if submission.topics.count() == 0:
+    if facts.has_warning(Facts.NO_TOPICS):
         warnings.append(wc('No topics selected', url_details,
                            link_label='select...'))
-    if not submission.stype:
+    if facts.has_warning(Facts.NO_TYPE):
         warnings.append(wc('Type not selected', url_details,
                            link_label='select...'))
 
-    if submission.status == Submission.SUBMITTED:
-        if not submission.review_manuscript:
-            warnings.append(
-                wc('Missing review manuscript', url_review_manuscript,
-                   link_label='upload...'))
-
-    if submission.status == Submission.UNDER_REVIEW:
-        stage = submission.reviewstage_set.first()
-        if submission.stype and stage:
-            num_not_finished = stage.review_set.filter(submitted=False).count()
-            num_missing = stage.get_num_missing_reviews()
-            if num_missing > 0:
-                warnings.append(wc(
-                    f'{num_missing} reviewers not assigned',
-                    '', chair_link=url_assign_reviewers, visible_by=_CHAIR_ONLY,
-                    link_label='assign...'
-                ))
-            if num_not_finished > 0:
-                warnings.append(wc(
-                    f'{num_not_finished} reviews not finished',
-                    '', chair_link=url_assign_reviewers, visible_by=_CHAIR_ONLY,
-                ))
-
-    if submission.status == Submission.ACCEPTED:
-        artifacts = Artifact.objects.filter(
-            camera_ready__submission=submission, camera_ready__active=True)
+    if facts.has_warning(Facts.NO_REVIEW_MANUSCRIPT):
+        warnings.append(
+            wc('Missing review manuscript', url_review_manuscript,
+               link_label='upload...'))
+
+    if facts.has_warning(Facts.UNASSIGNED_REVIEWERS):
+        warnings.append(wc(
+            f'{facts.num_missing_reviews} reviewers not assigned',
+            '', chair_link=url_assign_reviewers, visible_by=_CHAIR_ONLY,
+            link_label='assign...'
+        ))
+    if facts.has_warning(Facts.INCOMPLETE_REVIEWS):
+        warnings.append(wc(
+            f'{facts.num_unfinished_reviews} reviews not finished',
+            '', chair_link=url_assign_reviewers, visible_by=_CHAIR_ONLY,
+        ))
+
+    if facts.has_warning(Facts.MISSING_ARTIFACT):
+        artifacts = [
+            artifact for camera in submission.cameraready_set.all()
+            if camera.active for artifact in camera.artifact_set.all()]
         for artifact in artifacts:
             if artifact.descriptor.mandatory and not artifact.attachment.file:
                 warnings.append(wc(
@@ -1,15 +1,14 @@
-import mimetypes
-
 from django.contrib import messages
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.decorators import login_required
-from django.http import Http404, HttpResponse, HttpResponseForbidden, \
+from django.http import Http404, HttpResponseForbidden, \
     HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST, require_GET
 
 from conferences.models import Conference
 from conferences.utilities import validate_chair_access
+from gears.downloads import serve_file
 from submissions.forms import CreateSubmissionForm, SubmissionDetailsForm, \
     AuthorCreateForm, AuthorsReorderForm, AuthorDeleteForm, \
     UploadReviewManuscriptForm, InviteAuthorForm, UploadAttachmentForm, \
@@ -168,14 +167,8 @@ def download_manuscript(request, pk):
     submission = get_object_or_404(Submission, pk=pk)
     if submission.is_manuscript_viewable_by(request.user):
         if submission.review_manuscript:
-            filename = submission.get_review_manuscript_name()
-            mtype = mimetypes.guess_type(filename)[0]
-            response = HttpResponse(
-                submission.review_manuscript.file,
-                content_type=mtype
-            )
-            response['Content-Disposition'] = f'filename={filename}'
-            return response
+            return serve_file(request, submission.review_manuscript,
+                              submission.get_review_manuscript_name())
         raise Http404
     return HttpResponseForbidden()
 
@@ -297,12 +290,8 @@ def download_attachment(request, pk, att_pk):
     if not is_authorized_view_attachment(request.user, submission):
         return HttpResponseForbidden()
     if attachment.file:
-        filename = attachment.get_file_name()
-        mtype = mimetypes.guess_type(filename)[0]
         # TODO: add mime-type checking
-        response = HttpResponse(attachment.file.file, content_type=mtype)
-        response['Content-Disposition'] = f'filename={filename}'
-        return response
+        return serve_file(request, attachment.file, attachment.get_file_name())
     raise Http404
 
 
@@ -8,7 +8,8 @@ from submissions.models import Submission
 @login_required
 def submissions_list(request):
     return render(request, 'user_site/submissions.html', {
-        'submissions': Submission.objects.filter(authors__user=request.user),
+        'submissions': Submission.objects.filter(
+            authors__user=request.user).select_related('facts'),
     })
 
 
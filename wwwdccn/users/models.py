@@ -12,6 +12,7 @@ from django.utils.translation import ugettext_lazy as _
 from django.db import models
 from django_countries.fields import CountryField
 
+from gears.tracking import TrackChangesMixin
 from .managers import UserManager
 
 
@@ -56,7 +57,7 @@ def get_avatar_full_path(instance, filename):
     return f'{path}/{name}.{ext}'
 
 
-class Profile(models.Model):
+class Profile(TrackChangesMixin, models.Model):
     ROLES = (
         (None, _('Select your role')),
         ('Student', _('Student')),
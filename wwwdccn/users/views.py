@@ -1,24 +1,20 @@
 import base64
 
 from django.contrib import messages
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
 from django.core.files.base import ContentFile
-from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.utils.translation import ugettext_lazy as _
 from django.views.decorators.http import require_GET, require_POST
 
+from search.utilities import search_profiles
 from users.forms import PersonalForm, ProfessionalForm, UpdateEmailForm, \
     SubscriptionsForm, DeleteUserForm, DeleteAvatarForm
 from users.models import change_avatar
 
 
-User = get_user_model()
-
-
 @login_required
 @require_GET
 def profile_overview(request):
@@ -152,22 +148,15 @@ def profile_reviewer(request):
 @login_required
 @require_GET
 def search_users(request):
-    # TODO: split query into words and match them all
-    query = request.GET.get('q')
-    users = User.objects.filter(
-        Q(profile__first_name__icontains=query) |
-        Q(profile__last_name__icontains=query) |
-        Q(profile__first_name_rus__icontains=query) |
-        Q(profile__last_name_rus__icontains=query)
-    )
+    profiles = search_profiles(request.GET.get('q', ''))
     data = {'users': [{
-        'id': user.id,
-        'first_name': user.profile.first_name,
-        'last_name': user.profile.last_name,
-        'first_name_rus': user.profile.first_name_rus,
-        'middle_name_rus': user.profile.middle_name_rus,
-        'last_name_rus': user.profile.last_name_rus,
-        'affiliation': user.profile.affiliation,
-        'avatar': user.profile.avatar.url if user.profile.avatar else '',
-    } for user in users]}
+        'id': profile.user_id,
+        'first_name': profile.first_name,
+        'last_name': profile.last_name,
+        'first_name_rus': profile.first_name_rus,
+        'middle_name_rus': profile.middle_name_rus,
+        'last_name_rus': profile.last_name_rus,
+        'affiliation': profile.affiliation,
+        'avatar': profile.avatar.url if profile.avatar else '',
+    } for profile in profiles]}
     return JsonResponse(data)
@@ -81,6 +81,7 @@ INSTALLED_APPS = [
     'chair_mail',
     'review',
     'proceedings',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -144,6 +145,20 @@ elif DATABASE_PROVIDER == 'sqlite' or DATABASE_PROVIDER == 'sqlite3':
 else:
     raise ValueError(f'unsupported DB provider "{DATABASE_PROVIDER}"')
 
+# Cache is shared by all processes of the site (gunicorn workers, mail and
+# report workers), so values dropped by one of them (e.g., generation tokens,
+# see `gears.generations`) are not used by others. The table is created by
+# `gears` migrations.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'gears_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -224,6 +239,12 @@ else:
 # * SELCDN_PASSWORD
 # * SELCDN_MEDIA_PUBLIC_BIN (!! without slashes)
 # * SELCDN_MEDIA_PRIVATE_BIN (!! without slashes)
+# * SELCDN_TEMP_URL_KEY (opt.), key for signing temporary URLs
+#
+# * MEDIA_DOWNLOAD_MODE (opt.), how private files are sent to users:
+#   'stream' (default) - streamed by Django, 'accel' - by nginx with
+#   X-Accel-Redirect (local media only), 'redirect' - to a temporary
+#   signed CDN URL (selcdn only, requires SELCDN_TEMP_URL_KEY).
 #################################################################
 if os.environ.get('MEDIA_PROVIDER', '') == 'selcdn':
     SELCDN_HTTP_HOST = os.environ['SELCDN_HTTP_HOST']
@@ -250,6 +271,12 @@ else:
     MEDIA_PUBLIC_ROOT = 'public/'
     MEDIA_PRIVATE_ROOT = 'private/'
 
+MEDIA_DOWNLOAD_MODE = os.environ.get('MEDIA_DOWNLOAD_MODE', 'stream')
+MEDIA_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_SIGNED_URL_KEY = os.environ.get('SELCDN_TEMP_URL_KEY', '')
+MEDIA_SIGNED_URL_TTL = 300  # seconds
+
 
 #################################################################
 # Email service settings
@@ -280,6 +307,21 @@ if os.environ.get('EMAIL_PROVIDER', '') == 'mailgun':
 else:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Outbox settings, used by `mailworker` command (see `chair_mail.outbox`):
+# - EMAIL_SEND_CHUNK_SIZE: number of messages each worker thread sends
+#   through a single backend connection;
+# - EMAIL_OUTBOX_WORKERS: number of worker threads;
+# - EMAIL_OUTBOX_RATE: max. number of messages sent per second (0 - no limit);
+# - EMAIL_OUTBOX_MAX_ATTEMPTS: a message is failed after this many attempts;
+# - EMAIL_OUTBOX_RETRY_DELAY: seconds before the first retry, then doubled;
+# - EMAIL_OUTBOX_LEASE: seconds after which a message being sent is
+#   considered abandoned and may be taken by another worker.
+EMAIL_SEND_CHUNK_SIZE = 50
+EMAIL_OUTBOX_WORKERS = int(os.environ.get('EMAIL_OUTBOX_WORKERS', 4))
+EMAIL_OUTBOX_RATE = float(os.environ.get('EMAIL_OUTBOX_RATE', 10))
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_LEASE = 600
 
 BOOTSTRAP4 = {
     'required_css_class': 'required',
@@ -355,4 +397,34 @@ LOGGING = {
 }
 
 ITEMS_PER_PAGE = 10
+LIST_COUNT_CACHE_TIMEOUT = 60  # seconds
+
+# Choices of chair filter forms are rebuilt when data changes, the timeout
+# only frees the cache from unused values:
+FILTER_FACETS_CACHE_TIMEOUT = 600  # seconds
+
+# Maximum number of results returned by search (e.g., users autocomplete):
+SEARCH_RESULTS_LIMIT = 20
+
+# Maximum number of cards rendered by a single feed request:
+MAX_FEED_ITEMS = 100
+
+# Number of rows fetched from the database at once by CSV exports:
+EXPORT_CHUNK_SIZE = 2000
+
+# Seconds after which a review report being built is considered abandoned:
+REVIEW_REPORT_TIMEOUT = 1800
+
+# Days to keep recipients selected with chair filters for messages:
+RECIPIENT_SELECTION_MAX_AGE = 7
+
+# Number of objects per page of mailing list members in compose page API:
+MAILING_LIST_PAGE_SIZE = 1000
+
+
+# Reviewer suggestions index is rebuilt when data changes, the timeout only
+# frees the cache from unused values:
+AFFINITY_INDEX_CACHE_TIMEOUT = 3600  # seconds
 
+# Number of best matching reviewers highlighted when assigning a reviewer:
+NUM_SUGGESTED_REVIEWERS = 5